@@ -3,60 +3,29 @@
 convert Gemini3D old raw binary data to HDF5 .h5
 
 For clarity, the user must provide a config.nml for the original raw data.
+Files already converted are skipped, so an interrupted conversion can be rerun.
+
+Equivalent to: python -m gemini3d.raw.convert data indir outdir
 """
 
 from pathlib import Path
 import argparse
-import typing
-
-import gemini3d.raw.read as raw_read
-import gemini3d.read as read
-import gemini3d.write as write
-
-LSP = 7
-CLVL = 6
+import logging
 
+import gemini3d.raw.convert as raw_convert
 
 p = argparse.ArgumentParser()
 p.add_argument("indir", help="Gemini .dat file directory")
 p.add_argument("outdir", help="directory to write HDF5 files")
+p.add_argument("-j", "--workers", help="number of worker processes", type=int)
+p.add_argument("-clvl", help="GZIP compression level", type=int, default=6)
 P = p.parse_args()
 
+logging.basicConfig(format="%(message)s", level=logging.INFO)
+
 indir = Path(P.indir).expanduser()
 outdir = Path(P.outdir).expanduser()
 
-infiles: typing.Iterable[Path]
-if indir.is_file():
-    infiles = [indir]
-    indir = indir.parent
-elif indir.is_dir():
-    infiles = indir.glob("*.dat")
-else:
-    raise FileNotFoundError(indir)
-
-cfg = read.config(indir)
-if "flagoutput" not in cfg:
-    raise LookupError(f"need to specify flagoutput in {indir}/config.nml")
-
-try:
-    xg = raw_read.grid(indir)
-except FileNotFoundError:
-    xg = {}
-
-i = 0
-for infile in infiles:
-    if infile.stem in {"simsize", "simgrid", "initial_conditions"}:
-        continue
-
-    outfile = outdir / (f"{infile.stem}.h5")
-    print(infile, "=>", outfile)
-    i += 1
-
-    dat = raw_read.data(infile, cfg=cfg, xg=xg)
-
-    write.state(outfile, dat)
-
-if i == 0:
-    raise FileNotFoundError(f"no .dat files found in {indir}")
+files = raw_convert.data(indir, outdir, workers=P.workers, clvl=P.clvl)
 
-print(f"DONE: converted {i} files in {indir} to {outdir}")
+print(f"DONE: converted {len(files)} files in {indir} to {outdir}")
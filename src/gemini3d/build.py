@@ -0,0 +1,353 @@
+"""
+incremental simulation setup: gemini3d.model.setup as a small build graph.
+
+A setup stage (grid, initial state, E-field, precipitation...) has a key, the hash of
+the config values and files it reads and the keys of the stages it depends on.
+The key and outputs of each stage built are kept in a manifest in the simulation
+inputs directory, so on later setups a stage is rebuilt only if its key changed
+or its outputs are missing or were modified since.
+
+A stage is a dict with:
+
+    deps: tuple of str
+        stages it depends on
+    config: tuple of str
+        config keys it reads, "foo*" for all keys starting with "foo"
+    outputs: tuple of str
+        config keys of the files or directories it writes
+    values: callable, optional
+        values(cfg) -> dict of values derived from the config it reads
+    inputs: callable, optional
+        inputs(cfg) -> list of pathlib.Path of other files it reads
+    build: callable
+        build(cfg, xg) writes the outputs, a module-level function so it can run
+        in a worker process
+    after: tuple of str, optional
+        stages whose outputs it reads while building, default deps
+
+Stages not coming after one another are built concurrently by run().
+"""
+
+from __future__ import annotations
+from pathlib import Path
+from datetime import datetime, timedelta
+import typing as T
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+from . import __version__
+from .shared import SharedGrid
+
+MANIFEST_NAME = "setup_manifest.json"
+VERSION = 1
+
+Stage = T.Dict[str, T.Any]
+
+# config and grid shared by worker processes, sent once per worker
+_worker_state: dict[str, T.Any] = {}
+
+
+def order(stages: dict[str, Stage]) -> list[str]:
+    """stage names with every stage after the stages it depends on"""
+
+    done: list[str] = []
+
+    def visit(name: str, path: tuple[str, ...]) -> None:
+        if name in done:
+            return
+        if name in path:
+            raise ValueError(f"setup stages depend on each other: {' -> '.join(path)}")
+        if name not in stages:
+            raise KeyError(f"unknown setup stage {name}, needed by {path[-1]}")
+
+        for d in stages[name]["deps"]:
+            visit(d, (*path, name))
+        done.append(name)
+
+    for name in stages:
+        visit(name, ())
+
+    return done
+
+
+def plan(
+    cfg: dict[str, T.Any], stages: dict[str, Stage], *, force: bool = False
+) -> tuple[dict[str, str], list[str]]:
+    """
+    key of each stage and the stages to build
+
+    Parameters
+    ----------
+    cfg: dict
+        simulation parameters, with "out_dir"
+    stages: dict
+        name => stage
+    force: bool, optional
+        build all stages
+
+    Returns
+    -------
+    keys: dict
+        name => key of each stage
+    stale: list of str
+        stages to build, in build order
+    """
+
+    built = load(cfg["out_dir"])["stages"]
+
+    keys: dict[str, str] = {}
+    stale = []
+    for name in order(stages):
+        keys[name] = key(cfg, stages[name], keys)
+        e = built.get(name)
+        if (
+            force
+            or not e
+            or e["key"] != keys[name]
+            or e["outputs"] != _outputs(cfg, stages[name])
+        ):
+            stale.append(name)
+
+    return keys, stale
+
+
+def record(
+    cfg: dict[str, T.Any], stages: dict[str, Stage], name: str, keys: dict[str, str]
+) -> None:
+    """
+    record stage "name" as built, after its outputs are written.
+    The key is computed again, as files it read may have been written while building,
+    e.g. a downloaded equilibrium simulation.
+    """
+
+    stage = stages[name]
+    outputs = _outputs(cfg, stage)
+    missing = [k for k, v in outputs.items() if v is None]
+    if missing:
+        raise FileNotFoundError(f"setup stage {name} did not write {missing}")
+
+    keys[name] = key(cfg, stage, keys)
+
+    man = load(cfg["out_dir"])
+    man["stages"][name] = {"key": keys[name], "outputs": outputs}
+
+    file = Path(cfg["out_dir"]) / "inputs" / MANIFEST_NAME
+    file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = file.with_name(file.name + ".tmp")
+    tmp.write_text(json.dumps(man, indent=1, sort_keys=True))
+    os.replace(tmp, file)
+
+
+def run(
+    cfg: dict[str, T.Any],
+    stages: dict[str, Stage],
+    keys: dict[str, str],
+    stale: list[str],
+    xg: dict[str, T.Any],
+    *,
+    workers: int | None = None,
+    file: Path | None = None,
+) -> None:
+    """
+    build stages, each once the stages it comes after are built, recording each built.
+    Stages independent of each other are built concurrently in worker processes
+    sharing the grid.
+
+    If a stage fails, the stages coming after it are not built, other stages are,
+    and then the error of the first stage failed (in build order) is raised.
+
+    Parameters
+    ----------
+    cfg: dict
+        simulation parameters
+    stages: dict
+        name => stage
+    keys: dict
+        name => key of each stage, from plan()
+    stale: list of str
+        stages to build, from plan()
+    xg: dict
+        simulation grid
+    workers: int, optional
+        number of worker processes, default CPU count. 1 builds in this process.
+    file: pathlib.Path, optional
+        memory-map this file to share the grid instead of shared memory
+    """
+
+    after = {
+        n: set(stages[n]["after"] if "after" in stages[n] else stages[n]["deps"])
+        & set(stale)
+        for n in stale
+    }
+
+    pending = list(stale)
+    done: set[str] = set()
+    errors: dict[str, BaseException] = {}
+    # failed, or coming after a stage that failed
+    failed: set[str] = set()
+
+    def finish(name: str, err: BaseException | None) -> None:
+        if err is None:
+            record(cfg, stages, name, keys)
+            done.add(name)
+            return
+
+        logging.error(f"setup stage {name} failed: {err}")
+        errors[name] = err
+        failed.add(name)
+        # in build order, so stages after stages not built are also found
+        for n in list(pending):
+            if after[n] & failed:
+                pending.remove(n)
+                failed.add(n)
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(stale) <= 1:
+        while pending:
+            name = pending.pop(0)
+            try:
+                stages[name]["build"](cfg, xg)
+            except Exception as e:  # noqa: B902 collected and raised after other stages
+                finish(name, e)
+            else:
+                finish(name, None)
+    else:
+        running: dict[concurrent.futures.Future, str] = {}
+
+        with SharedGrid(xg, file=file) as sxg:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=min(workers, len(stale)),
+                initializer=_init_worker,
+                initargs=({"cfg": cfg, "xg": sxg},),
+            ) as pool:
+                while pending or running:
+                    for n in [n for n in pending if after[n] <= done]:
+                        pending.remove(n)
+                        running[pool.submit(_build, stages[n]["build"])] = n
+
+                    finished, _ = concurrent.futures.wait(
+                        running, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for fut in finished:
+                        finish(running.pop(fut), fut.exception())
+
+    if errors:
+        raise errors[next(n for n in stale if n in errors)]
+
+
+def _init_worker(state: dict[str, T.Any]) -> None:
+    _worker_state.update(state)
+
+
+def _build(func: T.Callable) -> None:
+    func(_worker_state["cfg"], _worker_state["xg"])
+
+
+def load(direc: Path) -> dict[str, T.Any]:
+    """manifest of the stages built for simulation directory direc"""
+
+    file = Path(direc).expanduser() / "inputs" / MANIFEST_NAME
+
+    try:
+        man = json.loads(file.read_text())
+    except (OSError, ValueError):
+        man = {}
+
+    if man.get("version") != VERSION:
+        man = {"version": VERSION, "stages": {}}
+
+    return man
+
+
+def key(cfg: dict[str, T.Any], stage: Stage, keys: dict[str, str]) -> str:
+    """
+    hash of the config values and files a stage reads and the keys of its dependencies
+    """
+
+    inputs = stage.get("inputs")
+    values = stage.get("values")
+
+    doc = {
+        "gemini3d": __version__,
+        "config": config_subset(cfg, stage["config"]),
+        "values": values(cfg) if values else {},
+        "deps": {d: keys[d] for d in stage["deps"]},
+        "inputs": {str(f): file_hash(f) for f in inputs(cfg)} if inputs else {},
+    }
+
+    text = json.dumps(doc, sort_keys=True, default=_canonical)
+
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def config_subset(cfg: dict[str, T.Any], names: T.Iterable[str]) -> dict[str, T.Any]:
+    """config keys in names, with "foo*" matching all keys starting with "foo" """
+
+    exact = {n for n in names if not n.endswith("*")}
+    prefix = tuple(n[:-1] for n in names if n.endswith("*"))
+
+    return {k: v for k, v in cfg.items() if k in exact or k.startswith(prefix)}
+
+
+def file_hash(path: Path) -> str | None:
+    """SHA-256 of a file, or of the names and contents of the files of a directory"""
+
+    path = Path(path).expanduser()
+
+    if path.is_dir():
+        h = hashlib.sha256()
+        for f in sorted(p for p in path.rglob("*") if p.is_file()):
+            h.update(f.relative_to(path).as_posix().encode())
+            h.update(str(file_hash(f)).encode())
+        return h.hexdigest()
+
+    if not path.is_file():
+        return None
+
+    h = hashlib.sha256()
+    with path.open("rb") as fid:
+        for block in iter(lambda: fid.read(2**20), b""):
+            h.update(block)
+
+    return h.hexdigest()
+
+
+def _outputs(cfg: dict[str, T.Any], stage: Stage) -> dict[str, T.Any]:
+    """size and modification time of each output, None if missing"""
+
+    return {k: _ident(Path(cfg[k])) if k in cfg else None for k in stage["outputs"]}
+
+
+def _ident(path: Path) -> T.Any:
+    if path.is_file():
+        st = path.stat()
+        return [st.st_size, st.st_mtime_ns]
+    if path.is_dir():
+        return {
+            f.relative_to(path).as_posix(): _ident(f)
+            for f in sorted(path.rglob("*"))
+            if f.is_file()
+        }
+
+    return None
+
+
+def _canonical(v: T.Any) -> T.Any:
+    """JSON value of config values that are not JSON types"""
+
+    if isinstance(v, (datetime, Path)):
+        return str(v)
+    if isinstance(v, timedelta):
+        return v.total_seconds()
+    if isinstance(v, (np.ndarray, np.generic)):
+        return v.tolist()
+    if isinstance(v, (set, frozenset)):
+        return sorted(v)
+
+    logging.debug(f"setup stage key: {type(v)} hashed by its str()")
+    return str(v)
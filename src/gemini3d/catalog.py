@@ -0,0 +1,218 @@
+"""
+catalog of a simulation run: frame times, files, output type and per-variable
+statistics, kept in a JSON file in the run directory so basic facts about a run
+don't need every data file to be opened.
+
+The catalog is built by scanning the frames in parallel, and on later builds only
+frames that are new or changed since are scanned.
+
+    python -m gemini3d.catalog path/to/sim
+"""
+
+from __future__ import annotations
+from pathlib import Path
+from datetime import datetime, timedelta
+import typing as T
+import argparse
+import concurrent.futures
+import json
+import logging
+import math
+import os
+
+import numpy as np
+
+from . import read
+from .hdf5 import cube as h5cube
+from .hdf5 import read as h5read
+
+CATALOG_NAME = "catalog.json"
+VERSION = 1
+
+# config and grid shared by worker processes, sent once per worker
+_worker_state: dict[str, T.Any] = {}
+
+
+def build(direc: Path, *, workers: int | None = None) -> dict[str, T.Any]:
+    """
+    scan the frames of a simulation and write its catalog file,
+    rescanning only frames new or changed since the catalog was last built.
+
+    Parameters
+    ----------
+    direc: pathlib.Path
+        simulation output directory
+    workers: int, optional
+        number of worker processes, default CPU count. 1 scans in this process.
+
+    Returns
+    -------
+    cat: dict
+        catalog, with "frames" a time-sorted list of per-frame dict
+    """
+
+    direc = Path(direc).expanduser()
+
+    cfg = read.config(direc)
+
+    old = {}
+    cat = load(direc)
+    if cat:
+        old = {e["time"]: e for e in cat["frames"]}
+
+    frames: dict[datetime, dict[str, T.Any]] = {}
+    jobs = []
+    for t in cfg["time"]:
+        try:
+            src = h5cube.source(direc, t)
+        except FileNotFoundError:
+            # not yet written
+            continue
+
+        ident = _ident(src)
+        e = old.get(t.isoformat())
+        if e and all(e.get(k) == v for k, v in ident.items()):
+            frames[t] = e
+        else:
+            jobs.append(t)
+
+    logging.info(f"cataloging {len(jobs)} of {len(jobs) + len(frames)} frames in {direc}")
+
+    state = {"cfg": cfg, "xg": read.grid(direc, var={"x1", "x2", "x3", "lx"})}
+    if workers == 1 or len(jobs) <= 1:
+        _init_worker(state)
+        frames.update({t: _scan(direc, t) for t in jobs})
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(state,)
+        ) as pool:
+            frames.update(zip(jobs, pool.map(_scan, [direc] * len(jobs), jobs)))
+
+    cat = {"version": VERSION, "frames": [frames[t] for t in sorted(frames)]}
+
+    file = direc / CATALOG_NAME
+    tmp = file.with_name(file.name + ".tmp")
+    tmp.write_text(json.dumps(cat, indent=1))
+    os.replace(tmp, file)
+
+    return cat
+
+
+def load(direc: Path) -> dict[str, T.Any] | None:
+    """
+    catalog as of its last build, or None if the simulation has no catalog
+    """
+
+    file = Path(direc).expanduser() / CATALOG_NAME
+
+    try:
+        cat = json.loads(file.read_text())
+    except (OSError, ValueError):
+        return None
+
+    if cat.get("version") != VERSION:
+        return None
+
+    return cat
+
+
+def times(cat: dict[str, T.Any]) -> list[datetime]:
+    """times of the cataloged frames"""
+
+    return [datetime.fromisoformat(e["time"]) for e in cat["frames"]]
+
+
+def limits(cat: dict[str, T.Any]) -> dict[str, tuple[float, float]]:
+    """(min, max) of each variable over all cataloged frames, e.g. for plot color limits"""
+
+    lim: dict[str, tuple[float, float]] = {}
+    for e in cat["frames"]:
+        for k, s in e["vars"].items():
+            if s["min"] is None:
+                continue
+            lo, hi = lim.get(k, (math.inf, -math.inf))
+            lim[k] = (min(lo, s["min"]), max(hi, s["max"]))
+
+    return lim
+
+
+def missing(new: dict[str, T.Any], ref: dict[str, T.Any]) -> list[datetime]:
+    """times of catalog new without a frame within 1 second in catalog ref"""
+
+    ref_times = times(ref)
+
+    return [
+        t
+        for t in times(new)
+        if not any(abs(t - r) <= timedelta(seconds=1) for r in ref_times)
+    ]
+
+
+def stats(a: np.ndarray) -> dict[str, T.Any]:
+    """shape, min, max, mean and count of NaN of an array; None if all NaN"""
+
+    a = np.asarray(a)
+    nan = int(np.isnan(a).sum())
+
+    s: dict[str, T.Any] = {"shape": list(a.shape), "nan": nan}
+    if nan == a.size:
+        s.update({"min": None, "max": None, "mean": None})
+    else:
+        s["min"] = float(np.nanmin(a))
+        s["max"] = float(np.nanmax(a))
+        s["mean"] = float(np.nanmean(a, dtype=np.float64))
+
+    return s
+
+
+def _ident(src: h5cube.Source) -> dict[str, T.Any]:
+    """what identifies the data of a frame: a frame is rescanned if this changes"""
+
+    file = src[0] if isinstance(src, tuple) else src
+    st = file.stat()
+
+    ident = {"file": file.name, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if isinstance(src, tuple):
+        ident["index"] = src[1]
+
+    return ident
+
+
+def _init_worker(state: dict[str, T.Any]) -> None:
+    _worker_state.update(state)
+
+
+def _scan(direc: Path, time: datetime) -> dict[str, T.Any]:
+    cfg = _worker_state["cfg"]
+
+    src = h5cube.source(direc, time)
+    with h5cube.open_source(src) as f:
+        flag = h5read.flagoutput(f, cfg)
+
+    dat = read.frame(direc, time, cfg=cfg, xg=_worker_state["xg"])
+
+    return {
+        "time": time.isoformat(),
+        **_ident(src),
+        "flagoutput": flag,
+        "vars": {str(k): stats(dat[k].values) for k in dat.data_vars},
+    }
+
+
+def cli():
+    p = argparse.ArgumentParser(description="catalog simulation output frames")
+    p.add_argument("direc", help="simulation output directory")
+    p.add_argument("-j", "--workers", help="number of worker processes", type=int)
+    p.add_argument("-v", "--verbose", action="store_true")
+    P = p.parse_args()
+
+    level = logging.INFO if P.verbose else logging.WARNING
+    logging.basicConfig(format="%(message)s", level=level)
+
+    cat = build(P.direc, workers=P.workers)
+
+    print(f"{len(cat['frames'])} frames cataloged in {Path(P.direc) / CATALOG_NAME}")
+
+
+if __name__ == "__main__":
+    cli()
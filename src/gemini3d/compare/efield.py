@@ -8,7 +8,7 @@ import numpy as np
 from .utils import err_pct, load_tol
 from .plot import plotdiff
 from ..efield import get_times as efield_times
-from .. import read, find
+from .. import read
 
 
 def compare_Efield(
@@ -31,12 +31,19 @@ def compare_Efield(
 
     efield_errs = 0
 
-    for t in efield_times(ref_cfg):
-        ref = read.Efield(find.frame(ref_dir, t))
-        new = read.Efield(find.frame(new_dir, t))
+    times = efield_times(ref_cfg)
+    ref = read.Efield_series(ref_dir, times)
+    new = read.Efield_series(new_dir, times)
+    for d in (ref, new):
+        if d.time.size != len(times):
+            raise FileNotFoundError(
+                f"missing E-field input times in {d.attrs['filename']}"
+            )
+
+    for i, t in enumerate(times):
         for k in {"Exit", "Eyit", "Vminx1it", "Vmaxx1it"}:
-            b = ref[k]
-            a = new[k]
+            b = ref[k][i]
+            a = new[k][i]
 
             assert a.shape == b.shape, f"{k}: ref shape {b.shape} != data shape {a.shape}"
 
@@ -1,5 +1,6 @@
 from __future__ import annotations
 from pathlib import Path
+from datetime import timedelta
 import logging
 
 import xarray
@@ -8,6 +9,7 @@ import numpy as np
 from .plot import plotdiff
 from .utils import err_pct, load_tol
 from .. import read
+from .. import catalog
 
 
 def compare_output(
@@ -34,12 +36,28 @@ def compare_output(
     if tol is None:
         tol = load_tol()
 
-    for i, t in enumerate(params["time"]):
+    # a catalog of either simulation shows missing frames without reading data
+    for direc in (new_dir, ref_dir):
+        cat = catalog.load(direc)
+        if not cat:
+            continue
+        have = catalog.times(cat)
+        miss = [
+            t
+            for t in params["time"]
+            if not any(abs(t - c) <= timedelta(seconds=1) for c in have)
+        ]
+        if miss:
+            raise FileNotFoundError(f"{direc} does not contain data at {miss}")
+
+    # read the next frames of both simulations while comparing
+    frames = zip(
+        read.iter_frames(new_dir, cfg=params),
+        read.iter_frames(ref_dir, times=params["time"]),
+    )
+
+    for i, (t, (A, B)) in enumerate(zip(params["time"], frames)):
         st = f"UTsec {t}"
-        A = read.frame(new_dir, t)
-        if not A:
-            raise FileNotFoundError(f"{new_dir} does not appear to contain data at {t}")
-        B = read.frame(ref_dir, t)
 
         names = ["ne", "v1", "v2", "v3", "Ti", "Te", "J1", "J2", "J3"]
         itols = ["N", "V", "V", "V", "T", "T", "J", "J", "J"]
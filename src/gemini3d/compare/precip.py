@@ -7,7 +7,7 @@ import numpy as np
 
 from .plot import plotdiff
 from .utils import err_pct, load_tol
-from .. import read, find
+from .. import read
 from ..particles import get_times as precip_times
 
 
@@ -28,13 +28,19 @@ def compare_precip(
         tol = load_tol()
 
     # often we reuse precipitation inputs without copying over files
-    for t in precip_times(cfg):
-        ref = read.precip(find.frame(ref_dir, t))
-        new = read.precip(find.frame(new_dir, t))
-
-        for k in ref.keys():
-            b = ref[k]
-            a = new[k]
+    times = precip_times(cfg)
+    ref = read.precip_series(ref_dir, times)
+    new = read.precip_series(new_dir, times)
+    for d in (ref, new):
+        if d.time.size != len(times):
+            raise FileNotFoundError(
+                f"missing precipitation input times in {d.attrs['filename']}"
+            )
+
+    for i, t in enumerate(times):
+        for k in ref.data_vars:
+            b = ref[k][i]
+            a = new[k][i]
 
             assert a.shape == b.shape, f"{k}: ref shape {b.shape} != data shape {a.shape}"
 
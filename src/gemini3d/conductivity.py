@@ -19,9 +19,10 @@ def conductivity_reconstruct(time, dat, cfg, xg):
 
     # composition and extraction (or creation) of full state variables
     if "ns" in dat.keys():  # proxy for full state output file
-        ns = np.array(dat["ns"]).transpose((1, 2, 3, 0))
-        Ts = np.array(dat["Ts"]).transpose((1, 2, 3, 0))
-        vs1 = np.array(dat["vs1"]).transpose((1, 2, 3, 0))
+        # views, no copy: species arrays are read in Fortran order
+        ns = np.asarray(dat["ns"]).transpose((1, 2, 3, 0))
+        Ts = np.asarray(dat["Ts"]).transpose((1, 2, 3, 0))
+        vs1 = np.asarray(dat["vs1"]).transpose((1, 2, 3, 0))
     else:
         p = 1 / 2 + 1 / 2 * np.tanh((xg["alt"] - 220e3) / 20e3)
         shapevar = np.concatenate((xg["lx"][:], [7]))
@@ -1,6 +1,5 @@
 from __future__ import annotations
 import typing as T
-import re
 import os
 import math
 from pathlib import Path
@@ -38,30 +37,38 @@ def datetime_range(start: datetime, stop: datetime, step: timedelta) -> list[dat
     return [start + i * step for i in range((stop - start) // step + 1)]
 
 
+NAMELISTS = (
+    "base",
+    "files",
+    "flags",
+    "setup",
+    "neutral_BG",
+    "neutral_perturb",
+    "precip",
+    "precip_BG",
+    "efield",
+    "glow",
+)
+
+
 def read_nml(fn: Path) -> dict[str, T.Any]:
     """parse .nml file
     for now we don't use the f90nml package, though maybe we will in the future.
     Just trying to keep Python prereqs reduced for this simple parsing.
+
+    The file is read once for all namelists, and not again until it changes,
+    see namelist.read_all()
     """
 
     fn = find.config(fn)
 
     params = {"nml": fn}
 
-    for k in {
-        "base",
-        "files",
-        "flags",
-        "setup",
-        "neutral_BG",
-        "neutral_perturb",
-        "precip",
-        "precip_BG",
-        "efield",
-        "glow",
-    }:
-        if namelist_exists(fn, k):
-            params.update(parse_namelist(fn, k))
+    nmls = namelist.read_all(fn)
+
+    for k in NAMELISTS:
+        if k in nmls:
+            params.update(_parse(k, nmls[k]))
 
     return params
 
@@ -72,14 +79,7 @@ def namelist_exists(fn: Path, nml: str) -> bool:
     Does not check for proper format / syntax.
     """
 
-    pat = re.compile(r"^\s*&(" + nml + ")$")
-
-    with fn.open("rt") as f:
-        for line in f:
-            if pat.match(line) is not None:
-                return True
-
-    return False
+    return nml in namelist.read_all(fn)
 
 
 def parse_namelist(file: Path, nml: str) -> dict[str, T.Any]:
@@ -88,7 +88,11 @@ def parse_namelist(file: Path, nml: str) -> dict[str, T.Any]:
     Does not resolve absolute paths here because that assumes same machine
     """
 
-    r = namelist.read(file, nml)
+    return _parse(nml, namelist.read(file, nml))
+
+
+def _parse(nml: str, r: dict[str, T.Any]) -> dict[str, T.Any]:
+    """parse namelist nml values r"""
 
     P = {}
 
@@ -276,6 +280,7 @@ def parse_setup(r: dict[str, T.Any]) -> dict[str, T.Any]:
             "lp",
             "lphi",
             "gridflag",
+            "grid_slab",
             "Efield_llon",
             "Efield_llat",
             "precip_llon",
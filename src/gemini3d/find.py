@@ -9,8 +9,9 @@ import shutil
 import os
 import subprocess
 import logging
-
-import numpy as np
+import json
+import bisect
+import time as timer
 
 from .utils import filename2datetime
 from . import wsl
@@ -26,6 +27,16 @@ EXE_PATHS = [
     "build/Debug",
 ]
 
+FRAME_INDEX_NAME = ".frame_index.json"
+# a directory listed less than a timestamp tick after its last modification may since
+# have files created in the same tick, not changing its mtime [ns]:
+# the kernel clock tick, or 2 s for filesystems with whole-second times e.g. FAT
+MTIME_TICK_NS = 10**7
+MTIME_TICK_COARSE_NS = 2 * 10**9
+
+# (directory, suffix) => (directory mtime, scan time, times, files)
+_frame_index: dict[tuple[Path, str], tuple[int, int, list[datetime], list[Path]]] = {}
+
 
 def config(path: Path) -> Path:
     """given a path or config filename, return the full path to config file"""
@@ -141,23 +152,181 @@ def frame(simdir: Path, time: datetime) -> Path:
     MAX_OFFSET = timedelta(
         seconds=1
     )  # 10 ms precision, allow extra accumulated tolerance
-    pat = time.strftime("%Y%m%d") + "_*"
 
-    file_times = []
-    files = list(simdir.glob(pat + suffix))
-    for fn in files:
-        file_times.append(filename2datetime(fn))
+    for refresh in (False, True):
+        # a miss rescans only if a new file may not have changed the directory mtime
+        file_times, files = frame_index(simdir, suffix, refresh=refresh)
+        if file_times:
+            i = bisect.bisect_left(file_times, time)
+            i = min(
+                (j for j in (i - 1, i) if 0 <= j < len(file_times)),
+                key=lambda j: abs(file_times[j] - time),
+            )
 
-    if file_times:
-        afile_times = np.array(file_times)
-        i = abs(afile_times - time).argmin()  # type: ignore
-
-        if abs(afile_times[i] - time) <= MAX_OFFSET:
-            return files[i]
+            if abs(file_times[i] - time) <= MAX_OFFSET:
+                return files[i]
 
     raise FileNotFoundError(f"{stem}{suffix} not found in {simdir}")
 
 
+def frame_index(
+    simdir: Path,
+    suffix: str = ".h5",
+    *,
+    persist: bool | None = None,
+    refresh: bool = False,
+) -> tuple[list[datetime], list[Path]]:
+    """
+    time-sorted frame times and filenames in a directory.
+
+    The index is kept in memory until the directory modification time changes,
+    so repeated lookups don't rescan the directory.
+    With persist=True it is also saved in the directory as FRAME_INDEX_NAME,
+    so new processes can skip the directory scan as well.
+
+    Parameters
+    ----------
+    simdir: pathlib.Path
+        directory with files named like YYYYMMDD_SSSSS.ffffff.h5
+    suffix: str
+        file suffix of frames
+    persist: bool, optional
+        use on-disk index. Default is environment variable GEMINI_FRAME_INDEX
+    refresh: bool
+        rescan directory if the index is current by mtime, but was listed within
+        a timestamp tick of the directory mtime so a file created since may be missing
+
+    Returns
+    -------
+    times: list of datetime.datetime
+        sorted frame times
+    files: list of pathlib.Path
+        filename of each time
+    """
+
+    simdir = Path(simdir).expanduser()
+
+    try:
+        mtime = simdir.stat().st_mtime_ns
+    except OSError:
+        return [], []
+
+    key = (simdir.absolute(), suffix)
+
+    e = _frame_index.get(key)
+    if e is not None and e[0] == mtime and not (refresh and _racy(e[0], e[1])):
+        return e[2], e[3]
+
+    if persist is None:
+        persist = os.environ.get("GEMINI_FRAME_INDEX", "").lower() in {"1", "on", "true"}
+
+    index_file = simdir / FRAME_INDEX_NAME
+    names = None
+    scanned = 0
+    if persist and (e is None or e[0] != mtime):
+        idx = _read_frame_index(index_file, mtime, suffix)
+        if idx is not None and not (refresh and _racy(mtime, idx[1])):
+            names, scanned = idx
+
+    scan = names is None
+    if names is None:
+        if refresh:
+            mtime = _settle(simdir, mtime)
+        scanned = timer.time_ns()
+        names = [d.name for d in os.scandir(simdir) if d.name.endswith(suffix)]
+
+    frames = []
+    for name in names:
+        try:
+            frames.append((filename2datetime(name), name))
+        except ValueError:
+            # not a frame e.g. simgrid.h5
+            continue
+    frames.sort()
+
+    times = [t for t, _ in frames]
+    files = [simdir / n for _, n in frames]
+
+    # a refresh finding no new frames leaves the on-disk index as it is
+    if scan and persist and not (refresh and e is not None and e[3] == files):
+        mtime = _write_frame_index(index_file, names, suffix, mtime, scanned)
+
+    _frame_index[key] = (mtime, scanned, times, files)
+
+    return times, files
+
+
+def _racy(mtime: int, scanned: int) -> bool:
+    """whether a listing at time scanned may miss files despite directory mtime"""
+
+    tick = MTIME_TICK_COARSE_NS if mtime % 10**9 == 0 else MTIME_TICK_NS
+
+    return scanned - mtime < tick
+
+
+def _settle(simdir: Path, mtime: int) -> int:
+    """
+    wait until a kernel clock tick has passed since directory mtime, so a listing then
+    has every file not changing its mtime and misses need not rescan it again.
+    Returns the directory mtime after waiting.
+    """
+
+    wait = mtime + MTIME_TICK_NS - timer.time_ns()
+    if mtime % 10**9 == 0 or wait <= 0:
+        return mtime
+
+    timer.sleep(wait / 1e9)
+
+    return simdir.stat().st_mtime_ns
+
+
+def _read_frame_index(
+    file: Path, mtime: int, suffix: str
+) -> tuple[list[str], int] | None:
+    """read on-disk frame index and its scan time if it is current"""
+
+    try:
+        idx = json.loads(file.read_text())
+    except (OSError, ValueError):
+        return None
+
+    if idx.get("mtime_ns") != mtime or idx.get("suffix") != suffix:
+        return None
+
+    return idx["names"], idx.get("scanned_ns", 0)
+
+
+def _write_frame_index(
+    file: Path, names: list[str], suffix: str, mtime: int, scanned: int
+) -> int:
+    """
+    write on-disk frame index, returning the directory mtime it is valid for.
+    Creating the index file changes the directory mtime, so the file is then
+    rewritten in place, which does not change the directory mtime.
+    """
+
+    try:
+        for _ in range(2):
+            file.write_text(
+                json.dumps(
+                    {
+                        "mtime_ns": mtime,
+                        "scanned_ns": scanned,
+                        "suffix": suffix,
+                        "names": names,
+                    }
+                )
+            )
+            new = file.parent.stat().st_mtime_ns
+            if new == mtime:
+                break
+            mtime = new
+    except OSError as e:
+        logging.debug(f"could not write frame index {file}: {e}")
+
+    return mtime
+
+
 def grid(path: Path) -> Path:
     """given a path or filename, return the full path to simgrid file"""
 
@@ -11,6 +11,7 @@ import numpy as np
 from .. import read
 from ..coord import geog2geomag, geomag2geog
 from .uniform import altitude_grid, grid1d
+from .slab import Slab, collect, ranges
 
 
 def cart3d(p: dict[str, T.Any]) -> dict[str, T.Any]:
@@ -29,6 +30,32 @@ def cart3d(p: dict[str, T.Any]) -> dict[str, T.Any]:
         simulation grid
     """
 
+    return collect(*cart3d_slabs(p, None))
+
+
+def cart3d_slabs(
+    p: dict[str, T.Any], slab: int | None = 0
+) -> tuple[dict[str, T.Any], T.Iterator[Slab]]:
+    """make cartesian grid in x3 slabs, see gemini3d.grid.slab
+
+    Parameters
+    -----------
+
+    p: dict
+        simulation parameters
+    slab: int, optional
+        x3 indices per slab, 0 for a size of about gemini3d.grid.slab.SLAB_BYTES,
+        None for the whole grid in one slab
+
+    Returns
+    -------
+
+    header: dict
+        grid size, 1-D coordinates and grid center
+    slabs: iterator of dict
+        3-D and 4-D grid variables by x3 range
+    """
+
     # %%create altitude grid
     # original Matlab params
     # p.alt_min = 80e3;
@@ -83,16 +110,113 @@ def cart3d(p: dict[str, T.Any]) -> dict[str, T.Any]:
     zi[0] = z[0] - 1 / 2 * (z[1] - z[0])
     zi[-1] = z[-1] + 1 / 2 * (z[-1] - z[-2])
 
+    print("Grid size:  ", lx1, "x", lx2, "x", lx3)
+
+    # %% STORE RESULTS IN GRID DATA STRUCTURE
+    xg = {
+        "x1": z,
+        "x2": x,
+        "x3": y,
+        "x1i": zi,
+        "x2i": xi,
+        "x3i": yi,
+    }
+
+    lx = (xg["x1"].size, xg["x2"].size, xg["x3"].size)
+    xg["lx"] = np.array(lx)
+
+    xg["dx1f"] = np.append(xg["x1"][1:] - xg["x1"][:-1], xg["x1"][-1] - xg["x1"][-2])
+    # FWD DIFF
+    xg["dx1b"] = np.insert(xg["x1"][1:] - xg["x1"][:-1], 0, xg["x1"][1] - xg["x1"][0])
+    # BACK DIFF
+    xg["dx1h"] = xg["x1i"][1:-1] - xg["x1i"][:-2]
+    # MIDPOINT DIFFS
+
+    xg["dx2f"] = np.append(xg["x2"][1:] - xg["x2"][:-1], xg["x2"][-1] - xg["x2"][-2])
+    # FWD DIFF
+    xg["dx2b"] = np.insert(xg["x2"][1:] - xg["x2"][:-1], 0, xg["x2"][1] - xg["x2"][0])
+    # BACK DIFF
+    xg["dx2h"] = xg["x2i"][1:-1] - xg["x2i"][:-2]
+    # MIDPOINT DIFFS
+
+    xg["dx3f"] = np.append(xg["x3"][1:] - xg["x3"][:-1], xg["x3"][-1] - xg["x3"][-2])
+    # FWD DIFF
+    xg["dx3b"] = np.insert(xg["x3"][1:] - xg["x3"][:-1], 0, xg["x3"][1] - xg["x3"][0])
+    # BACK DIFF
+    xg["dx3h"] = xg["x3i"][1:-1] - xg["x3i"][:-2]
+    # MIDPOINT DIFFS
+
+    # %% TRIM DATA STRUCTURE TO BE THE SIZE FORTRAN EXPECTS
+    # the 3-D variables are generated sans ghost cells, except h1, h2, h3
+
+    # indices corresponding to non-ghost cells for 1 dimension
+    i1 = slice(2, lx[0] - 2)
+    i2 = slice(2, lx[1] - 2)
+    i3 = slice(2, lx[2] - 2)
+
+    # any dx variable will not need to first element (backward diff of two ghost cells)
+    idx1 = slice(1, lx[0])
+    idx2 = slice(1, lx[1])
+    idx3 = slice(1, lx[2])
+
+    # x1-interface variables need only non-ghost cell values (left interface) plus one
+    ix1i = slice(2, lx[0] - 1)
+    ix2i = slice(2, lx[1] - 1)
+    ix3i = slice(2, lx[2] - 1)
+
+    # remove ghost cells
+    # now that indices have been define we can go ahead and make this change
+    xg["lx"] = xg["lx"] - 4
+
+    xg["dx1b"] = xg["dx1b"][idx1]
+    xg["dx2b"] = xg["dx2b"][idx2]
+    xg["dx3b"] = xg["dx3b"][idx3]
+
+    xg["x1i"] = xg["x1i"][ix1i]
+    xg["x2i"] = xg["x2i"][ix2i]
+    xg["x3i"] = xg["x3i"][ix3i]
+
+    xg["dx1h"] = xg["dx1h"][i1]
+    xg["dx2h"] = xg["dx2h"][i2]
+    xg["dx3h"] = xg["dx3h"][i3]
+
+    xg["glonctr"] = p["glon"]
+    xg["glatctr"] = p["glat"]
+
+    n1, n2, n3 = (int(n) for n in xg["lx"])
+
+    return xg, (
+        _cart_slab(p, z[i1], x[i2], y, a, b) for a, b in ranges(n3, slab, n1 * n2)
+    )
+
+
+def _cart_slab(
+    p: dict[str, T.Any], z: np.ndarray, x: np.ndarray, y: np.ndarray, a: int, b: int
+) -> Slab:
+    """
+    3-D and 4-D variables at x3 indices [a, b) sans ghost cells.
+    z, x are sans ghost cells, y with ghost cells.
+    """
+
+    n1 = z.size
+    n2 = x.size
+    n3 = y.size - 4
+    n = b - a
+    lx = (n1, n2, n)
+
+    # ghost cells of the variables that have them, at the ends of the grid
+    ga = 0 if a == 0 else a + 2
+    gb = n3 + 4 if b == n3 else b + 2
+    # one more x3 interface at the end of the grid
+    nx3i = n + 1 if b == n3 else n
+
     # %% GRAVITATIONAL FIELD COMPONENTS IN DIPOLE SYSTEM
     Re = 6370e3
     G = 6.67428e-11
     Me = 5.9722e24
     r = z + Re
     g = G * Me / r**2
-    gz = np.broadcast_to(-g[:, None, None], (g.size, lx2, lx3))
-    assert gz.shape == (lx1, lx2, lx3)
-
-    print("Grid size:  ", lx1, "x", lx2, "x", lx3)
+    gz = np.broadcast_to(-g[:, None, None], lx)
 
     # DISTANCE EW AND NS (FROM ENU (or UEN in our case - cyclic permuted) COORD. SYSTEM)
     # #NEED TO BE CONVERTED TO DIPOLE SPHERICAL AND THEN
@@ -103,24 +227,21 @@ def cart3d(p: dict[str, T.Any]) -> dict[str, T.Any]:
 
     # %% Center of earth distance
     r = Re + z
-    r = np.broadcast_to(r[:, None, None], (r.size, lx2, lx3))
-    assert r.shape == (lx1, lx2, lx3)
+    r = np.broadcast_to(r[:, None, None], lx)
 
     # %% Northward angular distance
-    gamma2 = y / Re
+    gamma2 = y[a + 2 : b + 2] / Re
     # must retain the sign of x3
     theta = thetactr - gamma2
     # minus because distance north is against theta's direction
-    theta = np.broadcast_to(theta[None, None, :], (lx1, lx2, theta.size))
-    assert theta.shape == (lx1, lx2, lx3)
+    theta = np.broadcast_to(theta[None, None, :], lx)
 
     # %% Eastward angular distance
     # gamma1=x/Re;     %must retain the sign of x2
     gamma1 = x / Re / np.sin(thetactr)
     # must retain the sign of x2, just use theta of center of grid
     phi = phictr + gamma1
-    phi = np.broadcast_to(phi[None, :, None], (lx1, phi.size, lx3))
-    assert phi.shape == (lx1, lx2, lx3)
+    phi = np.broadcast_to(phi[None, :, None], lx)
 
     # %% COMPUTE THE GEOGRAPHIC COORDINATES OF EACH GRID POINT
     glatgrid, glongrid = geomag2geog(theta, phi)
@@ -131,7 +252,7 @@ def cart3d(p: dict[str, T.Any]) -> dict[str, T.Any]:
     zECEF = r * np.cos(theta)
 
     # %% COMPUTE SPHERICAL ECEF UNIT VECTORS - CARTESIAN-ECEF COMPONENTS
-    er = np.empty((lx1, lx2, lx3, 3))
+    er = np.empty((*lx, 3))
     etheta = np.empty_like(er)
     ephi = np.empty_like(er)
 
@@ -156,172 +277,52 @@ def cart3d(p: dict[str, T.Any]) -> dict[str, T.Any]:
     e3 = -etheta
     # etheta is positive south, e3 is pos. north
 
-    # %% STORE RESULTS IN GRID DATA STRUCTURE
-    xg = {
-        "x1": z,
-        "x2": x,
-        "x3": y,
-        "x1i": zi,
-        "x2i": xi,
-        "x3i": yi,
-    }
-
-    lx = (xg["x1"].size, xg["x2"].size, xg["x3"].size)
-    xg["lx"] = np.array(lx)
+    s: Slab = {}
 
-    xg["dx1f"] = np.append(xg["x1"][1:] - xg["x1"][:-1], xg["x1"][-1] - xg["x1"][-2])
-    # FWD DIFF
-    xg["dx1b"] = np.insert(xg["x1"][1:] - xg["x1"][:-1], 0, xg["x1"][1] - xg["x1"][0])
-    # BACK DIFF
-    xg["dx1h"] = xg["x1i"][1:-1] - xg["x1i"][:-2]
-    # MIDPOINT DIFFS
-
-    xg["dx2f"] = np.append(xg["x2"][1:] - xg["x2"][:-1], xg["x2"][-1] - xg["x2"][-2])
-    # FWD DIFF
-    xg["dx2b"] = np.insert(xg["x2"][1:] - xg["x2"][:-1], 0, xg["x2"][1] - xg["x2"][0])
-    # BACK DIFF
-    xg["dx2h"] = xg["x2i"][1:-1] - xg["x2i"][:-2]
-    # MIDPOINT DIFFS
-
-    xg["dx3f"] = np.append(xg["x3"][1:] - xg["x3"][:-1], xg["x3"][-1] - xg["x3"][-2])
-    # FWD DIFF
-    xg["dx3b"] = np.insert(xg["x3"][1:] - xg["x3"][:-1], 0, xg["x3"][1] - xg["x3"][0])
-    # BACK DIFF
-    xg["dx3h"] = xg["x3i"][1:-1] - xg["x3i"][:-2]
-    # MIDPOINT DIFFS
-
-    xg["h1"] = np.ones(lx)
-    xg["h2"] = np.ones(lx)
-    xg["h3"] = np.ones(lx)
-    xg["h1x1i"] = np.ones((lx[0] + 1, lx[1], lx[2]))
-    xg["h2x1i"] = np.ones((lx[0] + 1, lx[1], lx[2]))
-    xg["h3x1i"] = np.ones((lx[0] + 1, lx[1], lx[2]))
-    xg["h1x2i"] = np.ones((lx[0], lx[1] + 1, lx[2]))
-    xg["h2x2i"] = np.ones((lx[0], lx[1] + 1, lx[2]))
-    xg["h3x2i"] = np.ones((lx[0], lx[1] + 1, lx[2]))
-    xg["h1x3i"] = np.ones((lx[0], lx[1], lx[2] + 1))
-    xg["h2x3i"] = np.ones((lx[0], lx[1], lx[2] + 1))
-    xg["h3x3i"] = np.ones((lx[0], lx[1], lx[2] + 1))
+    for k in ("h1", "h2", "h3"):
+        s[k] = (ga, np.ones((n1 + 4, n2 + 4, gb - ga)))
+    for k in ("h1x1i", "h2x1i", "h3x1i"):
+        s[k] = (a, np.ones((n1 + 1, n2, n)))
+    for k in ("h1x2i", "h2x2i", "h3x2i"):
+        s[k] = (a, np.ones((n1, n2 + 1, n)))
+    for k in ("h1x3i", "h2x3i", "h3x3i"):
+        s[k] = (a, np.ones((n1, n2, nx3i)))
 
     # %% Cartesian, ECEF representation of curvilinar coordinates
-    xg["e1"] = e1
-    xg["e2"] = e2
-    xg["e3"] = e3
+    s["e1"] = (a, e1)
+    s["e2"] = (a, e2)
+    s["e3"] = (a, e3)
 
     # %% ECEF spherical coordinates
-    xg["r"] = r
-    xg["theta"] = theta
-    xg["phi"] = phi
-    # xg.rx1i=[]; xg.thetax1i=[];
-    # xg.rx2i=[]; xg.thetax2i=[];
+    s["r"] = (a, r)
+    s["theta"] = (a, theta)
+    s["phi"] = (a, phi)
 
     # %% These are cartesian representations of the ECEF, spherical unit vectors
-    xg["er"] = er
-    xg["etheta"] = etheta
-    xg["ephi"] = ephi
+    s["er"] = (a, er)
+    s["etheta"] = (a, etheta)
+    s["ephi"] = (a, ephi)
 
-    xg["I"] = np.broadcast_to(p["Bincl"], (lx2, lx3))
+    s["I"] = (a, np.broadcast_to(p["Bincl"], (n2, n)))
 
     # %% Cartesian ECEF coordinates
-    xg["x"] = xECEF
-    xg["z"] = zECEF
-    xg["y"] = yECEF
-    xg["alt"] = xg["r"] - Re
+    s["x"] = (a, xECEF)
+    s["z"] = (a, zECEF)
+    s["y"] = (a, yECEF)
+    s["alt"] = (a, r - Re)
     # since we need a 3D array use xg.r here...
 
-    xg["gx1"] = gz
-    xg["gx2"] = np.zeros(lx)
-    xg["gx3"] = np.zeros(lx)
+    s["gx1"] = (a, gz)
+    s["gx2"] = (a, np.zeros(lx))
+    s["gx3"] = (a, np.zeros(lx))
 
-    xg["Bmag"] = np.broadcast_to(-50000e-9, xg["lx"])
+    s["Bmag"] = (a, np.broadcast_to(-50000e-9, lx))
     # minus for northern hemisphere...
 
-    xg["glat"] = glatgrid
-    xg["glon"] = glongrid
-
-    # xg['xp']=x; xg['zp']=z;
+    s["glat"] = (a, glatgrid)
+    s["glon"] = (a, glongrid)
 
     # xg['inull']=[];
-    xg["nullpts"] = np.zeros(lx)
-
-    # %% TRIM DATA STRUCTURE TO BE THE SIZE FORTRAN EXPECTS
-    # note: xgf is xg == True
-    xgf = xg
-
-    # indices corresponding to non-ghost cells for 1 dimension
-    i1 = slice(2, lx[0] - 2)
-    i2 = slice(2, lx[1] - 2)
-    i3 = slice(2, lx[2] - 2)
-
-    # any dx variable will not need to first element (backward diff of two ghost cells)
-    idx1 = slice(1, lx[0])
-    idx2 = slice(1, lx[1])
-    idx3 = slice(1, lx[2])
-
-    # x1-interface variables need only non-ghost cell values (left interface) plus one
-    ix1i = slice(2, lx[0] - 1)
-    ix2i = slice(2, lx[1] - 1)
-    ix3i = slice(2, lx[2] - 1)
-
-    # remove ghost cells
-    # now that indices have been define we can go ahead and make this change
-    xgf["lx"] = xgf["lx"] - 4
-
-    xgf["dx1b"] = xgf["dx1b"][idx1]
-    xgf["dx2b"] = xgf["dx2b"][idx2]
-    xgf["dx3b"] = xgf["dx3b"][idx3]
-
-    xgf["x1i"] = xgf["x1i"][ix1i]
-    xgf["x2i"] = xgf["x2i"][ix2i]
-    xgf["x3i"] = xgf["x3i"][ix3i]
-
-    xgf["dx1h"] = xgf["dx1h"][i1]
-    xgf["dx2h"] = xgf["dx2h"][i2]
-    xgf["dx3h"] = xgf["dx3h"][i3]
-
-    xgf["h1x1i"] = xgf["h1x1i"][ix1i, i2, i3]
-    xgf["h2x1i"] = xgf["h2x1i"][ix1i, i2, i3]
-    xgf["h3x1i"] = xgf["h3x1i"][ix1i, i2, i3]
-
-    xgf["h1x2i"] = xgf["h1x2i"][i1, ix2i, i3]
-    xgf["h2x2i"] = xgf["h2x2i"][i1, ix2i, i3]
-    xgf["h3x2i"] = xgf["h3x2i"][i1, ix2i, i3]
-
-    xgf["h1x3i"] = xgf["h1x3i"][i1, i2, ix3i]
-    xgf["h2x3i"] = xgf["h2x3i"][i1, i2, ix3i]
-    xgf["h3x3i"] = xgf["h3x3i"][i1, i2, ix3i]
-
-    xgf["gx1"] = xgf["gx1"][i1, i2, i3]
-    xgf["gx2"] = xgf["gx2"][i1, i2, i3]
-    xgf["gx3"] = xgf["gx3"][i1, i2, i3]
-
-    xgf["glat"] = xgf["glat"][i1, i2, i3]
-    xgf["glon"] = xgf["glon"][i1, i2, i3]
-    xgf["alt"] = xgf["alt"][i1, i2, i3]
-
-    xgf["Bmag"] = xgf["Bmag"][i1, i2, i3]
-
-    xgf["I"] = xgf["I"][i2, i3]
-
-    xgf["nullpts"] = xgf["nullpts"][i1, i2, i3]
-
-    xgf["e1"] = xgf["e1"][i1, i2, i3, :]
-    xgf["e2"] = xgf["e2"][i1, i2, i3, :]
-    xgf["e3"] = xgf["e3"][i1, i2, i3, :]
-
-    xgf["er"] = xgf["er"][i1, i2, i3, :]
-    xgf["etheta"] = xgf["etheta"][i1, i2, i3, :]
-    xgf["ephi"] = xgf["ephi"][i1, i2, i3, :]
-
-    xgf["r"] = xgf["r"][i1, i2, i3]
-    xgf["theta"] = xgf["theta"][i1, i2, i3]
-    xgf["phi"] = xgf["phi"][i1, i2, i3]
-
-    xgf["x"] = xgf["x"][i1, i2, i3]
-    xgf["y"] = xgf["y"][i1, i2, i3]
-    xgf["z"] = xgf["z"][i1, i2, i3]
-
-    xgf["glonctr"] = p["glon"]
-    xgf["glatctr"] = p["glat"]
+    s["nullpts"] = (a, np.zeros(lx))
 
-    return xgf
+    return s
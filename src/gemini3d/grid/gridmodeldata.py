@@ -12,6 +12,7 @@ from numpy import pi
 import scipy.interpolate
 
 from .convert import Re, geog2geomag
+from ..utils import get_dtype
 
 
 def model2magcoords(
@@ -23,12 +24,16 @@ def model2magcoords(
     altlims: tuple[float, float] | None = None,
     mlonlims: tuple[float, float] | None = None,
     mlatlims: tuple[float, float] | None = None,
+    dtype: str | None = None,
 ):
     """
     Grid the scalar GEMINI output data in parm onto a regular *geomagnetic* coordinates
     grid.  By default create a linearly spaced output grid based on
     user-provided limits (or grid limits).  Needs to be updated to deal with
     2D input grids; can interpolate from 3D grids to 2D slices.
+
+    dtype: "native" (same as parm), "float32" or "float64" of the gridded data,
+    default is the global policy, see gemini3d.utils.set_dtype
     """
 
     # convenience variables
@@ -50,7 +55,7 @@ def model2magcoords(
     mlati = np.linspace(mlatlims[0], mlatlims[1], llat)
     ALTi, MLONi, MLATi = np.meshgrid(alti, mloni, mlati, indexing="ij")
 
-    parmi = model2pointsgeomagcoords(xg, parm, ALTi, MLONi, MLATi)
+    parmi = model2pointsgeomagcoords(xg, parm, ALTi, MLONi, MLATi, dtype)
     parmi = parmi.reshape(lalt, llon, llat)
     return alti, mloni, mlati, parmi
 
@@ -65,12 +70,16 @@ def model2geogcoords(
     glonlims: tuple[float, float] | None = None,
     glatlims: tuple[float, float] | None = None,
     wraplon: bool = False,
+    dtype: str | None = None,
 ):
     """
     Grid the scalar GEMINI output data in parm onto a regular *geographic* coordinates
     grid.  By default create a linearly spaced output grid based on
     user-provided limits (or grid limits).  Needs to be updated to deal with
     2D input grids; can interpolate from 3D grids to 2D slices.
+
+    dtype: "native" (same as parm), "float32" or "float64" of the gridded data,
+    default is the global policy, see gemini3d.utils.set_dtype
     """
 
     # convenience variables
@@ -96,13 +105,13 @@ def model2geogcoords(
     glati = np.linspace(glatlims[0], glatlims[1], llat)
     ALTi, GLONi, GLATi = np.meshgrid(alti, gloni, glati, indexing="ij")
 
-    parmi = model2pointsgeogcoords(xg, parm, ALTi, GLONi, GLATi)
+    parmi = model2pointsgeogcoords(xg, parm, ALTi, GLONi, GLATi, dtype)
     parmi = parmi.reshape(lalt, llon, llat)
 
     return alti, gloni, glati, parmi
 
 
-def model2pointsgeomagcoords(xg, parm, alti, mloni, mlati):
+def model2pointsgeomagcoords(xg, parm, alti, mloni, mlati, dtype: str | None = None):
     """
     Take a flat list of points in geomagnetic coordinates and interpolate model data to these
       locations.
@@ -138,11 +147,13 @@ def model2pointsgeomagcoords(xg, parm, alti, mloni, mlati):
     else:
         raise ValueError("Unsupported grid type...")
 
-    parmi = interpmodeldata(xg, x1, x2, x3, parm, x1i, x2i, x3i)
+    parmi = interpmodeldata(xg, x1, x2, x3, parm, x1i, x2i, x3i, dtype)
     return parmi
 
 
-def model2pointsgeogcoords(xg: dict[str, T.Any], parm, alti, gloni, glati):
+def model2pointsgeogcoords(
+    xg: dict[str, T.Any], parm, alti, gloni, glati, dtype: str | None = None
+):
     """
     Take a set of target geographic coords and interpolate
         model data to these.
@@ -178,14 +189,88 @@ def model2pointsgeogcoords(xg: dict[str, T.Any], parm, alti, gloni, glati):
     else:
         raise ValueError("Unsupported grid type...")
 
-    parmi = interpmodeldata(xg, x1, x2, x3, parm, x1i, x2i, x3i)
+    parmi = interpmodeldata(xg, x1, x2, x3, parm, x1i, x2i, x3i, dtype)
     return parmi
 
 
-def interpmodeldata(xg, x1, x2, x3, parm, x1i, x2i, x3i):
+def geog2modelcoords(xg: dict[str, T.Any], alt, glon, glat) -> tuple:
+    """
+    Convert geographic coordinates to the model coordinates (x1, x2, x3) of grid xg:
+    dipole (q, p, phi) for curvilinear grids, else UEN relative to the grid center.
+    """
+
+    minh1 = xg["h1"].min()
+    maxh1 = xg["h1"].max()
+    if abs(minh1 - 1) > 1e-4 or abs(maxh1 - 1) > 1e-4:  # curvilinear, dipole
+        return geog2dipole(alt, glon, glat)
+
+    # cartesian: x2 = x3 = 0 is the grid center
+    if "glatctr" in xg:
+        ref_lat = float(np.squeeze(xg["glatctr"]))
+        ref_lon = float(np.squeeze(xg["glonctr"]))
+    else:
+        j2 = np.abs(xg["x2"][2:-2]).argmin()
+        j3 = np.abs(xg["x3"][2:-2]).argmin()
+        ref_lat = float(xg["glat"][0, j2, j3])
+        ref_lon = float(xg["glon"][0, j2, j3])
+
+    return geog2UENgeog(alt, glon, glat, ref_lat=ref_lat, ref_lon=ref_lon)
+
+
+def probe_weights(xg: dict[str, T.Any], alt, glon, glat) -> dict[str, np.ndarray]:
+    """
+    containing cells and trilinear interpolation weights of geographic points,
+    computed once per grid and point set so data can then be interpolated from
+    the 2x2x2 cell neighborhood of each point.
+
+    Parameters
+    ----------
+    xg: dict
+        grid with x1, x2, x3, lx, h1 and glatctr, glonctr (or glat, glon)
+    alt, glon, glat: float or numpy.ndarray
+        points: altitude [m], geographic longitude, latitude [deg]
+
+    Returns
+    -------
+    weights: dict
+        "index": (point, 3) lower corner cell index in (x1, x2, x3), without ghost cells
+        "frac": (point, 3) fractional position from the lower corner, in [0, 1]
+        "inside": (point,) True if the point is inside the grid
+    """
+
+    alt, glon, glat = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(a, dtype=np.float64)) for a in (alt, glon, glat))
+    )
+
+    xi = geog2modelcoords(xg, alt.ravel(), glon.ravel(), glat.ravel())
+    lx = xg["lx"]
+    Npt = alt.size
+
+    index = np.zeros((Npt, 3), dtype=int)
+    frac = np.zeros((Npt, 3))
+    inside = np.ones(Npt, dtype=bool)
+
+    for i in range(3):
+        # a singleton dimension (2-D simulation) has one cell and no interpolation
+        if lx[i] == 1:
+            continue
+
+        x = np.asarray(xg[f"x{i + 1}"][2:-2], dtype=np.float64)
+        j = np.clip(np.searchsorted(x, xi[i], side="right") - 1, 0, lx[i] - 2)
+        index[:, i] = j
+        frac[:, i] = (xi[i] - x[j]) / (x[j + 1] - x[j])
+        inside &= (xi[i] >= x[0]) & (xi[i] <= x[-1])
+
+    return {"index": index, "frac": frac, "inside": inside}
+
+
+def interpmodeldata(xg, x1, x2, x3, parm, x1i, x2i, x3i, dtype: str | None = None):
     """
     Take a set of target coordinates (in the model basis) and interpolate
         model data to these.
+
+    Interpolation is done in float64 as the target coordinates are float64,
+    and the result is returned as dtype policy (default global policy).
     """
 
     # count non singleton dimensions
@@ -205,7 +290,7 @@ def interpmodeldata(xg, x1, x2, x3, parm, x1i, x2i, x3i):
             xi=xi,
             method="linear",
             bounds_error=False,
-            fill_value=np.NaN,
+            fill_value=np.nan,
         )
     elif numdims == 2:
         coord1 = x1
@@ -226,13 +311,13 @@ def interpmodeldata(xg, x1, x2, x3, parm, x1i, x2i, x3i):
             xi=xi,
             method="linear",
             bounds_error=False,
-            fill_value=np.NaN,
+            fill_value=np.nan,
         )
     else:
         raise ValueError("Can only grid 2D or 3D data, check array dims...")
 
     # parmi = parmi.reshape(lalt, llon, llat)
-    return parmi
+    return parmi.astype(get_dtype(dtype) or parm.dtype, copy=False)
 
 
 def geomag2dipole(alt, mlon, mlat) -> tuple:
@@ -0,0 +1,99 @@
+"""
+grids generated in x3 slabs.
+
+A grid generator yields, slab by slab, the values of each 3-D and 4-D grid variable
+over a range of x3, so a grid too large for memory can be written as it is generated
+(gemini3d.write.grid_slabs) and the whole grid is the slabs put together (collect).
+"""
+
+from __future__ import annotations
+import typing as T
+
+import numpy as np
+
+# variable => (x3 start index of this variable, values)
+Slab = T.Dict[str, T.Tuple[int, np.ndarray]]
+
+SLAB_BYTES = 2**28  # default memory for one slab
+SLAB_ARRAYS = 64  # float64 x1-x2 planes per x3 index a slab holds, with temporaries
+
+
+def x3_axis(ndim: int) -> int:
+    """axis of x3 in a grid variable, e.g. 1 for I (x2, x3), 2 for (x1, x2, x3[, 3])"""
+
+    return 2 if ndim >= 3 else ndim - 1
+
+
+def shapes(lx: T.Sequence[int]) -> dict[str, tuple[int, ...]]:
+    """shape of each grid variable generated in slabs, given the grid size sans ghost cells"""
+
+    lx1, lx2, lx3 = (int(n) for n in lx)
+
+    s: dict[str, tuple[int, ...]] = {}
+    for i in (1, 2, 3):
+        s[f"h{i}"] = (lx1 + 4, lx2 + 4, lx3 + 4)
+        s[f"h{i}x1i"] = (lx1 + 1, lx2, lx3)
+        s[f"h{i}x2i"] = (lx1, lx2 + 1, lx3)
+        s[f"h{i}x3i"] = (lx1, lx2, lx3 + 1)
+
+    for k in (
+        "gx1",
+        "gx2",
+        "gx3",
+        "alt",
+        "glat",
+        "glon",
+        "Bmag",
+        "nullpts",
+        "r",
+        "theta",
+        "phi",
+        "x",
+        "y",
+        "z",
+    ):
+        s[k] = (lx1, lx2, lx3)
+
+    s["I"] = (lx2, lx3)
+
+    for k in ("e1", "e2", "e3", "er", "etheta", "ephi"):
+        s[k] = (lx1, lx2, lx3, 3)
+
+    return s
+
+
+def ranges(lx3: int, slab: int | None, plane: int) -> list[tuple[int, int]]:
+    """
+    x3 index ranges (sans ghost cells) of the slabs
+
+    Parameters
+    ----------
+    lx3: int
+        x3 size sans ghost cells
+    slab: int, optional
+        x3 indices per slab, 0 for a size of about SLAB_BYTES, None for one slab
+    plane: int
+        points of one x1-x2 plane
+    """
+
+    if slab is None:
+        slab = lx3
+    elif slab <= 0:
+        slab = max(1, SLAB_BYTES // (SLAB_ARRAYS * 8 * plane))
+
+    return [(a, min(a + slab, lx3)) for a in range(0, lx3, slab)]
+
+
+def collect(header: dict[str, T.Any], slabs: T.Iterable[Slab]) -> dict[str, T.Any]:
+    """whole grid from the header and all slabs of a generator"""
+
+    parts: dict[str, list[np.ndarray]] = {}
+    for s in slabs:
+        for k, (_, a) in s.items():
+            parts.setdefault(k, []).append(a)
+
+    xg = dict(header)
+    for k, p in parts.items():
+        xg[k] = p[0] if len(p) == 1 else np.concatenate(p, axis=x3_axis(p[0].ndim))
+
+    return xg
@@ -11,6 +11,7 @@ import numpy as np
 
 from .newton_method import qp2rtheta
 from .convert import geog2geomag, geomag2geog, Re
+from .slab import Slab, collect, ranges
 
 
 def tilted_dipole3d(cfg: dict[str, T.Any]) -> dict[str, T.Any]:
@@ -29,6 +30,32 @@ def tilted_dipole3d(cfg: dict[str, T.Any]) -> dict[str, T.Any]:
         simulation grid
     """
 
+    return collect(*tilted_dipole3d_slabs(cfg, None))
+
+
+def tilted_dipole3d_slabs(
+    cfg: dict[str, T.Any], slab: int | None = 0
+) -> tuple[dict[str, T.Any], T.Iterator[Slab]]:
+    """make tilted dipole grid in x3 slabs, see gemini3d.grid.slab
+
+    Parameters
+    -----------
+
+    cfg: dict
+        simulation parameters
+    slab: int, optional
+        x3 indices per slab, 0 for a size of about gemini3d.grid.slab.SLAB_BYTES,
+        None for the whole grid in one slab
+
+    Returns
+    -------
+
+    header: dict
+        grid size, 1-D coordinates and grid center
+    slabs: iterator of dict
+        3-D and 4-D grid variables by x3 range
+    """
+
     # parameter controlling altitude of top of grid in open dipole.
     gopen = cfg.get("grid_openparm", 100.0)
 
@@ -129,19 +156,29 @@ def tilted_dipole3d(cfg: dict[str, T.Any]) -> dict[str, T.Any]:
 
     # At this point we have all the arrays and sizes and the remainder will be
     #  coordinate conversions and construction of grid dictionary
-    xg = generate_tilted_dipole3d(q, p, phi)
-    return xg
+    return dipole_slabs(q, p, phi, slab)
 
 
 # coordinate conversions etc. needed to generate the full grid information
 def generate_tilted_dipole3d(q, p, phi):
+    return collect(*dipole_slabs(q, p, phi))
+
+
+def dipole_slabs(
+    q: np.ndarray, p: np.ndarray, phi: np.ndarray, slab: int | None = None
+) -> tuple[dict[str, T.Any], T.Iterator[Slab]]:
+    """
+    tilted dipole grid from its coordinates with ghost cells, in x3 slabs.
+    The meridional slice is converted once, each slab extends it over its x3 range.
+    glonctr, glatctr are added to the header after the last slab.
+    """
+
     # various sizes used internally
     lqg = q.size
     lpg = p.size
-    lphig = phi.size
     lq = lqg - 4
     lp = lpg - 4
-    lphi = lphig - 4
+    lphi = phi.size - 4
 
     # arrange the grid data in a dictionary
     xg = {"lx": np.array((lq, lp, lphi))}
@@ -157,12 +194,6 @@ def generate_tilted_dipole3d(q, p, phi):
         for ip in range(lpg):
             r[iq, ip], theta[iq, ip] = qp2rtheta(q[iq], p[ip])
 
-    r = np.broadcast_to(
-        r[:, :, None], (*r.shape, lphig)
-    )  # just tile for longitude to save time
-    theta = np.broadcast_to(theta[:, :, None], (*theta.shape, lphig))
-    phispher = np.broadcast_to(phi[None, None, :], (lqg, lpg, phi.size))
-
     # %% define cell interfaces and convert coordinates
     logging.info("converting q interface values to r,theta")
     qi = 1 / 2 * (q[1:-2] + q[2:-1])
@@ -172,8 +203,6 @@ def generate_tilted_dipole3d(q, p, phi):
         for ip in range(rqi.shape[1]):
             rqi[iq, ip], thetaqi[iq, ip] = qp2rtheta(qi[iq], p[ip + 2])
             # shift by 2 to exclude ghost
-    rqi = np.broadcast_to(rqi[:, :, None], (*rqi.shape, lphi))
-    thetaqi = np.broadcast_to(thetaqi[:, :, None], (*thetaqi.shape, lphi))
 
     logging.info("converting p interface values to r,theta")
     pi = 1 / 2 * (p[1:-2] + p[2:-1])
@@ -183,11 +212,80 @@ def generate_tilted_dipole3d(q, p, phi):
         for ip in range(rpi.shape[1]):
             rpi[iq, ip], thetapi[iq, ip] = qp2rtheta(q[iq + 2], pi[ip])
             # shift non interface index by two to exclude ghost
-    rpi = np.broadcast_to(rpi[:, :, None], (*rpi.shape, lphi))
-    thetapi = np.broadcast_to(thetapi[:, :, None], (*thetapi.shape, lphi))
 
     # phii = 1 / 2 * (phi[1:-2] + phi[2:-1])
 
+    # assign primary coordinates to dictionary, clear out temps
+    xg["x1"] = q
+    xg["x2"] = p
+    xg["x3"] = phi
+
+    # compute and store interface locations; these recomputed in fortran
+    xg["x1i"] = 1 / 2 * (xg["x1"][1:-2] + xg["x1"][2:-1])
+    xg["x2i"] = 1 / 2 * (xg["x2"][1:-2] + xg["x2"][2:-1])
+    xg["x3i"] = 1 / 2 * (xg["x3"][1:-2] + xg["x3"][2:-1])
+
+    # compute and store backward diffs (other diffs recomputed as needed in fortran)
+    xg["dx1b"] = xg["x1"][1:] - xg["x1"][:-1]
+    xg["dx2b"] = xg["x2"][1:] - xg["x2"][:-1]
+    xg["dx3b"] = xg["x3"][1:] - xg["x3"][:-1]
+
+    # compute and store centered diffs
+    xg["dx1h"] = xg["x1i"][1:] - xg["x1i"][:-1]
+    xg["dx2h"] = xg["x2i"][1:] - xg["x2i"][:-1]
+    xg["dx3h"] = xg["x3i"][1:] - xg["x3i"][:-1]
+
+    merid = (r, theta, rqi, thetaqi, rpi, thetapi)
+
+    def slabs() -> T.Iterator[Slab]:
+        ctr: list[tuple[np.ndarray, np.ndarray]] = []
+        for a, b in ranges(lphi, slab, lq * lp):
+            s = _dipole_slab(merid, phi, a, b)
+            ctr.append((s["glon"][1], s["glat"][1]))
+            yield s
+
+        if len(ctr) == 1:
+            xg["glonctr"] = ctr[0][0].mean()
+            xg["glatctr"] = ctr[0][1].mean()
+        else:
+            xg["glonctr"] = sum(g.sum() for g, _ in ctr) / (lq * lp * lphi)
+            xg["glatctr"] = sum(g.sum() for _, g in ctr) / (lq * lp * lphi)
+
+    return xg, slabs()
+
+
+def _dipole_slab(merid: tuple[np.ndarray, ...], phi: np.ndarray, a: int, b: int) -> Slab:
+    """
+    3-D and 4-D variables at x3 indices [a, b) sans ghost cells,
+    from the meridional slice r, theta (with ghost cells) and its interfaces.
+    """
+
+    r2, theta2, rqi, thetaqi, rpi, thetapi = merid
+    lqg, lpg = r2.shape
+    lq = lqg - 4
+    lp = lpg - 4
+    lphi = phi.size - 4
+    n = b - a
+
+    # ghost cells of the variables that have them, at the ends of the grid
+    ga = 0 if a == 0 else a + 2
+    gb = lphi + 4 if b == lphi else b + 2
+    # index of x3 interior [a, b) in the ghost range
+    ia = slice(a + 2 - ga, b + 2 - ga)
+
+    r = np.broadcast_to(
+        r2[:, :, None], (*r2.shape, gb - ga)
+    )  # just tile for longitude to save time
+    theta = np.broadcast_to(theta2[:, :, None], (*theta2.shape, gb - ga))
+    phispher = np.broadcast_to(phi[None, None, ga:gb], (lqg, lpg, gb - ga))
+
+    rqi = np.broadcast_to(rqi[:, :, None], (*rqi.shape, n))
+    thetaqi = np.broadcast_to(thetaqi[:, :, None], (*thetaqi.shape, n))
+    rpi = np.broadcast_to(rpi[:, :, None], (*rpi.shape, n))
+    thetapi = np.broadcast_to(thetapi[:, :, None], (*thetapi.shape, n))
+
+    xg: dict[str, np.ndarray] = {}
+
     # metric factors at cell centers and interfaces
     logging.info("calculating metric ceoffs")
     denom = np.sqrt(1 + 3 * np.cos(theta) ** 2)  # ghost cells need for these
@@ -195,17 +293,11 @@ def generate_tilted_dipole3d(q, p, phi):
     xg["h2"] = Re * np.sin(theta) ** 3 / denom
     xg["h3"] = r * np.sin(theta)
 
-    xg["h1x3i"] = np.concatenate(
-        (xg["h1"][2:-2, 2:-2, 2:-2], xg["h1"][2:-2, 2:-2, -1][:, :, None]), axis=2
-    )
-    xg["h2x3i"] = np.concatenate(
-        (xg["h2"][2:-2, 2:-2, 2:-2], xg["h2"][2:-2, 2:-2, -1][:, :, None]),
-        axis=2,
-    )
-    xg["h3x3i"] = np.concatenate(
-        (xg["h3"][2:-2, 2:-2, 2:-2], xg["h3"][2:-2, 2:-2, -1][:, :, None]),
-        axis=2,
-    )
+    for k in ("h1", "h2", "h3"):
+        h = xg[k][2:-2, 2:-2, ia]
+        if b == lphi:
+            h = np.concatenate((h, xg[k][2:-2, 2:-2, -1][:, :, None]), axis=2)
+        xg[f"{k}x3i"] = h
 
     denomtmp = np.sqrt(1 + 3 * np.cos(thetaqi) ** 2)
     xg["h1x1i"] = rqi**3 / Re**2 / denomtmp
@@ -217,67 +309,37 @@ def generate_tilted_dipole3d(q, p, phi):
     xg["h2x2i"] = Re * np.sin(thetapi) ** 3 / denomtmp
     xg["h3x2i"] = rpi * np.sin(thetapi)
 
+    # variables sans ghost cells
+    r = r[2:-2, 2:-2, ia]
+    theta = theta[2:-2, 2:-2, ia]
+    phispher = phispher[2:-2, 2:-2, ia]
+    denom = denom[2:-2, 2:-2, ia]
+
     # spherical unit vectors (expressed in a Cartesian basis), these should not have ghost cells
     logging.info("calculating spherical unit vectors")
-    xg["er"] = np.empty((lq, lp, lphi, 3))
-    xg["etheta"] = np.empty((lq, lp, lphi, 3))
-    xg["ephi"] = np.empty((lq, lp, lphi, 3))
-    xg["er"][..., 0] = np.sin(theta[2:-2, 2:-2, 2:-2]) * np.cos(
-        phispher[2:-2, 2:-2, 2:-2]
-    )
-    xg["er"][..., 1] = np.sin(theta[2:-2, 2:-2, 2:-2]) * np.sin(
-        phispher[2:-2, 2:-2, 2:-2]
-    )
-    xg["er"][..., 2] = np.cos(theta[2:-2, 2:-2, 2:-2])
-    xg["etheta"][..., 0] = np.cos(theta[2:-2, 2:-2, 2:-2]) * np.cos(
-        phispher[2:-2, 2:-2, 2:-2]
-    )
-    xg["etheta"][..., 1] = np.cos(theta[2:-2, 2:-2, 2:-2]) * np.sin(
-        phispher[2:-2, 2:-2, 2:-2]
-    )
-    xg["etheta"][..., 2] = -np.sin(theta[2:-2, 2:-2, 2:-2])
-    xg["ephi"][..., 0] = -np.sin(phispher[2:-2, 2:-2, 2:-2])
-    xg["ephi"][..., 1] = np.cos(phispher[2:-2, 2:-2, 2:-2])
+    xg["er"] = np.empty((lq, lp, n, 3))
+    xg["etheta"] = np.empty((lq, lp, n, 3))
+    xg["ephi"] = np.empty((lq, lp, n, 3))
+    xg["er"][..., 0] = np.sin(theta) * np.cos(phispher)
+    xg["er"][..., 1] = np.sin(theta) * np.sin(phispher)
+    xg["er"][..., 2] = np.cos(theta)
+    xg["etheta"][..., 0] = np.cos(theta) * np.cos(phispher)
+    xg["etheta"][..., 1] = np.cos(theta) * np.sin(phispher)
+    xg["etheta"][..., 2] = -np.sin(theta)
+    xg["ephi"][..., 0] = -np.sin(phispher)
+    xg["ephi"][..., 1] = np.cos(phispher)
     xg["ephi"][..., 2] = 0
 
     # now do the dipole unit vectors
     logging.info("calculating dipole unit vectors")
-    xg["e1"] = np.empty((lq, lp, lphi, 3))
-    xg["e2"] = np.empty((lq, lp, lphi, 3))
-    xg["e3"] = np.empty((lq, lp, lphi, 3))
-    xg["e1"][..., 0] = (
-        -3
-        * np.cos(theta[2:-2, 2:-2, 2:-2])
-        * np.sin(theta[2:-2, 2:-2, 2:-2])
-        * np.cos(phispher[2:-2, 2:-2, 2:-2])
-        / denom[2:-2, 2:-2, 2:-2]
-    )
-    xg["e1"][..., 1] = (
-        -3
-        * np.cos(theta[2:-2, 2:-2, 2:-2])
-        * np.sin(theta[2:-2, 2:-2, 2:-2])
-        * np.sin(phispher[2:-2, 2:-2, 2:-2])
-        / denom[2:-2, 2:-2, 2:-2]
-    )
-    xg["e1"][..., 2] = (1 - 3 * np.cos(theta[2:-2, 2:-2, 2:-2]) ** 2) / denom[
-        2:-2, 2:-2, 2:-2
-    ]
-    xg["e2"][..., 0] = (
-        np.cos(phispher[2:-2, 2:-2, 2:-2])
-        * (1 - 3 * np.cos(theta[2:-2, 2:-2, 2:-2]) ** 2)
-        / denom[2:-2, 2:-2, 2:-2]
-    )
-    xg["e2"][..., 1] = (
-        np.sin(phispher[2:-2, 2:-2, 2:-2])
-        * (1 - 3 * np.cos(theta[2:-2, 2:-2, 2:-2]) ** 2)
-        / denom[2:-2, 2:-2, 2:-2]
-    )
-    xg["e2"][..., 2] = (
-        3
-        * np.sin(theta[2:-2, 2:-2, 2:-2])
-        * np.cos(theta[2:-2, 2:-2, 2:-2])
-        / denom[2:-2, 2:-2, 2:-2]
-    )
+    xg["e1"] = np.empty((lq, lp, n, 3))
+    xg["e2"] = np.empty((lq, lp, n, 3))
+    xg["e1"][..., 0] = -3 * np.cos(theta) * np.sin(theta) * np.cos(phispher) / denom
+    xg["e1"][..., 1] = -3 * np.cos(theta) * np.sin(theta) * np.sin(phispher) / denom
+    xg["e1"][..., 2] = (1 - 3 * np.cos(theta) ** 2) / denom
+    xg["e2"][..., 0] = np.cos(phispher) * (1 - 3 * np.cos(theta) ** 2) / denom
+    xg["e2"][..., 1] = np.sin(phispher) * (1 - 3 * np.cos(theta) ** 2) / denom
+    xg["e2"][..., 2] = 3 * np.sin(theta) * np.cos(theta) / denom
     xg["e3"] = xg["ephi"]  # same as in spherical
 
     # find inclination angle for each field line
@@ -298,7 +360,7 @@ def generate_tilted_dipole3d(q, p, phi):
     logging.info("calculating gravitational field over grid...")
     G = 6.67428e-11
     Me = 5.9722e24
-    g = G * Me / r[2:-2, 2:-2, 2:-2] ** 2
+    g = G * Me / r**2
     proj = np.sum(-xg["er"] * xg["e1"], axis=3)
     xg["gx1"] = g * proj
     proj = np.sum(-xg["er"] * xg["e2"], axis=3)
@@ -308,69 +370,30 @@ def generate_tilted_dipole3d(q, p, phi):
     # compute magnetic field strength
     logging.info("calculating magnetic field strength over grid...")
     # simplified (4 * pi * 1e-7)* 7.94e22 / 4 / pi due to precision issues
-    xg["Bmag"] = (
-        7.94e15
-        / (r[2:-2, 2:-2, 2:-2] ** 3)
-        * np.sqrt(3 * (np.cos(theta[2:-2, 2:-2, 2:-2])) ** 2 + 1)
-    )
+    xg["Bmag"] = 7.94e15 / (r**3) * np.sqrt(3 * (np.cos(theta)) ** 2 + 1)
 
     # compute Cartesian coordinates
-    xg["z"] = r[2:-2, 2:-2, 2:-2] * np.cos(theta[2:-2, 2:-2, 2:-2])
-    xg["x"] = (
-        r[2:-2, 2:-2, 2:-2]
-        * np.sin(theta[2:-2, 2:-2, 2:-2])
-        * np.cos(phispher[2:-2, 2:-2, 2:-2])
-    )
-    xg["y"] = (
-        r[2:-2, 2:-2, 2:-2]
-        * np.sin(theta[2:-2, 2:-2, 2:-2])
-        * np.sin(phispher[2:-2, 2:-2, 2:-2])
-    )
+    xg["z"] = r * np.cos(theta)
+    xg["x"] = r * np.sin(theta) * np.cos(phispher)
+    xg["y"] = r * np.sin(theta) * np.sin(phispher)
 
     # determine grid cells that are "null" - i.e. not included in the computations
-    inull = r[2:-2, 2:-2, 2:-2] < Re + 79.95e3
-    # note addressing of r to produce array sans ghost cells
+    inull = r < Re + 79.95e3
 
-    xg["nullpts"] = np.zeros((lq, lp, lphi))
+    xg["nullpts"] = np.zeros((lq, lp, n))
     xg["nullpts"][inull] = 1
     # may need to convert inull to linear index?
 
     # compute geographic coordinates for the entire grid
-    xg["alt"] = r[2:-2, 2:-2, 2:-2] - Re
-    [xg["glon"], xg["glat"]] = geomag2geog(
-        phispher[2:-2, 2:-2, 2:-2], theta[2:-2, 2:-2, 2:-2]
-    )
-
-    # at this point we are done with the works arrays to put them in the structure and deallocate
-    # assign spherical variables to dictionary and clear out work array to save memory
-    xg["r"] = r[2:-2, 2:-2, 2:-2]
-    xg["theta"] = theta[2:-2, 2:-2, 2:-2]
-    xg["phi"] = phispher[2:-2, 2:-2, 2:-2]
+    xg["alt"] = r - Re
+    [xg["glon"], xg["glat"]] = geomag2geog(phispher, theta)
 
-    # assign primary coordinates to dictionary, clear out temps
-    xg["x1"] = q
-    xg["x2"] = p
-    xg["x3"] = phi
+    # assign spherical variables to dictionary
+    xg["r"] = r
+    xg["theta"] = theta
+    xg["phi"] = phispher
 
-    # compute and store interface locations; these recomputed in fortran
-    xg["x1i"] = 1 / 2 * (xg["x1"][1:-2] + xg["x1"][2:-1])
-    xg["x2i"] = 1 / 2 * (xg["x2"][1:-2] + xg["x2"][2:-1])
-    xg["x3i"] = 1 / 2 * (xg["x3"][1:-2] + xg["x3"][2:-1])
-
-    # compute and store backward diffs (other diffs recomputed as needed in fortran)
-    xg["dx1b"] = xg["x1"][1:] - xg["x1"][:-1]
-    xg["dx2b"] = xg["x2"][1:] - xg["x2"][:-1]
-    xg["dx3b"] = xg["x3"][1:] - xg["x3"][:-1]
-
-    # compute and store centered diffs
-    xg["dx1h"] = xg["x1i"][1:] - xg["x1i"][:-1]
-    xg["dx2h"] = xg["x2i"][1:] - xg["x2i"][:-1]
-    xg["dx3h"] = xg["x3i"][1:] - xg["x3i"][:-1]
-
-    xg["glonctr"] = xg["glon"].mean()
-    xg["glatctr"] = xg["glat"].mean()
-
-    return xg
+    return {k: (ga if k in {"h1", "h2", "h3"} else a, v) for k, v in xg.items()}
 
 
 def tilted_dipole3d_NUx2(cfg: dict[str, T.Any]) -> dict[str, T.Any]:
@@ -0,0 +1,367 @@
+"""
+xarray backend opening a whole Gemini3D output directory as one lazily-loaded Dataset.
+
+Usage:
+
+    import xarray
+    ds = xarray.open_dataset("/path/to/sim", engine="gemini3d")
+
+or equivalently gemini3d.read.series("/path/to/sim").
+No data is read until a variable is indexed or loaded, and then only the
+hyperslab of each needed frame file.
+Consecutive times of a repacked file (gemini3d.repack) are read in one selection.
+"""
+
+from __future__ import annotations
+from pathlib import Path
+from datetime import datetime
+import typing as T
+import itertools
+
+import numpy as np
+import h5py
+import xarray
+from xarray.backends import BackendArray, BackendEntrypoint
+from xarray.core import indexing
+
+from . import read as h5read
+from . import pool
+from .cube import CubeFrame, Source, open_source
+from .. import SPECIES, LSP
+from ..utils import get_dtype
+
+
+class FrameArray(BackendArray):
+    """
+    one variable across all frames, with a leading time dimension.
+    Indexing reads only the selected times and hyperslab of each frame.
+
+    The output type of each frame is detected as it is read, so frames of another
+    type than the run, e.g. milestones with the full state, give the same variable
+    (ne from the electrons of nsall...), or NaN if they do not have it.
+    """
+
+    def __init__(
+        self,
+        files: list[Source],
+        name: str,
+        flag: int,
+        shape: tuple[int, ...],
+        dtype,
+        lx: tuple[int, ...],
+    ):
+        self.files = files
+        self.name = name
+        self.flag = flag
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+        self.lx = lx
+
+    def __getitem__(self, key: indexing.ExplicitIndexer) -> np.ndarray:
+        return indexing.explicit_indexing_adapter(
+            key, self.shape, indexing.IndexingSupport.BASIC, self._getitem
+        )
+
+    def _getitem(self, key: tuple) -> np.ndarray:
+        # integer indices are read as length-1 slices and squeezed at the end
+        squeeze = tuple(i for i, k in enumerate(key) if not isinstance(k, slice))
+        skey = tuple(k if isinstance(k, slice) else slice(k, k + 1) for k in key)
+
+        shape = tuple(len(range(*k.indices(n))) for k, n in zip(skey, self.shape))
+
+        # each file is read straight into a buffer in its storage order
+        # (time, [species,] x3, x2, x1), returned as a view in (x1, x2, x3) order
+        lead = 2 if self.name in {"ns", "vs1", "Ts"} else 1
+        perm = (*range(lead), *range(len(shape) - 1, lead - 1, -1))
+        buf = np.empty([shape[i] for i in perm], dtype=self.dtype)
+
+        # frame files are read one by one,
+        # consecutive times of a cube file of the same output type together
+        for _, g in itertools.groupby(enumerate(self.files[skey[0]]), key=_run):
+            run = list(g)
+            i, src = run[0]
+            if not isinstance(src, tuple):
+                with pool.open_file(src) as f:
+                    self._read(f, skey[1:], buf[i])
+                continue
+
+            with pool.open_file(src[0]) as f:
+                frames = [CubeFrame(f, src[1] + k) for k in range(len(run))]
+                for flag, sub in itertools.groupby(
+                    range(len(run)), key=lambda k: self._flag(frames[k])
+                ):
+                    ks = list(sub)
+                    a, b = ks[0], ks[-1] + 1
+                    it = slice(src[1] + a, src[1] + b)
+                    if not _read_times(
+                        f, self.name, flag, it, skey[1:], buf[i + a : i + b]
+                    ):
+                        for k in ks:
+                            self._read(frames[k], skey[1:], buf[i + k], flag)
+
+        out = buf.transpose(perm)
+
+        return out.squeeze(axis=squeeze) if squeeze else out
+
+    def _flag(self, f: h5py.File | CubeFrame) -> int:
+        """output type of a frame, that of the run if the frame does not tell"""
+
+        return h5read.flagoutput(f, {"flagoutput": self.flag})
+
+    def _read(
+        self,
+        f: h5py.File | CubeFrame,
+        key: tuple[slice, ...],
+        out: np.ndarray,
+        flag: int | None = None,
+    ) -> None:
+        """read the variable from one frame into out, NaN if the frame does not have it"""
+
+        if flag is None:
+            flag = self._flag(f)
+
+        if _has(f, self.name, flag):
+            h5read.variable(f, self.name, flag, key, self.lx, out=out)
+        else:
+            out[...] = np.nan
+
+
+def _has(f: h5py.File | CubeFrame, name: str, flag: int) -> bool:
+    """whether variable name can be read from frame f of output type flag"""
+
+    names = h5read.FRAME_DATASETS[flag].get(name, ())
+
+    return bool(names) and all(n in f for n in names)
+
+
+def _run(e: tuple[int, Source]) -> tuple[Path, int]:
+    """groupby key putting consecutive times of the same cube file in one run"""
+
+    i, src = e
+    return (src[0], src[1] - i) if isinstance(src, tuple) else (src, i)
+
+
+def _read_times(
+    f: h5py.File, name: str, flag: int, it: slice, key: tuple[slice, ...], out: np.ndarray
+) -> bool:
+    """
+    read times "it" of a variable stored as one dataset of a cube file into out,
+    in a single selection so each chunk is decompressed once.
+    Returns False for variables derived from several datasets.
+    """
+
+    names = h5read.FRAME_DATASETS[flag].get(name, ())
+    if len(names) != 1:
+        return False
+
+    dset = f[names[0]]
+    if name == "Phitop" and dset.ndim < 3:
+        return False
+
+    if flag == 1 and name in {"ne", "Te"}:
+        sel: tuple = (it, slice(LSP - 1, LSP), *key[::-1])
+        out = out[:, None]
+    elif flag == 1 and name in {"ns", "vs1", "Ts"}:
+        sel = (it, key[0], *key[1:][::-1])
+    else:
+        sel = (it, *key[::-1])
+
+    if out.size:
+        dset.read_direct(out, sel)
+
+    return True
+
+
+def open_series(
+    files: list[Source],
+    times: list[datetime],
+    var: set[str],
+    flag: int,
+    xg: dict[str, T.Any],
+    dtype: str | None = None,
+) -> xarray.Dataset:
+    """
+    build a lazily-loaded Dataset from the frames of a simulation
+
+    Parameters
+    ----------
+    files: list of pathlib.Path or (pathlib.Path, int)
+        frame files, or (cube file, time index), in time order
+    times: list of datetime.datetime
+        time of each file
+    var: set of str
+        variable(s) to make available
+    flag: int
+        flagoutput of the run. Frames of another output type, e.g. milestones,
+        are read as this type, see FrameArray.
+    xg: dict
+        grid with at least x1, x2, x3, lx
+    dtype: str, optional
+        dtype policy, see gemini3d.utils.get_dtype
+    """
+
+    if len(files) != len(times):
+        raise ValueError(f"{len(files)} files but {len(times)} times")
+
+    if xg.get("filename", Path()).stem == "amrgrid":
+        coords = {"x1": xg["x1"], "x2": xg["x2"], "x3": xg["x3"]}
+    else:
+        coords = {"x1": xg["x1"][2:-2], "x2": xg["x2"][2:-2], "x3": xg["x3"][2:-2]}
+
+    lx = tuple(int(coords[k].size) for k in ("x1", "x2", "x3"))
+
+    ds = xarray.Dataset(coords={"time": times, **coords})
+
+    if not files:
+        ds.attrs["flagoutput"] = flag
+        return ds
+
+    # variables and dtypes are those of the first frame of the run's output type,
+    # else of the first frame
+    ref = files[0]
+    for src in files:
+        with open_source(src) as f:
+            if h5read.flagoutput(f, {"flagoutput": flag}) == flag:
+                ref = src
+                break
+    else:
+        with open_source(ref) as f:
+            flag = h5read.flagoutput(f, {"flagoutput": flag})
+
+    ds.attrs["flagoutput"] = flag
+
+    avail = h5read.FRAME_DATASETS[flag]
+    dt = get_dtype(dtype)
+
+    with open_source(ref) as f:
+        for k in sorted(var):
+            if k == "Phi":
+                k = "Phitop"
+            if not _has(f, k, flag):
+                continue
+
+            kdt = dt or f[avail[k][0]].dtype
+
+            if k in {"ns", "vs1", "Ts"}:
+                dims: tuple[str, ...] = ("time", "species", "x1", "x2", "x3")
+                shape: tuple[int, ...] = (len(files), len(SPECIES), *lx)
+                ds = ds.assign_coords(species=SPECIES)
+            elif k == "Phitop":
+                dims = ("time", "x2", "x3")
+                shape = (len(files), *lx[1:])
+            else:
+                dims = ("time", "x1", "x2", "x3")
+                shape = (len(files), *lx)
+
+            arr = FrameArray(files, k, flag, shape, kdt, lx)
+            ds[k] = xarray.Variable(dims, indexing.LazilyIndexedArray(arr))
+
+    return ds
+
+
+class InputArray(BackendArray):
+    """
+    one dataset across the files of an input series, e.g. E-field or precipitation,
+    with a leading time dimension. Indexing reads only the selected times and hyperslab.
+    """
+
+    def __init__(self, files: list[Path], name: str, shape: tuple[int, ...], dtype):
+        self.files = files
+        self.name = name
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+
+    def __getitem__(self, key: indexing.ExplicitIndexer) -> np.ndarray:
+        return indexing.explicit_indexing_adapter(
+            key, self.shape, indexing.IndexingSupport.BASIC, self._getitem
+        )
+
+    def _getitem(self, key: tuple) -> np.ndarray:
+        squeeze = tuple(i for i, k in enumerate(key) if not isinstance(k, slice))
+        skey = tuple(k if isinstance(k, slice) else slice(k, k + 1) for k in key)
+
+        shape = tuple(len(range(*k.indices(n))) for k, n in zip(skey, self.shape))
+        out = np.empty(shape, dtype=self.dtype)
+
+        if out.size:
+            for i, file in enumerate(self.files[skey[0]]):
+                with pool.open_file(file) as f:
+                    out[i] = f[self.name][skey[1:]]
+
+        return out.squeeze(axis=squeeze) if squeeze else out
+
+
+def open_inputs(
+    files: list[Path],
+    times: list[datetime],
+    names: dict[str, tuple[str, tuple[str, ...]]],
+    coords: dict[str, T.Any],
+) -> xarray.Dataset:
+    """
+    build a lazily-loaded Dataset from input files all having the same datasets
+
+    Parameters
+    ----------
+    files: list of pathlib.Path
+        input files in time order
+    times: list of datetime.datetime
+        time of each file
+    names: dict
+        variable => (dataset name, dimensions besides time)
+    coords: dict
+        coordinates of the dimensions
+    """
+
+    if len(files) != len(times):
+        raise ValueError(f"{len(files)} files but {len(times)} times")
+
+    ds = xarray.Dataset(coords={"time": times, **coords})
+
+    if not files:
+        return ds
+
+    with pool.open_file(files[0]) as f:
+        for k, (name, dims) in names.items():
+            if name not in f:
+                continue
+            shape = (len(files), *f[name].shape)
+            arr = InputArray(files, name, shape, f[name].dtype)
+            ds[k] = xarray.Variable(("time", *dims), indexing.LazilyIndexedArray(arr))
+
+    return ds
+
+
+class GeminiBackendEntrypoint(BackendEntrypoint):
+    """
+    xarray.open_dataset(direc, engine="gemini3d", var={"ne", "Te"})
+    """
+
+    description = "Open a Gemini3D HDF5 simulation output directory as one time series"
+    url = "https://github.com/gemini3d/pygemini"
+    open_dataset_parameters = ("filename_or_obj", "drop_variables", "var", "dtype")
+
+    def open_dataset(  # type: ignore[override]
+        self,
+        filename_or_obj,
+        *,
+        drop_variables=None,
+        var: set[str] | None = None,
+        dtype: str | None = None,
+    ) -> xarray.Dataset:
+        from .. import read
+
+        ds = read.series(Path(filename_or_obj), var=var, dtype=dtype)
+        if drop_variables:
+            ds = ds.drop_vars(drop_variables, errors="ignore")
+
+        return ds
+
+    def guess_can_open(self, filename_or_obj) -> bool:
+        try:
+            path = Path(filename_or_obj).expanduser()
+        except TypeError:
+            return False
+
+        return path.is_dir() and (
+            (path / "inputs/config.nml").is_file() or (path / "config.nml").is_file()
+        )
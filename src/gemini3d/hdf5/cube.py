@@ -0,0 +1,174 @@
+"""
+single HDF5 file holding all output frames of a simulation, with a leading time axis.
+
+Each dataset of the frame files is stored as (time, *frame dataset shape),
+chunked over several times and part of the grid, so reading one cell over all
+times or one whole time both touch few chunks.
+A dataset only some frames have, e.g. the full state of milestone frames,
+has a boolean "/time/has/<dataset>" of the times having it.
+Readers use it through CubeFrame, which looks like an open frame file.
+
+Create by gemini3d.repack.repack()
+"""
+
+from __future__ import annotations
+from pathlib import Path
+from datetime import datetime, timedelta
+import typing as T
+import contextlib
+import bisect
+
+import numpy as np
+import h5py
+
+from .. import find
+from . import pool
+
+CUBE_NAME = "cube.h5"
+# a frame is a file path, or (cube path, time index)
+Source = T.Union[Path, T.Tuple[Path, int]]
+
+# cube path => (mtime_ns, times)
+_times: dict[Path, tuple[int, list[datetime]]] = {}
+
+
+class _TimeSlice:
+    """one time of a cube dataset, indexed like the frame file dataset"""
+
+    def __init__(self, dset: h5py.Dataset, it: int, dtype=None):
+        self._dset = dset
+        self._it = it
+        self._dtype = dtype
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        return self._dset.shape[1:]
+
+    @property
+    def ndim(self) -> int:
+        return self._dset.ndim - 1
+
+    @property
+    def size(self) -> int:
+        return int(np.prod(self.shape))
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype(self._dtype) if self._dtype else self._dset.dtype
+
+    def _sel(self, sel) -> tuple:
+        if sel is Ellipsis:
+            sel = ()
+        return (self._it, *(sel if isinstance(sel, tuple) else (sel,)))
+
+    def __getitem__(self, sel):
+        d = self._dset.astype(self._dtype) if self._dtype else self._dset
+        return d[self._sel(sel)]
+
+    def astype(self, dtype) -> _TimeSlice:
+        return _TimeSlice(self._dset, self._it, dtype)
+
+    def read_direct(self, dest: np.ndarray, source_sel=()) -> None:
+        self._dset.read_direct(dest, self._sel(source_sel))
+
+
+class CubeFrame:
+    """one time of a cube file, usable in place of an open frame h5py.File"""
+
+    def __init__(self, f: h5py.File, it: int):
+        self.file = f
+        self.it = it
+        self.filename = f.filename
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.file and has(self.file, name.lstrip("/"), self.it)
+
+    def __getitem__(self, name: str) -> _TimeSlice:
+        if name not in self:
+            raise KeyError(f"{name} is not in {self.filename} at time index {self.it}")
+        return _TimeSlice(self.file[name], self.it)
+
+    def keys(self):
+        return [k for k in self.file.keys() if k in self]
+
+
+def has(f: h5py.File, name: str, it: int) -> bool:
+    """whether dataset name of cube file f has time index it"""
+
+    mask = f.get(f"/time/has/{name}")
+
+    return mask is None or bool(mask[it])
+
+
+def times(cube: Path) -> list[datetime]:
+    """times of the frames in a cube file"""
+
+    cube = Path(cube).resolve()
+    mtime = cube.stat().st_mtime_ns
+
+    e = _times.get(cube)
+    if e is not None and e[0] == mtime:
+        return e[1]
+
+    with pool.open_file(cube) as f:
+        ymd = f["/time/ymd"][:]
+        UTsec = f["/time/UTsec"][:]
+
+    t = [datetime(*d) + timedelta(seconds=float(s)) for d, s in zip(ymd, UTsec)]
+    _times[cube] = (mtime, t)
+
+    return t
+
+
+def index(cube: Path, time: datetime) -> int | None:
+    """time index of a cube file within a second of time, None if it has none"""
+
+    ct = times(cube)
+
+    i = bisect.bisect_left(ct, time)
+    i = min(
+        (j for j in (i - 1, i) if 0 <= j < len(ct)),
+        key=lambda j: abs(ct[j] - time),
+        default=-1,
+    )
+
+    return i if i >= 0 and abs(ct[i] - time) <= timedelta(seconds=1) else None
+
+
+def source(direc: Path, time: datetime) -> Source:
+    """
+    where to read the frame at time: the cube in direc if it has that time,
+    unless the frame file is newer than the cube (e.g. simulation was re-run).
+
+    Raises FileNotFoundError if neither has it.
+    """
+
+    try:
+        file: Path | None = find.frame(direc, time)
+    except FileNotFoundError:
+        file = None
+
+    cube = Path(direc) / CUBE_NAME
+    if cube.is_file():
+        it = index(cube, time)
+        if it is not None and (
+            file is None or file.stat().st_mtime_ns <= cube.stat().st_mtime_ns
+        ):
+            return (cube, it)
+
+    if file is None:
+        raise FileNotFoundError(f"no frame at {time} in {direc}")
+
+    return file
+
+
+@contextlib.contextmanager
+def open_source(src: Source) -> T.Iterator[h5py.File | CubeFrame]:
+    """open a frame file, or a time of a cube file, for reading"""
+
+    if isinstance(src, tuple):
+        with pool.open_file(src[0]) as f:
+            yield CubeFrame(f, src[1])
+    else:
+        with pool.open_file(src) as f:
+            yield f
@@ -0,0 +1,151 @@
+"""
+bounded LRU pool of open read-only HDF5 files
+
+Opening an HDF5 file costs several metadata operations, which on parallel
+filesystems (Lustre, GPFS) adds up when the same grid and frame files are read
+repeatedly. With the pool enabled, read-only handles stay open and are reused
+until they are least recently used, or the file's mtime or size changes.
+
+The pool is disabled (size 0) by default, so files are opened and closed per read.
+Enable by environment variable GEMINI_H5_POOL_SIZE or:
+
+    gemini3d.hdf5.pool.configure(maxsize=32, rdcc_nbytes=64 * 2**20)
+
+rdcc_nbytes (environment variable GEMINI_H5_CHUNK_CACHE) is the HDF5 raw data
+chunk cache size of each open file, applied whether or not the pool is enabled.
+"""
+
+from __future__ import annotations
+from pathlib import Path
+import typing as T
+import collections
+import contextlib
+import threading
+import os
+
+import h5py
+
+_lock = threading.Lock()
+
+# resolved path => [file, mtime_ns, size, users]
+_pool: collections.OrderedDict[Path, list[T.Any]] = collections.OrderedDict()
+
+_config = {
+    "maxsize": int(os.environ.get("GEMINI_H5_POOL_SIZE", 0)),
+    "rdcc_nbytes": int(os.environ.get("GEMINI_H5_CHUNK_CACHE", 4 * 2**20)),
+}
+
+
+def configure(maxsize: int | None = None, rdcc_nbytes: int | None = None) -> None:
+    """
+    Parameters
+    ----------
+    maxsize: int, optional
+        maximum number of idle open files to keep. 0 disables the pool.
+    rdcc_nbytes: int, optional
+        HDF5 chunk cache size [bytes] for each file opened from now on
+    """
+
+    with _lock:
+        if maxsize is not None:
+            if maxsize < 0:
+                raise ValueError("maxsize must be non-negative")
+            _config["maxsize"] = maxsize
+        if rdcc_nbytes is not None:
+            _config["rdcc_nbytes"] = rdcc_nbytes
+
+        _trim()
+
+
+def clear() -> None:
+    """close all idle pooled files"""
+
+    with _lock:
+        for path in list(_pool):
+            if _pool[path][3] == 0:
+                _pool.pop(path)[0].close()
+
+
+def evict(file: Path) -> None:
+    """
+    close a pooled file, e.g. before overwriting it.
+    Writers call this since HDF5 cannot truncate a file that is open.
+    """
+
+    path = Path(file).expanduser().resolve()
+
+    with _lock:
+        e = _pool.get(path)
+        if e is not None and e[3] == 0:
+            del _pool[path]
+            e[0].close()
+
+
+@contextlib.contextmanager
+def open_file(file: Path) -> T.Iterator[h5py.File]:
+    """
+    context manager giving a read-only h5py.File, reused from the pool if enabled.
+    The file must not be closed by the caller.
+    """
+
+    path = Path(file).expanduser().resolve()
+
+    if _config["maxsize"] == 0:
+        with h5py.File(path, "r", rdcc_nbytes=_config["rdcc_nbytes"]) as f:
+            yield f
+        return
+
+    st = path.stat()
+    stamp = (st.st_mtime_ns, st.st_size)
+
+    with _lock:
+        e = _pool.get(path)
+        if e is not None and (not e[0].id.valid or (e[1], e[2]) != stamp):
+            if e[3] == 0:
+                del _pool[path]
+                if e[0].id.valid:
+                    e[0].close()
+                e = None
+            else:
+                # file changed while another reader holds the stale handle
+                e = []
+        if e is None:
+            f = h5py.File(path, "r", rdcc_nbytes=_config["rdcc_nbytes"])
+            e = [f, *stamp, 0]
+            _pool[path] = e
+        if e:
+            _pool.move_to_end(path)
+            e[3] += 1
+
+    if not e:
+        with h5py.File(path, "r", rdcc_nbytes=_config["rdcc_nbytes"]) as f:
+            yield f
+        return
+
+    try:
+        yield e[0]
+    finally:
+        with _lock:
+            e[3] -= 1
+            _trim()
+
+
+def _trim() -> None:
+    """close least recently used idle files beyond maxsize. Caller holds _lock."""
+
+    excess = len(_pool) - _config["maxsize"]
+    for path in list(_pool):
+        if excess <= 0:
+            break
+        if _pool[path][3] == 0:
+            _pool.pop(path)[0].close()
+            excess -= 1
+
+
+def _reset_after_fork() -> None:
+    # HDF5 handles are not shared across processes; the parent keeps its own
+    _pool.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -7,15 +7,52 @@ from pathlib import Path
 import typing as T
 import logging
 from datetime import datetime, timedelta
+import contextlib
+import collections.abc
+import functools
 
 import xarray
 import numpy as np
 import h5py
 
-from gemini3d.utils import filename2datetime
+from gemini3d.utils import filename2datetime, get_dtype
 
 from .. import find
-from .. import WAVELEN
+from .. import WAVELEN, LSP, SPECIES
+from . import pool
+from .cube import CubeFrame
+
+# file path, or an already open h5py.File (or time of a cube file) to avoid reopening per call
+H5File = T.Union[Path, h5py.File, CubeFrame]
+
+# variable name => HDF5 dataset name for flagoutput=2 (averaged) output
+CURVAVG_NAMES = {
+    "ne": "neall",
+    "v1": "v1avgall",
+    "Ti": "Tavgall",
+    "Te": "TEall",
+    "J1": "J1all",
+    "J2": "J2all",
+    "J3": "J3all",
+    "v2": "v2avgall",
+    "v3": "v3avgall",
+    "Phi": "Phiall",
+}
+
+
+@contextlib.contextmanager
+def _open(file: H5File) -> T.Iterator[h5py.File | CubeFrame]:
+    """use an open h5py.File or CubeFrame as is, else open read-only via the handle pool"""
+
+    if isinstance(file, (h5py.File, CubeFrame)):
+        yield file
+    else:
+        with pool.open_file(file) as f:
+            yield f
+
+
+def _path(file: H5File) -> Path:
+    return Path(file.filename) if isinstance(file, (h5py.File, CubeFrame)) else file
 
 
 def simsize(path: Path) -> tuple[int, ...]:
@@ -35,7 +72,7 @@ def simsize(path: Path) -> tuple[int, ...]:
 
     path = find.simsize(path)
 
-    with h5py.File(path, "r") as f:
+    with _open(path) as f:
         if "lxs" in f:
             lx = f["lxs"][:]
         elif "lx" in f:
@@ -57,10 +94,10 @@ def simsize(path: Path) -> tuple[int, ...]:
     return lx
 
 
-def flagoutput(file: Path, cfg: dict[str, T.Any]) -> int:
+def flagoutput(file: H5File, cfg: dict[str, T.Any]) -> int:
     """detect output type"""
 
-    with h5py.File(file, "r") as f:
+    with _open(file) as f:
         if "nsall" in f:
             # milestone or full
             flag = 1
@@ -77,7 +114,11 @@ def flagoutput(file: Path, cfg: dict[str, T.Any]) -> int:
 
 
 def grid(
-    file: Path, *, var: set[str] | None = None, shape: bool = False
+    file: Path,
+    *,
+    var: set[str] | None = None,
+    shape: bool = False,
+    dtype: str | None = None,
 ) -> dict[str, T.Any]:
     """
     get simulation grid
@@ -90,11 +131,13 @@ def grid(
         read only these grid variables
     shape: bool, optional
         read only the shape of the grid instead of the data iteslf
+    dtype: str, optional
+        dtype policy of floating point variables, see gemini3d.utils.get_dtype
 
     Returns
     -------
-    grid: dict
-        grid parameters
+    grid: Grid
+        grid parameters, read on first access except var
 
     Transpose on read to undo the transpose operation we had to do in write_grid C => Fortran order.
     """
@@ -105,7 +148,7 @@ def grid(
     xg: dict[str, T.Any] = {"filename": file}
 
     if shape:
-        with h5py.File(file, "r") as f:
+        with _open(file) as f:
             for k in f.keys():
                 if f[k].ndim >= 2:
                     xg[k] = f[k].shape[::-1]
@@ -118,35 +161,265 @@ def grid(
     if isinstance(var, str):
         var = [var]
 
-    with h5py.File(file, "r") as f:
-        var = set(var) if var else f.keys()
+    xg = Grid(file, dtype)
+    if var:
+        xg.load(var)
 
-        for k in var:
-            if f[k].ndim >= 2:
-                xg[k] = f[k][:].transpose()
-            else:
-                if f[k].size > 1:
-                    xg[k] = f[k][:]
-                else:
-                    xg[k] = f[k]
+    return xg
 
-    if file.stem == "amrgrid":
-        xg["lx"] = np.array((xg["x1"].size, xg["x2"].size, xg["x3"].size))
-    else:
-        xg["lx"] = simsize(file.parent)
+
+class Grid(dict):
+    """
+    simulation grid whose variables are read from the grid file on first access
+    and then kept, so only the variables used are read. A dict otherwise, except that
+    values() and items() read every variable.
+
+    "lx" and properties gridtype and nullmask are computed on first use.
+    """
+
+    def __init__(self, file: Path, dtype: str | None = None):
+        super().__init__()
+
+        self.file = Path(file)
+        self._dt = get_dtype(dtype)
+
+        with _open(self.file) as f:
+            # insertion-ordered set of all keys, loaded or not
+            self._names = dict.fromkeys([*f.keys(), "lx"])
+
+        self["filename"] = self.file
+
+    def __missing__(self, key: str):
+        if key not in self._names:
+            raise KeyError(key)
+
+        if key == "lx":
+            value = self._lx()
+        else:
+            with _open(self.file) as f:
+                value = _grid_var(f, key, self._dt)
+
+        dict.__setitem__(self, key, value)
+
+        return value
+
+    def _lx(self):
+        if self.file.stem == "amrgrid":
+            with _open(self.file) as f:
+                return np.array([f[k].size for k in ("x1", "x2", "x3")])
+
+        return simsize(self.file.parent)
+
+    def load(self, var: T.Iterable[str] | None = None) -> None:
+        """read these variables now, default all, opening the file once"""
+
+        var = [k for k in (self._names if var is None else var) if k not in self.loaded]
+
+        with _open(self.file) as f:
+            for k in var:
+                if k != "lx":
+                    dict.__setitem__(self, k, _grid_var(f, k, self._dt))
+                    self._names[k] = None
+
+        if "lx" in var:
+            dict.__setitem__(self, "lx", self._lx())
+
+    def spec(self, key: str) -> tuple[tuple[int, ...], np.dtype] | None:
+        """
+        shape and dtype of an array variable not read yet, from the file metadata,
+        else None
+        """
+
+        if key == "lx" or key in self.loaded or key not in self._names:
+            return None
+
+        with _open(self.file) as f:
+            d = f[key]
+            if d.size <= 1:
+                return None
+            dt = self._dt if self._dt and d.dtype.kind == "f" else d.dtype
+            return d.shape[::-1], np.dtype(dt)
+
+    def read_into(self, key: str, out: np.ndarray) -> None:
+        """
+        read a variable into out, Fortran-contiguous of its spec() shape and dtype,
+        without keeping it
+        """
+
+        with _open(self.file) as f:
+            if out.size:
+                # HDF5 converts the type while reading
+                f[key].read_direct(out.transpose())
+
+    @property
+    def loaded(self) -> list[str]:
+        """variables read so far"""
+
+        return list(dict.keys(self))
+
+    @property
+    def lx(self) -> np.ndarray:
+        return self["lx"]
+
+    @functools.cached_property
+    def gridtype(self) -> str:
+        """
+        "dipole" (curvilinear) if metric factor h1 differs from 1, else "cartesian"
+        """
+
+        h1 = self.get("h1")
+        if h1 is not None and (abs(h1.min() - 1) > 1e-4 or abs(h1.max() - 1) > 1e-4):
+            return "dipole"
+
+        return "cartesian"
+
+    @functools.cached_property
+    def nullmask(self) -> np.ndarray:
+        """True at null points of the grid that are not simulated"""
+
+        if "nullpts" in self:
+            return np.asarray(self["nullpts"]) > 0.5
+
+        return np.zeros(self["lx"], dtype=bool)
+
+    def __setitem__(self, key: str, value) -> None:
+        self._names[key] = None
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key: str) -> None:
+        del self._names[key]
+        dict.pop(self, key, None)
+
+    def __contains__(self, key) -> bool:
+        return key in self._names
+
+    def __iter__(self) -> T.Iterator[str]:
+        # a copy, since reading variables while iterating adds them to the dict
+        return iter(list(self._names))
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __repr__(self) -> str:
+        return f"Grid({self.file}, loaded={self.loaded})"
+
+    def __reduce__(self):
+        # pickle only what is loaded, e.g. sending to worker processes
+        return (_grid_restore, (self.file, self._dt, self._names, dict(dict.items(self))))
+
+    def get(self, key: str, default=None):
+        return self[key] if key in self._names else default
+
+    def keys(self):  # type: ignore[override]
+        return collections.abc.KeysView(self)
+
+    def values(self):  # type: ignore[override]
+        return collections.abc.ValuesView(self)
+
+    def items(self):  # type: ignore[override]
+        return collections.abc.ItemsView(self)
+
+    def pop(self, key: str, *default):
+        if key not in self._names:
+            if default:
+                return default[0]
+            raise KeyError(key)
+
+        value = self[key]
+        del self[key]
+        return value
+
+    def setdefault(self, key: str, default=None):
+        if key not in self._names:
+            self[key] = default
+
+        return self[key]
+
+    def update(self, *args, **kwargs) -> None:
+        for k, v in dict(*args, **kwargs).items():
+            self[k] = v
+
+    def copy(self) -> Grid:
+        return _grid_restore(self.file, self._dt, self._names, dict(dict.items(self)))
+
+
+def _grid_restore(
+    file: Path, dt: np.dtype | None, names: dict[str, None], loaded: dict[str, T.Any]
+) -> Grid:
+    xg = Grid.__new__(Grid)
+    dict.update(xg, loaded)
+    xg.file = file
+    xg._dt = dt
+    xg._names = dict(names)
 
     return xg
 
 
+def _grid_var(f: h5py.File, k: str, dt: np.dtype | None):
+    """read one grid variable, transposed to (x1, x2, x3) order"""
+
+    # HDF5 converts the type while reading, without an extra copy
+    d = f[k].astype(dt) if dt and f[k].dtype.kind == "f" else f[k]
+    if f[k].ndim >= 2:
+        return d[:].transpose()
+    elif f[k].size > 1:
+        return d[:]
+
+    # value, as a Dataset would be unusable once the file closes
+    return d[()]
+
+
+# variable => (dataset, dimensions) of each input file, by input type
+EFIELD_DATASETS: dict[str, tuple[str, tuple[str, ...]]] = {
+    "flagdirich": ("/flagdirich", ()),
+    "Exit": ("/Exit", ("mlat", "mlon")),
+    "Eyit": ("/Eyit", ("mlat", "mlon")),
+    "Vminx1it": ("/Vminx1it", ("mlat", "mlon")),
+    "Vmaxx1it": ("/Vmaxx1it", ("mlat", "mlon")),
+    "Vminx2ist": ("/Vminx2ist", ("mlat",)),
+    "Vmaxx2ist": ("/Vmaxx2ist", ("mlat",)),
+    "Vminx3ist": ("/Vminx3ist", ("mlon",)),
+    "Vmaxx3ist": ("/Vmaxx3ist", ("mlon",)),
+}
+
+PRECIP_DATASETS: dict[str, tuple[str, tuple[str, ...]]] = {
+    "Q": ("/Qp", ("mlat", "mlon")),
+    "E0": ("/E0p", ("mlat", "mlon")),
+}
+
+
+def input_datasets(
+    file: Path, names: dict[str, tuple[str, tuple[str, ...]]]
+) -> dict[str, T.Any]:
+    """
+    read the datasets of one input file, e.g. E-field or precipitation
+
+    Parameters
+    ----------
+    file: pathlib.Path
+        input file
+    names: dict
+        variable => (dataset, dimensions), e.g. EFIELD_DATASETS
+
+    Returns
+    -------
+    dat: dict of numpy.ndarray
+        variables present in the file
+    """
+
+    with _open(file) as f:
+        return {k: f[n][()] for k, (n, _) in names.items() if n in f}
+
+
 def Efield(file: Path) -> xarray.Dataset:
     """
     load electric field
     """
 
-    with h5py.File(file.with_name("simgrid.h5"), "r") as f:
+    with _open(file.with_name("simgrid.h5")) as f:
         E = xarray.Dataset(coords={"mlon": f["/mlon"][:], "mlat": f["/mlat"][:]})
 
-    with h5py.File(file, "r") as f:
+    with _open(file) as f:
         E["flagdirich"] = f["flagdirich"][()].item()
         for p in {"Exit", "Eyit", "Vminx1it", "Vmaxx1it"}:
             E[p] = (("mlat", "mlon"), f[p][:])
@@ -163,38 +436,60 @@ def precip(file: Path) -> xarray.Dataset:
     load precipitation
     """
 
-    with h5py.File(file.with_name("simgrid.h5"), "r") as f:
+    with _open(file.with_name("simgrid.h5")) as f:
         dat = xarray.Dataset(coords={"mlon": f["/mlon"][:], "mlat": f["/mlat"][:]})
 
-    with h5py.File(file, "r") as f:
+    with _open(file) as f:
         for k in {"Q", "E0"}:
             dat[k] = (("mlat", "mlon"), f[f"/{k}p"][:])
 
     return dat
 
 
-def frame3d_curvne(file: Path, xg: dict[str, T.Any] | None = None) -> xarray.Dataset:
+def frame3d_curvne(
+    file: H5File,
+    xg: dict[str, T.Any] | None = None,
+    key: tuple[slice, slice, slice] | None = None,
+    dtype: str | None = None,
+) -> xarray.Dataset:
     """
     reads only dataset "ne" from a 3D curvilinear simulation output
+
+    Parameters
+    ----------
+    file: pathlib.Path or h5py.File
+        filename to read
+    key: tuple of slice, optional
+        (x1, x2, x3) hyperslab to read, default is the whole grid
+    dtype: str, optional
+        dtype policy, see gemini3d.utils.get_dtype
     """
 
     if not xg:
-        xg = grid(file.parent, var={"x1", "x2", "x3"})
+        xg = grid(_path(file).parent, var={"x1", "x2", "x3"}, dtype=dtype)
+
+    if key is None:
+        key = (slice(None),) * 3
+
+    dt = get_dtype(dtype)
 
     dat = xarray.Dataset(
         coords={"x1": xg["x1"][2:-2], "x2": xg["x2"][2:-2], "x3": xg["x3"][2:-2]}
-    )
-
-    p3 = (2, 1, 0)
+    ).isel(x1=key[0], x2=key[1], x3=key[2])
 
-    with h5py.File(file, "r") as f:
-        dat["ne"] = (("x1", "x2", "x3"), f["/ne"][:].transpose(p3))
+    with _open(file) as f:
+        dat["ne"] = (("x1", "x2", "x3"), hyperslab(f["/ne"], key, dtype=dt))
 
     return dat
 
 
 def frame3d_curv(
-    file: Path, var: set[str], xg: dict[str, T.Any] | None = None
+    file: H5File,
+    var: set[str],
+    xg: dict[str, T.Any] | None = None,
+    key: tuple[slice, slice, slice] | None = None,
+    species: T.Sequence[str | int] | None = None,
+    dtype: str | None = None,
 ) -> xarray.Dataset:
     """
     read datasets from 3D curvilinear simulation output
@@ -202,10 +497,20 @@ def frame3d_curv(
     Parameters
     ----------
 
-    file: pathlib.Path
+    file: pathlib.Path or h5py.File
         filename to read
     var: set of str
         variable(s) to read
+    key: tuple of slice, optional
+        (x1, x2, x3) hyperslab to read, default is the whole grid
+    species: list of str or int, optional
+        species of "ns", "vs1", "Ts" to read, default all
+    dtype: str, optional
+        dtype policy, see gemini3d.utils.get_dtype
+
+    Only the species needed are read from "nsall", "vs1all", "Tsall":
+    electrons for ne and Te, all species for Ti and v1, plus those requested.
+    The species arrays share one "species" coordinate of SPECIES names.
     """
 
     if isinstance(var, str):
@@ -213,7 +518,12 @@ def frame3d_curv(
     var = set(var)
 
     if not xg:
-        xg = grid(file.parent, var={"x1", "x2", "x3"})
+        xg = grid(_path(file).parent, var={"x1", "x2", "x3"}, dtype=dtype)
+
+    if key is None:
+        key = (slice(None),) * 3
+
+    dt = get_dtype(dtype)
 
     if xg.get("filename", Path()).stem == "amrgrid":
         # FIXME: perhaps make a config.nml flag indicating AMR grid used?
@@ -223,92 +533,289 @@ def frame3d_curv(
             coords={"x1": xg["x1"][2:-2], "x2": xg["x2"][2:-2], "x3": xg["x3"][2:-2]}
         )
 
+    dat = dat.isel(x1=key[0], x2=key[1], x3=key[2])
+
     lx = xg["lx"]
 
-    p4 = (0, 3, 2, 1)
-    p3 = (2, 1, 0)
+    isp = species_index(var, species)
+    if isp or {"ns", "vs1", "Ts"} & var:
+        dat = dat.assign_coords(species=[SPECIES[i] for i in isp])
+    # h5py reads a contiguous range as a hyperslab, else by point list.
+    # No species, e.g. var={"ns"} with species=[], is an empty selection.
+    sp: slice | list[int] = slice(0, 0)
+    if isp:
+        sp = slice(isp[0], isp[-1] + 1) if isp[-1] - isp[0] + 1 == len(isp) else isp
 
-    with h5py.File(file, "r") as f:
+    with _open(file) as f:
         if {"ne", "ns", "v1", "Ti"} & var:
-            dat["ns"] = (("species", "x1", "x2", "x3"), f["/nsall"][:].transpose(p4))
+            dat["ns"] = (
+                ("species", "x1", "x2", "x3"),
+                hyperslab(f["/nsall"], key, sp, dtype=dt),
+            )
 
         if {"v1", "vs1"} & var:
-            dat["vs1"] = (("species", "x1", "x2", "x3"), f["/vs1all"][:].transpose(p4))
+            dat["vs1"] = (
+                ("species", "x1", "x2", "x3"),
+                hyperslab(f["/vs1all"], key, sp, dtype=dt),
+            )
 
         if {"Te", "Ti", "Ts"} & var:
-            dat["Ts"] = (("species", "x1", "x2", "x3"), f["/Tsall"][:].transpose(p4))
+            dat["Ts"] = (
+                ("species", "x1", "x2", "x3"),
+                hyperslab(f["/Tsall"], key, sp, dtype=dt),
+            )
 
         for k in {"J1", "J2", "J3"} & var:
-            dat[k] = (("x1", "x2", "x3"), f[f"/{k}all"][:].transpose(p3))
+            dat[k] = (("x1", "x2", "x3"), hyperslab(f[f"/{k}all"], key, dtype=dt))
 
         for k in {"v2", "v3"} & var:
-            dat[k] = (("x1", "x2", "x3"), f[f"/{k}avgall"][:].transpose(p3))
+            dat[k] = (("x1", "x2", "x3"), hyperslab(f[f"/{k}avgall"], key, dtype=dt))
 
         if "Phi" in var:
-            Phiall = f["/Phiall"][:]
-
-            if Phiall.ndim == 1:
-                if lx[1] == 1:
-                    Phiall = Phiall[None, :]
-                else:
-                    Phiall = Phiall[:, None]
-
-            dat["Phitop"] = (("x2", "x3"), Phiall.transpose())
+            dat["Phitop"] = (
+                ("x2", "x3"),
+                variable(f, "Phitop", 1, key[1:], lx, dtype=dtype),
+            )
 
     return dat
 
 
 def frame3d_curvavg(
-    file: Path, var: set[str], xg: dict[str, T.Any] | None = None
+    file: H5File,
+    var: set[str],
+    xg: dict[str, T.Any] | None = None,
+    key: tuple[slice, slice, slice] | None = None,
+    dtype: str | None = None,
 ) -> xarray.Dataset:
     """
     read datasets from an averaged 3D curvilinear simulation output
 
     Parameters
     ----------
-    file: pathlib.Path
+    file: pathlib.Path or h5py.File
         filename of this timestep of simulation output
     var: set of str
         variable(s) to read
+    key: tuple of slice, optional
+        (x1, x2, x3) hyperslab to read, default is the whole grid
+    dtype: str, optional
+        dtype policy, see gemini3d.utils.get_dtype
     """
 
     if not xg:
-        xg = grid(file.parent, var={"x1", "x2", "x3"})
+        xg = grid(_path(file).parent, var={"x1", "x2", "x3"}, dtype=dtype)
+
+    if key is None:
+        key = (slice(None),) * 3
+
+    dt = get_dtype(dtype)
 
     dat = xarray.Dataset(
         coords={"x1": xg["x1"][2:-2], "x2": xg["x2"][2:-2], "x3": xg["x3"][2:-2]}
-    )
+    ).isel(x1=key[0], x2=key[1], x3=key[2])
 
-    p3 = (2, 1, 0)
-
-    v2n = {
-        "ne": "neall",
-        "v1": "v1avgall",
-        "Ti": "Tavgall",
-        "Te": "TEall",
-        "J1": "J1all",
-        "J2": "J2all",
-        "J3": "J3all",
-        "v2": "v2avgall",
-        "v3": "v3avgall",
-        "Phi": "Phiall",
-    }
+    v2n = CURVAVG_NAMES
 
     if isinstance(var, str):
         var = [var]
 
-    with h5py.File(file, "r") as f:
+    with _open(file) as f:
         var = set(var) if var else f.keys()
 
         for k in var:
             if k == "Phi":
-                dat["Phitop"] = (("x2", "x3"), f[f"/{v2n[k]}"][:].transpose())
+                dat["Phitop"] = (
+                    ("x2", "x3"),
+                    hyperslab(f[f"/{v2n[k]}"], key[1:], dtype=dt),
+                )
             else:
-                dat[k] = (("x1", "x2", "x3"), f[f"/{v2n[k]}"][:].transpose(p3))
+                dat[k] = (("x1", "x2", "x3"), hyperslab(f[f"/{v2n[k]}"], key, dtype=dt))
 
     return dat
 
 
+# variable name => HDF5 datasets it is read or derived from, by flagoutput
+FRAME_DATASETS: dict[int, dict[str, tuple[str, ...]]] = {
+    1: {
+        "ns": ("nsall",),
+        "vs1": ("vs1all",),
+        "Ts": ("Tsall",),
+        "ne": ("nsall",),
+        "Te": ("Tsall",),
+        "Ti": ("nsall", "Tsall"),
+        "v1": ("nsall", "vs1all"),
+        "J1": ("J1all",),
+        "J2": ("J2all",),
+        "J3": ("J3all",),
+        "v2": ("v2avgall",),
+        "v3": ("v3avgall",),
+        "Phitop": ("Phiall",),
+    },
+    2: {("Phitop" if k == "Phi" else k): (v,) for k, v in CURVAVG_NAMES.items()},
+    3: {"ne": ("ne",)},
+}
+
+
+def species_index(
+    var: set[str], species: T.Sequence[str | int] | None = None
+) -> list[int]:
+    """
+    sorted species indices to read from the 4-D state variables for var
+
+    Parameters
+    ----------
+    var: set of str
+        variable(s) to read or derive
+    species: list of str or int, optional
+        species names (SPECIES) or indices wanted for "ns", "vs1", "Ts", default all
+    """
+
+    isp = set()
+    if {"ne", "Te", "Ti", "v1"} & var:
+        isp.add(LSP - 1)
+    if {"Ti", "v1"} & var:
+        isp.update(range(LSP - 1))
+    if {"ns", "vs1", "Ts"} & var:
+        if species is None:
+            species = range(LSP)
+        for s in species:
+            isp.add(SPECIES.index(s) if isinstance(s, str) else range(LSP)[s])
+
+    return sorted(isp)
+
+
+def hyperslab(
+    dset: h5py.Dataset,
+    key: tuple[slice, ...],
+    species: slice | list[int] | None = None,
+    out: np.ndarray | None = None,
+    dtype: np.dtype | None = None,
+) -> np.ndarray:
+    """
+    read a (x1, x2, x3) selection of a dataset stored in Fortran order.
+    The selection is done by h5py so only the chunks touched are read and decompressed.
+
+    The returned array is a transposed view of the data in storage order, so it is
+    Fortran-contiguous and no reordering copy is made.
+
+    Parameters
+    ----------
+    dset: h5py.Dataset
+        dataset stored as (x3, x2, x1) or (species, x3, x2, x1)
+    key: tuple of slice
+        selection in (x1, x2, x3) order
+    species: slice or list of int, optional
+        species selection for 4-D datasets
+    out: numpy.ndarray, optional
+        C-contiguous buffer in storage order to read directly into
+    dtype: numpy.dtype, optional
+        convert to this dtype while reading, default as stored
+    """
+
+    sel = key[::-1] if species is None else (species, *key[::-1])
+
+    if out is None:
+        arr = dset.astype(dtype)[sel] if dtype else dset[sel]
+    else:
+        if out.size:
+            dset.read_direct(out, sel)
+        arr = out
+
+    return arr.transpose() if species is None else arr.transpose((0, 3, 2, 1))
+
+
+def _fill(out: np.ndarray | None, arr: np.ndarray) -> np.ndarray:
+    """copy a computed (x1, ...) result into storage-order buffer out, if given"""
+
+    if out is None:
+        return arr
+
+    v = out.transpose((0, 3, 2, 1)) if out.ndim == 4 else out.transpose()
+    v[...] = arr
+    return v
+
+
+def variable(
+    f: h5py.File,
+    name: str,
+    flag: int,
+    key: tuple[slice, ...],
+    lx: tuple[int, ...] | np.ndarray,
+    out: np.ndarray | None = None,
+    dtype: str | None = None,
+) -> np.ndarray:
+    """
+    read one variable of a frame, deriving it from the species arrays if needed
+
+    Parameters
+    ----------
+    f: h5py.File
+        open simulation output file
+    name: str
+        variable name e.g. "ne", "Ti", "Phitop"
+    flag: int
+        flagoutput of the file
+    key: tuple of slice
+        (x1, x2, x3) selection; "ns", "vs1", "Ts" have a leading species slice
+        and "Phitop" is (x2, x3)
+    lx: tuple of int
+        simulation grid size
+    out: numpy.ndarray, optional
+        C-contiguous buffer in storage order, e.g. (x3, x2, x1), to read into
+    dtype: str, optional
+        dtype policy if out is not given, see gemini3d.utils.get_dtype
+
+    Returns
+    -------
+    dat: numpy.ndarray
+        data indexed (x1, x2, x3), a view of out if given
+    """
+
+    dt = get_dtype(dtype) if out is None else None
+
+    if name == "Phitop":
+        dset = f["/Phiall"]
+        if dset.ndim > 1:
+            return hyperslab(dset, key, out=out, dtype=dt)
+
+        Phiall = dset.astype(dt)[:] if dt else dset[:]
+        if lx[1] == 1:
+            Phiall = Phiall[None, :]
+        else:
+            Phiall = Phiall[:, None]
+        return _fill(out, Phiall.transpose()[key])
+
+    # electron slab of a 4-D dataset, read into a length-1 species axis of out
+    e = slice(LSP - 1, LSP)
+    oe = None if out is None else out[None]
+
+    if flag == 1:
+        if name in {"ns", "vs1", "Ts"}:
+            return hyperslab(f[f"/{name}all"], key[1:], key[0], out, dt)
+        if name == "ne":
+            return hyperslab(f["/nsall"], key, e, oe, dt)[0]
+        if name == "Te":
+            return hyperslab(f["/Tsall"], key, e, oe, dt)[0]
+        if name in {"Ti", "v1"}:
+            ns = hyperslab(f["/nsall"], key, slice(0, LSP), dtype=dt)
+            x = hyperslab(
+                f["/Tsall" if name == "Ti" else "/vs1all"], key, slice(0, 6), dtype=dt
+            )
+            return _fill(out, (ns[:6] * x).sum(axis=0) / ns[LSP - 1])
+        if name in {"J1", "J2", "J3"}:
+            return hyperslab(f[f"/{name}all"], key, out=out, dtype=dt)
+        if name in {"v2", "v3"}:
+            return hyperslab(f[f"/{name}avgall"], key, out=out, dtype=dt)
+    elif flag == 2:
+        if name in CURVAVG_NAMES:
+            return hyperslab(f[f"/{CURVAVG_NAMES[name]}"], key, out=out, dtype=dt)
+    elif flag == 3:
+        if name == "ne":
+            return hyperslab(f["/ne"], key, out=out, dtype=dt)
+
+    raise KeyError(f"{name} is not available from flagoutput {flag} file {f.filename}")
+
+
 def glow_aurmap(file: Path, xg: dict[str, T.Any] | None = None) -> xarray.Dataset:
     """
     read the auroral output from GLOW
@@ -328,7 +835,7 @@ def glow_aurmap(file: Path, xg: dict[str, T.Any] | None = None) -> xarray.Datase
 
     p3 = (0, 2, 1)
 
-    with h5py.File(file, "r") as h:
+    with _open(file) as h:
         dat["rayleighs"] = (
             ("wavelength", "x2", "x3"),
             h["/aurora/iverout"][:].transpose(p3),
@@ -337,13 +844,13 @@ def glow_aurmap(file: Path, xg: dict[str, T.Any] | None = None) -> xarray.Datase
     return dat
 
 
-def time(file: Path) -> datetime:
+def time(file: H5File) -> datetime:
     """
     reads simulation time
     """
 
     try:
-        with h5py.File(file, "r") as f:
+        with _open(file) as f:
             ymd = datetime(*f["/time/ymd"][:3])
 
             try:
@@ -354,8 +861,8 @@ def time(file: Path) -> datetime:
         t = ymd + timedelta(hours=hour)
     except KeyError:
         logging.error(
-            f"/time group missing from {file}, getting time from filename pattern."
+            f"/time group missing from {_path(file)}, getting time from filename pattern."
         )
-        t = filename2datetime(file)
+        t = filename2datetime(_path(file))
 
     return t
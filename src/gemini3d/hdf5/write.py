@@ -7,16 +7,173 @@ import typing as T
 from pathlib import Path
 from datetime import datetime
 import logging
+import os
+import concurrent.futures
+import itertools
+import multiprocessing
 
 import h5py
 import numpy as np
 
 from ..utils import datetime2stem, to_datetime
+from . import pool
+from .read import Grid
+from ..grid.slab import Slab, x3_axis, shapes as slab_shapes
 
 CLVL = 3  # GZIP compression level: larger => better compression, slower to write
+CHUNK_BYTES = 2**20  # chunk size of profiles with aligned chunks
+
+# dataset creation options of array datasets, by write profile.
+# "fast" is uncompressed since Gemini3D can read only GZIP-compressed HDF5 files.
+# "analysis" chunks keep whole x1 columns together, for reading profiles and slabs.
+WRITE_PROFILES: dict[str, dict[str, T.Any]] = {
+    "default": {
+        "compression": "gzip",
+        "compression_opts": CLVL,
+        "shuffle": True,
+        "fletcher32": True,
+    },
+    "archive": {
+        "compression": "gzip",
+        "compression_opts": 9,
+        "shuffle": True,
+        "fletcher32": True,
+    },
+    "fast": {},
+    "analysis": {
+        "compression": "gzip",
+        "compression_opts": 1,
+        "shuffle": True,
+        "fletcher32": True,
+        "chunks": "x1",
+    },
+}
+
+_write_profile = {"profile": os.environ.get("GEMINI_WRITE_PROFILE", "default")}
+
+# variable => dataset name of simulation output frames, by flagoutput
+FRAME_NAMES: dict[int, dict[str, str]] = {
+    1: {
+        "ns": "nsall",
+        "vs1": "vs1all",
+        "Ts": "Tsall",
+        "J1": "J1all",
+        "J2": "J2all",
+        "J3": "J3all",
+        "v2": "v2avgall",
+        "v3": "v3avgall",
+        "Phitop": "Phiall",
+    },
+    2: {
+        "ne": "neall",
+        "v1": "v1avgall",
+        "Ti": "Tavgall",
+        "Te": "TEall",
+        "J1": "J1all",
+        "J2": "J2all",
+        "J3": "J3all",
+        "v2": "v2avgall",
+        "v3": "v3avgall",
+        "Phitop": "Phiall",
+    },
+    3: {"ne": "ne"},
+}
+
+
+def set_profile(profile: str) -> None:
+    """
+    set the global write profile of HDF5 writers
+
+    Parameters
+    ----------
+    profile: str
+        one of WRITE_PROFILES, e.g. "default", "archive", "fast" or "analysis"
+    """
+
+    get_profile(profile)
+    _write_profile["profile"] = profile
+
+
+def get_profile(profile: str | None = None) -> str:
+    """
+    resolve a write profile name
+
+    Parameters
+    ----------
+    profile: str, optional
+        per-call profile, default is the global profile from set_profile()
+        or environment variable GEMINI_WRITE_PROFILE
+    """
+
+    if profile is None:
+        profile = _write_profile["profile"]
+
+    if profile not in WRITE_PROFILES:
+        raise ValueError(
+            f"write profile must be one of {list(WRITE_PROFILES)}, not {profile}"
+        )
+
+    return profile
+
+
+def dataset_options(
+    shape: tuple[int, ...],
+    itemsize: int = 4,
+    profile: str | None = None,
+    clvl: int | None = None,
+) -> dict[str, T.Any]:
+    """
+    h5py create_dataset options of a write profile for a dataset of this shape
+
+    Parameters
+    ----------
+    shape: tuple of int
+        dataset shape, in h5py (C) order
+    itemsize: int
+        bytes per element
+    profile: str, optional
+        write profile, see get_profile
+    clvl: int, optional
+        GZIP compression level overriding that of the profile
+    """
+
+    opts = dict(WRITE_PROFILES[get_profile(profile)])
+
+    if not shape:
+        # scalars can't be chunked or filtered
+        return {}
+
+    if clvl is not None and opts.get("compression") == "gzip":
+        opts["compression_opts"] = clvl
+
+    if opts.get("chunks") == "x1":
+        opts["chunks"] = _column_chunks(shape, itemsize) if len(shape) > 1 else True
+
+    return opts
+
+
+def _column_chunks(shape: tuple[int, ...], itemsize: int) -> tuple[int, ...]:
+    """
+    chunk shape with whole columns of the last (x1) dimension, halving the largest
+    other dimension until the chunk is at most CHUNK_BYTES
+    """
+
+    c = [max(n, 1) for n in shape]
+    while np.prod(c) * itemsize > CHUNK_BYTES and max(c) > 1:
+        i = int(np.argmax(c[:-1])) if max(c[:-1]) > 1 else len(c) - 1
+        c[i] = (c[i] + 1) // 2
+
+    return tuple(c)
 
 
-def state(fn: Path, dat) -> None:
+def _create(fn: Path) -> h5py.File:
+    """create (truncate) fn, first closing any pooled read handle on it"""
+
+    pool.evict(fn)
+    return h5py.File(fn, "w")
+
+
+def state(fn: Path, dat, *, profile: str | None = None) -> None:
     """
     write STATE VARIABLE initial conditions
 
@@ -34,22 +191,57 @@ def state(fn: Path, dat) -> None:
         output filename
     dat: xarray.Dataset
         data to write
+    profile: str, optional
+        write profile, see get_profile
     """
 
     logging.info(f"state: {fn}")
 
-    with h5py.File(fn, "w") as f:
+    with _create(fn) as f:
         write_time(f, to_datetime(dat.time))
 
         for k in {"ns", "vs1", "Ts"}:
             if k in dat.data_vars:
-                _write_var(f, f"/{k}all", dat[k])
+                _write_var(f, f"/{k}all", dat[k], profile=profile)
 
         if "Phitop" in dat.data_vars:
-            _write_var(f, "/Phiall", dat["Phitop"])
+            _write_var(f, "/Phiall", dat["Phitop"], profile=profile)
+
+
+def frame(
+    fn: Path, dat, flag: int, clvl: int | None = None, *, profile: str | None = None
+) -> None:
+    """
+    write a simulation output frame, as Gemini3D does with this flagoutput
+
+    Parameters
+    ----------
+
+    fn: pathlib.Path
+        output filename
+    dat: xarray.Dataset
+        frame data, e.g. from gemini3d.raw.read.data
+    flag: int
+        flagoutput
+    clvl: int, optional
+        GZIP compression level, default that of the profile
+    profile: str, optional
+        write profile, see get_profile
+    """
+
+    logging.info(f"frame: {fn}")
+
+    with _create(fn) as f:
+        write_time(f, to_datetime(dat.time))
+
+        for k, name in FRAME_NAMES[flag].items():
+            if k in dat.data_vars:
+                _write_var(f, f"/{name}", dat[k], clvl, profile)
 
 
-def _write_var(fid, name: str, A) -> None:
+def _write_var(
+    fid, name: str, A, clvl: int | None = None, profile: str | None = None
+) -> None:
     """
     NOTE: The .transpose() reverses the dimension order.
     The HDF Group never implemented the intended H5T_array_create(..., perm)
@@ -87,14 +279,13 @@ def _write_var(fid, name: str, A) -> None:
         name,
         data=A,
         dtype=np.float32,  # float32 saves disk space
-        compression="gzip",  # GZIP is universally available with HDF5
-        compression_opts=CLVL,
-        shuffle=True,
-        fletcher32=True,
+        **dataset_options(A.shape, 4, profile, clvl),
     )
 
 
-def grid(size_fn: Path, grid_fn: Path, xg: dict[str, T.Any]) -> None:
+def grid(
+    size_fn: Path, grid_fn: Path, xg: dict[str, T.Any], *, profile: str | None = None
+) -> None:
     """writes grid to disk
 
     Parameters
@@ -106,6 +297,8 @@ def grid(size_fn: Path, grid_fn: Path, xg: dict[str, T.Any]) -> None:
         file to write
     xg: dict
         grid values
+    profile: str, optional
+        write profile, see get_profile
 
     NOTE: The .transpose() reverses the dimension order.
     The HDF Group never implemented the intended H5T_array_create(..., perm)
@@ -115,17 +308,21 @@ def grid(size_fn: Path, grid_fn: Path, xg: dict[str, T.Any]) -> None:
     need the .transpose() for h5py
     """
 
+    if isinstance(xg, Grid):
+        # the grid may be read from the files about to be overwritten
+        xg.load()
+
     if "lx" not in xg:
         xg["lx"] = np.array((xg["x1"].shape, xg["x2"].shape, xg["x3"].shape)).astype(
             np.int32
         )
 
     logging.info(f"write_grid: {size_fn}")
-    with h5py.File(size_fn, "w") as h:
+    with _create(size_fn) as h:
         h["/lx"] = np.asarray(xg["lx"]).astype(np.int32)
 
     logging.info(f"write_grid: {grid_fn}")
-    with h5py.File(grid_fn, "w") as h:
+    with _create(grid_fn) as h:
         for i in {1, 2, 3}:
             for k in {
                 f"x{i}",
@@ -146,10 +343,7 @@ def grid(size_fn: Path, grid_fn: Path, xg: dict[str, T.Any]) -> None:
                         f"/{k}",
                         data=xg[k].transpose(),
                         dtype=np.float32,
-                        compression="gzip",
-                        compression_opts=CLVL,
-                        shuffle=True,
-                        fletcher32=True,
+                        **dataset_options(xg[k].shape[::-1], 4, profile),
                     )
                 else:
                     h[f"/{k}"] = xg[k].astype(np.float32)
@@ -175,15 +369,13 @@ def grid(size_fn: Path, grid_fn: Path, xg: dict[str, T.Any]) -> None:
                 logging.info(f"SKIP: {k}")
                 continue
 
+            shape = tuple(xg["lx"][::-1])
             h.create_dataset(
                 f"/{k}",
-                shape=xg["lx"][::-1],
+                shape=shape,
                 data=xg[k].transpose(),
                 dtype=np.float32,
-                compression="gzip",
-                compression_opts=CLVL,
-                shuffle=True,
-                fletcher32=True,
+                **dataset_options(shape, 4, profile),
             )
 
         # %% 2-D
@@ -192,15 +384,13 @@ def grid(size_fn: Path, grid_fn: Path, xg: dict[str, T.Any]) -> None:
                 logging.info(f"SKIP: {k}")
                 continue
 
+            shape = (xg["lx"][1], xg["lx"][2])[::-1]
             h.create_dataset(
                 f"/{k}",
-                shape=(xg["lx"][1], xg["lx"][2])[::-1],
+                shape=shape,
                 data=xg[k].transpose(),
                 dtype=np.float32,
-                compression="gzip",
-                compression_opts=CLVL,
-                shuffle=True,
-                fletcher32=True,
+                **dataset_options(shape, 4, profile),
             )
 
         # %% 4-D
@@ -209,15 +399,13 @@ def grid(size_fn: Path, grid_fn: Path, xg: dict[str, T.Any]) -> None:
                 logging.info(f"SKIP: {k}")
                 continue
 
+            shape = (*xg["lx"], 3)[::-1]
             h.create_dataset(
                 f"/{k}",
-                shape=(*xg["lx"], 3)[::-1],
+                shape=shape,
                 data=xg[k].transpose(),
                 dtype=np.float32,
-                compression="gzip",
-                compression_opts=CLVL,
-                shuffle=True,
-                fletcher32=True,
+                **dataset_options(shape, 4, profile),
             )
 
         if "glonctr" in xg:
@@ -225,85 +413,211 @@ def grid(size_fn: Path, grid_fn: Path, xg: dict[str, T.Any]) -> None:
             h["/glatctr"] = xg["glatctr"]
 
 
-def Efield(outdir: Path, E) -> None:
+def grid_slabs(
+    size_fn: Path,
+    grid_fn: Path,
+    header: dict[str, T.Any],
+    slabs: T.Iterable[Slab],
+    *,
+    profile: str | None = None,
+) -> None:
+    """writes a grid generated in x3 slabs to disk, one slab in memory at a time.
+    The files are the same as grid() writes for the whole grid.
+
+    Parameters
+    ----------
+
+    size_fn: pathlib.Path
+        file to write
+    grid_fn: pathlib.Path
+        file to write
+    header: dict
+        grid size and 1-D grid values, see gemini3d.grid.slab
+    slabs: iterable of dict
+        3-D and 4-D grid values by x3 range
+    profile: str, optional
+        write profile, see get_profile
+    """
+
+    lx = np.asarray(header["lx"]).astype(np.int32)
+
+    logging.info(f"write_grid: {size_fn}")
+    with _create(size_fn) as h:
+        h["/lx"] = lx
+
+    logging.info(f"write_grid: {grid_fn}")
+    with _create(grid_fn) as h:
+        for i in {1, 2, 3}:
+            for k in {f"x{i}", f"x{i}i", f"dx{i}b", f"dx{i}h"}:
+                h[f"/{k}"] = header[k].astype(np.float32)
+
+        dsets = {}
+        for k, shape in slab_shapes(tuple(lx)).items():
+            dsets[k] = h.create_dataset(
+                f"/{k}",
+                shape=shape[::-1],
+                dtype=np.float32,
+                **dataset_options(shape[::-1], 4, profile),
+            )
+
+        for s in slabs:
+            for k, (a, v) in s.items():
+                ax = x3_axis(v.ndim)
+                key = [slice(None)] * v.ndim
+                key[v.ndim - 1 - ax] = slice(a, a + v.shape[ax])
+                dsets[k][tuple(key)] = v.transpose()
+
+        # the grid center may be known only after the last slab
+        if "glonctr" in header:
+            h["/glonctr"] = header["glonctr"]
+            h["/glatctr"] = header["glatctr"]
+
+
+def Efield(
+    outdir: Path, E, *, profile: str | None = None, workers: int | None = None
+) -> None:
     """
-    write Efield to disk
+    write Efield to disk, one file per time
 
     Parameters
     ----------
 
     E: xarray.Dataset
         Electric field
+    profile: str, optional
+        write profile, see get_profile
+    workers: int, optional
+        number of worker processes, default CPU count. 1 writes in this process,
+        the default when called from a worker process, e.g. a gemini3d.build stage.
     """
 
-    with h5py.File(outdir / "simsize.h5", "w") as f:
+    with _create(outdir / "simsize.h5") as f:
         f.create_dataset("/llon", data=E.mlon.size, dtype=np.int32)
         f.create_dataset("/llat", data=E.mlat.size, dtype=np.int32)
 
-    with h5py.File(outdir / "simgrid.h5", "w") as f:
+    with _create(outdir / "simgrid.h5") as f:
         f["/mlon"] = E.mlon.astype(np.float32)
         f["/mlat"] = E.mlat.astype(np.float32)
 
-    for t in E.time:
-        time: datetime = to_datetime(t)
-        fn = outdir / (datetime2stem(time) + ".h5")
+    # FOR EACH FRAME WRITE A BC TYPE AND THEN OUTPUT BACKGROUND AND BCs
+    data = {"/flagdirich": _by_time(E["flagdirich"], np.int32)}
+    for k in {"Exit", "Eyit", "Vminx1it", "Vmaxx1it"}:
+        data[f"/{k}"] = _by_time(E[k])
+    for k in {"Vminx2ist", "Vmaxx2ist", "Vminx3ist", "Vmaxx3ist"}:
+        data[f"/{k}"] = _by_time(E[k], np.float32)
 
-        # FOR EACH FRAME WRITE A BC TYPE AND THEN OUTPUT BACKGROUND AND BCs
-        with h5py.File(fn, "w") as f:
-            f["/flagdirich"] = E["flagdirich"].loc[time].astype(np.int32)
-            write_time(f, time)
+    times = [to_datetime(t) for t in E.time]
 
-            for k in {"Exit", "Eyit", "Vminx1it", "Vmaxx1it"}:
-                f.create_dataset(
-                    f"/{k}",
-                    data=E[k].loc[time].transpose(),
-                    dtype=np.float32,
-                    compression="gzip",
-                    compression_opts=CLVL,
-                    shuffle=True,
-                    fletcher32=True,
-                )
-            for k in {"Vminx2ist", "Vmaxx2ist", "Vminx3ist", "Vmaxx3ist"}:
-                f[f"/{k}"] = E[k].loc[time].astype(np.float32)
+    _write_inputs(outdir, times, data, profile, workers)
 
 
-def precip(outdir: Path, P) -> None:
+def precip(
+    outdir: Path, P, *, profile: str | None = None, workers: int | None = None
+) -> None:
     """
+    write precipitation to disk, one file per time
 
     Parameters
     ----------
 
     P: xarray.Dataset
         precipitation data
+    profile: str, optional
+        write profile, see get_profile
+    workers: int, optional
+        number of worker processes, default CPU count. 1 writes in this process,
+        the default when called from a worker process, e.g. a gemini3d.build stage.
     """
-    with h5py.File(outdir / "simsize.h5", "w") as f:
+    with _create(outdir / "simsize.h5") as f:
         f.create_dataset("/llon", data=P.mlon.size, dtype=np.int32)
         f.create_dataset("/llat", data=P.mlat.size, dtype=np.int32)
 
-    with h5py.File(outdir / "simgrid.h5", "w") as f:
+    with _create(outdir / "simgrid.h5") as f:
         f["/mlon"] = P.mlon.astype(np.float32)
         f["/mlat"] = P.mlat.astype(np.float32)
 
-    for t in P.time:
-        time: datetime = to_datetime(t)
-        fn = outdir / (datetime2stem(time) + ".h5")
+    data = {f"/{k}p": _by_time(P[k]) for k in {"Q", "E0"}}
+
+    times = [to_datetime(t) for t in P.time]
+
+    _write_inputs(outdir, times, data, profile, workers)
+
 
-        with h5py.File(fn, "w") as f:
-            write_time(f, to_datetime(time))
+def _by_time(A, dtype=None) -> np.ndarray:
+    """
+    values of a variable with time first and the other dimensions reversed,
+    so [i] is the dataset of time index i in HDF5 storage order
+    """
+
+    a = A.transpose("time", *[d for d in A.dims[::-1] if d != "time"]).values
+
+    return a if dtype is None else a.astype(dtype, copy=False)
+
+
+def _write_inputs(
+    outdir: Path,
+    times: list[datetime],
+    data: dict[str, np.ndarray],
+    profile: str | None,
+    workers: int | None,
+) -> None:
+    """
+    write one input file per time, in parallel unless workers=1.
+    data: dataset name => array with a leading time dimension
+    """
 
-            for k in {"Q", "E0"}:
+    # resolved here, as workers don't see set_profile() of this process
+    profile = get_profile(profile)
+
+    files = [outdir / (datetime2stem(t) + ".h5") for t in times]
+    # positional slices of the time axis, i.e. views
+    dsets = [{k: v[i] for k, v in data.items()} for i in range(len(times))]
+
+    if not workers:
+        # a pool per worker process of another pool would oversubscribe the CPUs
+        workers = 1 if multiprocessing.parent_process() else os.cpu_count() or 1
+    if workers == 1 or len(times) <= 1:
+        for fn, t, d in zip(files, times, dsets):
+            _write_input(fn, t, d, profile)
+        return
+
+    # many small files: send several per task to amortize the inter-process overhead
+    chunksize = max(1, len(times) // (4 * workers))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as ex:
+        for _ in ex.map(
+            _write_input,
+            files,
+            times,
+            dsets,
+            itertools.repeat(profile),
+            chunksize=chunksize,
+        ):
+            pass
+
+
+def _write_input(
+    fn: Path, time: datetime, data: dict[str, np.ndarray], profile: str
+) -> None:
+    """write one input file to a temporary file renamed when complete"""
+
+    tmp = fn.with_name(fn.name + ".tmp")
+
+    with _create(tmp) as f:
+        write_time(f, time)
+
+        for k, a in data.items():
+            if a.ndim >= 2:
                 f.create_dataset(
-                    f"/{k}p",
-                    data=P[k].loc[time].transpose(),
-                    dtype=np.float32,
-                    compression="gzip",
-                    compression_opts=CLVL,
-                    shuffle=True,
-                    fletcher32=True,
+                    k, data=a, dtype=np.float32, **dataset_options(a.shape, 4, profile)
                 )
+            else:
+                f[k] = a
+
+    pool.evict(fn)
+    os.replace(tmp, fn)
 
 
-def neutral(fn: Path, N) -> None:
+def neutral(fn: Path, N, clvl: int | None = None, *, profile: str | None = None) -> None:
     """
     write neutral data to disk
 
@@ -315,22 +629,29 @@ def neutral(fn: Path, N) -> None:
 
     N: dict of str, numpy.ndarray
         neutral data
+    clvl: int, optional
+        GZIP compression level, default that of the profile
+    profile: str, optional
+        write profile, see get_profile
     """
 
-    with h5py.File(fn, "w") as f:
+    with _create(fn) as f:
         for k in {"dn0all", "dnN2all", "dnO2all", "dvnrhoall", "dvnzall", "dTnall"}:
             f.create_dataset(
                 f"/{k}",
                 data=N[k],
                 dtype=np.float32,
-                compression="gzip",
-                compression_opts=CLVL,
-                shuffle=True,
-                fletcher32=True,
+                **dataset_options(np.shape(N[k]), 4, profile, clvl),
             )
 
 
-def maggrid(fn: Path, mag: dict[str, T.Any], gridsize: tuple[int, int, int]) -> None:
+def maggrid(
+    fn: Path,
+    mag: dict[str, T.Any],
+    gridsize: tuple[int, int, int],
+    *,
+    profile: str | None = None,
+) -> None:
     """
     hdf5 files can optionally store a gridsize variable which tells readers how to
     reshape the data into 2D or 3D arrays.
@@ -341,11 +662,15 @@ def maggrid(fn: Path, mag: dict[str, T.Any], gridsize: tuple[int, int, int]) ->
 
     freal = np.float32
 
-    with h5py.File(fn, "w") as f:
+    with _create(fn) as f:
         f.create_dataset("/lpoints", data=mag["r"].size, dtype=np.int32)
-        f["/r"] = mag["r"].ravel(order="F").astype(freal)
-        f["/theta"] = mag["theta"].ravel(order="F").astype(freal)
-        f["/phi"] = mag["phi"].ravel(order="F").astype(freal)
+        for k in ("r", "theta", "phi"):
+            f.create_dataset(
+                f"/{k}",
+                data=mag[k].ravel(order="F"),
+                dtype=freal,
+                **dataset_options((mag[k].size,), 4, profile),
+            )
         f["/gridsize"] = np.asarray(gridsize).astype(np.int32)
 
 
@@ -49,27 +49,13 @@ def runner(pr: dict[str, typing.Any]) -> None:
     except FileNotFoundError:
         pass
 
-    # %% setup grid and/or initial ionosphere state if needed
-    for k in {"indat_size", "indat_grid", "indat_file"}:
-        f = out_dir / p[k].expanduser()
-        if pr.get("force") or not f.is_file():
-            model.setup(p["nml"], out_dir)
+    # %% setup grid, initial ionosphere state, Efield and precip as needed
+    # only inputs missing or out of date with config.nml are built
+    model.setup(p["nml"], out_dir, force=pr.get("force", False))
 
     # %% estimate simulation RAM use on root MPI node
     ram_use_bytes = memory_estimate(out_dir)
 
-    # %% setup Efield if needed
-    if "E0dir" in p:
-        E0dir = out_dir / p["E0dir"]
-        if not E0dir.is_dir():
-            model.setup(p["nml"], out_dir)
-
-    # %% setup precip if needed
-    if "precdir" in p:
-        precdir = out_dir / p["precdir"]
-        if not precdir.is_dir():
-            model.setup(p["nml"], out_dir)
-
     # build checks
     gemexe = find.gemini_exe(pr.get("gemexe", ""))
     logging.info(f"gemini executable: {gemexe}")
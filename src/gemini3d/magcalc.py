@@ -78,7 +78,9 @@ def magcalc(
         "theta": theta,
     }
 
-    write.maggrid(direc / "inputs/magfieldpoints.h5", mag)
+    write.maggrid(
+        direc / "inputs/magfieldpoints.h5", mag, profile=cfg.get("write_profile")
+    )
 
 
 if __name__ == "__main__":
@@ -83,7 +83,7 @@ def makegrid(
     if write_grid:
         filename = direc / "inputs/magfieldpoints.h5"
         print("Writing grid to", filename)
-        write.maggrid(filename, mag)
+        write.maggrid(filename, mag, profile=cfg.get("write_profile"))
 
     return mag
 
@@ -164,7 +164,7 @@ def makegrid_full(
     if write_grid:
         filename = direc / "inputs/magfieldpoints.h5"
         print("Writing grid to", filename)
-        write.maggrid(filename, mag)
+        write.maggrid(filename, mag, profile=cfg.get("write_profile"))
 
     return mag
 
@@ -20,6 +20,9 @@ from .efield import Efield_BCs
 from .particles import particles_BCs
 from .utils import str2func
 from . import namelist
+from . import build
+from . import find
+from . import read
 from . import write
 
 __all__ = ["setup", "config"]
@@ -101,10 +104,23 @@ def config(params: dict[str, T.Any], out_dir: Path):
     namelist.write(nml_file, "setup", setup)
 
 
-def setup(path: Path | dict[str, T.Any], out_dir: Path, root: Path | None = None):
+def setup(
+    path: Path | dict[str, T.Any],
+    out_dir: Path,
+    root: Path | None = None,
+    *,
+    force: bool = False,
+    workers: int | None = None,
+) -> list[str]:
     """
     top-level function to create a new simulation FROM A FILE config.nml
 
+    Only the stages (grid, initial state, E-field, precipitation...) whose config
+    values or input files changed since they were last built, or whose outputs are
+    missing, are built again. See gemini3d.build.
+    Stages independent of each other, e.g. writing the grid, the initial state and
+    the E-field, are built concurrently.
+
     Parameters
     ----------
 
@@ -112,6 +128,16 @@ def setup(path: Path | dict[str, T.Any], out_dir: Path, root: Path | None = None
         path (directory or full path) to config.nml
     out_dir: pathlib.Path
         directory to write simulation artifacts to
+    force: bool, optional
+        build all stages
+    workers: int, optional
+        number of worker processes, default CPU count. 1 builds in this process.
+
+    Returns
+    -------
+
+    built: list of str
+        stages built
     """
 
     # %% read config.nml
@@ -143,15 +169,175 @@ def setup(path: Path | dict[str, T.Any], out_dir: Path, root: Path | None = None
     input_dir.mkdir(parents=True, exist_ok=True)
     shutil.copy2(cfg["nml"], input_dir)
 
-    # %% is this equilibrium or interpolated simulation
-    if "eq_dir" in cfg:
-        interp(cfg)
+    stages = setup_stages(cfg)
+    keys, stale = build.plan(cfg, stages, force=force)
+    if not stale:
+        logging.info(f"simulation inputs in {input_dir} are up to date")
+        return stale
+
+    logging.info(f"building setup stages: {' '.join(stale)}")
+
+    # the grid is generated again even if only later stages are built,
+    # so they see the same grid as when built with it
+    todo = stale
+    file = None
+    if "grid_slab" in cfg:
+        # written before the other stages, which read it back
+        xg = setup_grid(cfg, write_grid="grid" in stale)
+        if "grid" in stale:
+            build.record(cfg, stages, "grid", keys)
+        todo = [n for n in stale if n != "grid"]
+        # a grid too large for memory is shared by a file rather than shared memory
+        file = input_dir / "setup_grid.bin"
     else:
-        equilibrium(cfg)
+        # written concurrently with the other stages, which use it from memory
+        xg = setup_grid(cfg, write_grid=False)
+
+    build.run(cfg, stages, keys, todo, xg, workers=workers, file=file)
+
+    return stale
+
+
+# config keys read by each setup stage, see gemini3d.build.
+# Stages after the grid use it from memory, so don't wait for it to be written.
+GRID_CONFIG = (
+    "lxp",
+    "lyp",
+    "xdist",
+    "ydist",
+    "x2parms",
+    "x3parms",
+    "lzp",
+    "alt_min",
+    "alt_max",
+    "alt_scale",
+    "Bincl",
+    "lq",
+    "lp",
+    "lphi",
+    "dtheta",
+    "dphi",
+    "altmin",
+    "gridflag",
+    "grid_openparm",
+    "grid_slab",
+    "glat",
+    "glon",
+    "eq_dir",
+    "indat_size",
+    "indat_grid",
+    "write_profile",
+)
+STATE_CONFIG = (
+    "f107",
+    "f107a",
+    "Ap",
+    "nmf",
+    "nme",
+    "msis_version",
+    "eq_dir",
+    "eq_url",
+    "indat_file",
+    "write_profile",
+)
+EFIELD_CONFIG = (
+    "E0dir",
+    "Efield_*",
+    "Etarg*",
+    "Jtarg*",
+    "Exit",
+    "Eyit",
+    "dtE0",
+    "time",
+    "tdur",
+    "write_profile",
+)
+PRECIP_CONFIG = (
+    "precdir",
+    "precip_*",
+    "Qprecip*",
+    "E0precip",
+    "dtprec",
+    "time",
+    "tdur",
+    "write_profile",
+)
+
+
+def setup_stages(cfg: dict[str, T.Any]) -> dict[str, build.Stage]:
+    """setup stages of a simulation, see gemini3d.build"""
+
+    stages: dict[str, build.Stage] = {
+        "grid": {
+            "deps": (),
+            "config": GRID_CONFIG,
+            "outputs": ("indat_size", "indat_grid"),
+            "build": write.grid,
+        },
+        "state": {
+            "deps": ("grid",),
+            "after": (),
+            "config": STATE_CONFIG,
+            # the initial state is at the start time, whatever the duration
+            "values": lambda cfg: {"t0": cfg["time"][0]},
+            "outputs": ("indat_file",),
+        },
+    }
 
+    if "eq_dir" not in cfg:
+        stages["state"]["build"] = _equilibrium_state
+        return stages
 
-def equilibrium(cfg: dict[str, T.Any]):
-    # %% GRID GENERATION
+    stages["state"]["build"] = _resample_state
+    stages["state"]["inputs"] = _equilibrium_files
+
+    if "setup_functions" in cfg:
+        # user functions may read any config value
+        stages["setup_functions"] = {
+            "deps": ("grid",),
+            "after": (),
+            "config": ("*",),
+            "inputs": lambda cfg: _function_files(cfg, "setup_functions"),
+            "outputs": (),
+            "build": postprocess,
+        }
+        return stages
+
+    if "E0dir" in cfg:
+        stages["Efield"] = {
+            "deps": ("grid",),
+            "after": (),
+            "config": EFIELD_CONFIG,
+            "inputs": lambda cfg: _function_files(
+                cfg, "Etarg_function", "Jtarg_function"
+            ),
+            "outputs": ("E0dir",),
+            "build": Efield_BCs,
+        }
+
+    if "precdir" in cfg:
+        stages["precip"] = {
+            "deps": ("grid",),
+            "after": (),
+            "config": PRECIP_CONFIG,
+            "inputs": lambda cfg: _function_files(cfg, "Qprecip_function"),
+            "outputs": ("precdir",),
+            "build": particles_BCs,
+        }
+
+    return stages
+
+
+def setup_grid(cfg: dict[str, T.Any], *, write_grid: bool = True) -> dict[str, T.Any]:
+    """
+    generate the simulation grid, writing it unless write_grid is False.
+    A grid generated in slabs (cfg "grid_slab") is read back from its file.
+    """
+
+    if "grid_slab" in cfg:
+        if write_grid:
+            grid_slabs(cfg)
+        return read.grid(cfg["indat_grid"], dtype="float64")
 
     if "lxp" in cfg and "lyp" in cfg:
         xg = cartesian.cart3d(cfg)
@@ -160,12 +346,70 @@ def equilibrium(cfg: dict[str, T.Any]):
     else:
         raise ValueError("grid does not seem to be cartesian or curvilinear")
 
-    write.grid(cfg, xg)
+    if write_grid:
+        write.grid(cfg, xg)
 
-    # %% Equilibrium input generation
+    return xg
+
+
+def _equilibrium_state(cfg: dict[str, T.Any], xg: dict[str, T.Any]) -> None:
     dat = equilibrium_state(cfg, xg)
 
-    write.state(cfg["indat_file"], dat)
+    write.state(cfg["indat_file"], dat, profile=cfg.get("write_profile"))
+
+
+def _resample_state(cfg: dict[str, T.Any], xg: dict[str, T.Any]) -> None:
+    equilibrium_resample(cfg, xg, write_grid=False)
+
+
+def _equilibrium_files(cfg: dict[str, T.Any]) -> list[Path]:
+    """equilibrium simulation files the initial state is interpolated from"""
+
+    try:
+        peq = read.config(cfg["eq_dir"])
+        return [
+            peq["nml"],
+            find.grid(cfg["eq_dir"]),
+            find.frame(cfg["eq_dir"], peq["time"][-1]),
+        ]
+    except FileNotFoundError:
+        # not yet downloaded
+        return []
+
+
+def _function_files(cfg: dict[str, T.Any], *keys: str) -> list[Path]:
+    """user function files next to config.nml named by config keys"""
+
+    names: list[str] = []
+    for k in keys:
+        v = cfg.get(k, [])
+        names += [v] if isinstance(v, str) else v
+
+    return [cfg["nml"].parent / (n + ".py") for n in names]
+
+
+def equilibrium(cfg: dict[str, T.Any]):
+    # %% GRID GENERATION
+    xg = setup_grid(cfg)
+
+    # %% Equilibrium input generation
+    _equilibrium_state(cfg, xg)
+
+
+def grid_slabs(cfg: dict[str, T.Any]) -> None:
+    """
+    generate and write the grid in slabs of cfg["grid_slab"] x3 indices,
+    0 for a slab size of about gemini3d.grid.slab.SLAB_BYTES
+    """
+
+    if "lxp" in cfg and "lyp" in cfg:
+        header, slabs = cartesian.cart3d_slabs(cfg, cfg["grid_slab"])
+    elif "lq" in cfg and "lp" in cfg and "lphi" in cfg:
+        header, slabs = tilted_dipole.tilted_dipole3d_slabs(cfg, cfg["grid_slab"])
+    else:
+        raise ValueError("grid does not seem to be cartesian or curvilinear")
+
+    write.grid_slabs(cfg, header, slabs)
 
 
 def interp(cfg: dict[str, T.Any]) -> None:
@@ -217,9 +461,11 @@ def cli():
     p.add_argument("config_file", help="path to config*.nml file")
     p.add_argument("out_dir", help="simulation output directory")
     p.add_argument("--root", help="top-level path to Gemini3D installation")
+    p.add_argument("--force", help="build all setup stages", action="store_true")
+    p.add_argument("-j", "--workers", help="number of worker processes", type=int)
     P = p.parse_args()
 
-    setup(P.config_file, P.out_dir, P.root)
+    setup(P.config_file, P.out_dir, P.root, force=P.force, workers=P.workers)
 
 
 if __name__ == "__main__":
@@ -10,8 +10,14 @@ import re
 
 import numpy as np
 
+__all__ = ["read", "read_all", "write"]
 
-__all__ = ["read", "write"]
+_nml_pat = re.compile(r"^\s*&(\w+)")
+_end_pat = re.compile(r"^\s*/\s*$")
+_val_pat = re.compile(r"^\s*(\w+)\s*=\s*([^!]*)")
+
+# resolved path => (mtime_ns, size, namelists)
+_cache: dict[Path, tuple[int, int, dict[str, dict[str, T.Any]]]] = {}
 
 
 def read(file: Path, namelist: str) -> dict[str, T.Any]:
@@ -32,35 +38,82 @@ def read(file: Path, namelist: str) -> dict[str, T.Any]:
         data contained in namelist
     """
 
-    r: dict[str, list[str]] = {}
-    nml_pat = re.compile(r"^\s*&(" + namelist + r")")
-    end_pat = re.compile(r"^\s*/\s*$")
-    val_pat = re.compile(r"^\s*(\w+)\s*=\s*([^!]*)")
+    r = read_all(file)
+    if namelist not in r:
+        raise KeyError(f"did not find Namelist {namelist} in {file}")
+
+    return r[namelist]
+
+
+def read_all(file: Path) -> dict[str, dict[str, T.Any]]:
+    """read all namelists from an .nml file in one pass, as strings
+
+    The result is cached until the file modification time or size changes.
+    Each call returns a copy, so callers may modify it.
+
+    Parameters
+    ----------
+
+    file: pathlib.Path
+        Namelist file to read
+
+    Returns
+    -------
+
+    nmls: dict of dict
+        data contained in each namelist
+    """
+
+    file = Path(file).expanduser().resolve()
+    st = file.stat()
+
+    e = _cache.get(file)
+    if e is None or e[:2] != (st.st_mtime_ns, st.st_size):
+        e = (st.st_mtime_ns, st.st_size, _read_all(file))
+        _cache[file] = e
+
+    # values are str, float or flat lists of them
+    return {
+        n: {k: list(v) if isinstance(v, list) else v for k, v in r.items()}
+        for n, r in e[2].items()
+    }
+
+
+def _read_all(file: Path) -> dict[str, dict[str, T.Any]]:
+    nmls: dict[str, dict[str, T.Any]] = {}
+    r: dict[str, T.Any] | None = None
+    name = ""
 
     with file.open("rt") as f:
         for line in f:
-            if not nml_pat.match(line):
+            if r is None:
+                nml_mat = _nml_pat.match(line)
+                if nml_mat:
+                    name = nml_mat.group(1)
+                    r = {}
+                continue
+
+            if _end_pat.match(line):
+                # end of namelist. The first of repeated namelists is used.
+                nmls.setdefault(name, r)
+                r = None
+                continue
+
+            val_mat = _val_pat.match(line)
+            if not val_mat:
                 continue
 
-            for line in f:
-                if end_pat.match(line):
-                    # end of namelist
-                    return r
-                val_mat = val_pat.match(line)
-                if not val_mat:
-                    continue
-
-                key, vals = val_mat.group(1), val_mat.group(2).strip().split(",")
-                values: list[T.Any] = []
-                for v in vals:
-                    v = v.strip().replace("'", "").replace('"', "")
-                    try:
-                        values.append(float(v))
-                    except ValueError:
-                        values.append(v)
-                r[key] = values[0] if len(values) == 1 else values
-
-    raise KeyError(f"did not find Namelist {namelist} in {file}")
+            key, vals = val_mat.group(1), val_mat.group(2).strip().split(",")
+            values: list[T.Any] = []
+            for v in vals:
+                v = v.strip().replace("'", "").replace('"', "")
+                try:
+                    values.append(float(v))
+                except ValueError:
+                    values.append(v)
+            r[key] = values[0] if len(values) == 1 else values
+
+    return nmls
 
 
 def write(file: Path, namelist: str, data: dict[str, T.Any], overwrite: bool = False):
@@ -12,15 +12,21 @@ import h5py
 
 from . import filenames2times, time2filename, patch_grid
 from .. import utils
+from ..hdf5 import pool
+from ..hdf5.write import dataset_options
 from .plot import grid_step
 
 from matplotlib.pyplot import figure
 
 
-COMP_LEVEL = 6  # arbitrary GZIP compression level
-
-
-def convert(indir: Path, outdir: Path, data_vars: set[str], plotgrid: bool = False):
+def convert(
+    indir: Path,
+    outdir: Path,
+    data_vars: set[str],
+    plotgrid: bool = False,
+    *,
+    profile: str | None = None,
+):
     times = filenames2times(indir)
 
     # Need to get extents by scanning all files.
@@ -34,6 +40,7 @@ def convert(indir: Path, outdir: Path, data_vars: set[str], plotgrid: bool = Fal
 
     outgrid = outdir / "amrgrid.h5"
     print("write", outgrid)
+    pool.evict(outgrid)
     with h5py.File(outgrid, "w") as oh:
         oh["alt"] = h5py.ExternalLink(simgrid, "/alt")
         oh["theta"] = h5py.ExternalLink(simgrid, "/theta")
@@ -43,7 +50,7 @@ def convert(indir: Path, outdir: Path, data_vars: set[str], plotgrid: bool = Fal
         oh["x3"] = x3.astype(np.float32)
 
     for t in times:
-        combine_files(indir, outdir, t, data_vars, x1, x2, x3)
+        combine_files(indir, outdir, t, data_vars, x1, x2, x3, profile=profile)
 
 
 def get_xlims(path: Path, time: datetime, plotgrid: bool = False) -> tuple:
@@ -100,6 +107,8 @@ def combine_files(
     x1,
     x2,
     x3,
+    *,
+    profile: str | None = None,
 ):
     outfn = time2filename(outdir, time)
 
@@ -108,6 +117,7 @@ def combine_files(
     pat = utils.datetime2stem(time) + "_*.h5"
 
     print("write", outfn, "lx: ", lx)
+    pool.evict(outfn)
     with h5py.File(outfn, "w") as oh:
         oh.create_dataset(
             "/time/ymd", dtype=np.int32, data=(time.year, time.month, time.day)
@@ -129,7 +139,7 @@ def combine_files(
                 ix2 = get_indices(ih["x2lims"], x2)
                 ix3 = get_indices(ih["x3lims"], x3)
                 for v in var:
-                    convert_var(oh, ih, v, lx, ix2, ix3)
+                    convert_var(oh, ih, v, lx, ix2, ix3, profile)
 
 
 def convert_var(
@@ -139,6 +149,7 @@ def convert_var(
     lx: tuple[int, int, int],
     ix2: tuple[int, int],
     ix3: tuple[int, int],
+    profile: str | None = None,
 ):
     if v not in ih:
         logging.debug(f"variable {v} not in {ih.filename}")
@@ -158,11 +169,8 @@ def convert_var(
             name=v,
             shape=shape,
             dtype=ih[v].dtype,
-            compression="gzip",
-            compression_opts=COMP_LEVEL,
-            shuffle=True,
-            fletcher32=True,
             fillvalue=np.nan,
+            **dataset_options(shape, ih[v].dtype.itemsize, profile),
         )
 
     logging.debug(
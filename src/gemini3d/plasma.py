@@ -14,6 +14,7 @@ from scipy.interpolate import interp1d, interpn, RegularGridInterpolator
 from . import read
 from . import LSP, SPECIES
 from . import write
+from .utils import get_dtype
 from .web import url_retrieve
 from .archive import extract
 from .msis import msis_setup
@@ -23,10 +24,12 @@ KB = 1.38e-23
 AMU = 1.67e-27
 
 
-def equilibrium_resample(p: dict[str, T.Any], xg: dict[str, T.Any]):
+def equilibrium_resample(
+    p: dict[str, T.Any], xg: dict[str, T.Any], *, write_grid: bool = True
+) -> None:
     """
     read and interpolate equilibrium simulation data, writing new
-    interpolated grid.
+    interpolated grid unless write_grid is False.
     """
 
     # %% download equilibrium data if needed and specified
@@ -66,12 +69,15 @@ def equilibrium_resample(p: dict[str, T.Any], xg: dict[str, T.Any]):
     check_temperature(dat_interp["Ts"])
 
     # %% WRITE OUT THE GRID
-    write.grid(p, xg)
+    if write_grid:
+        write.grid(p, xg)
 
-    write.state(p["indat_file"], dat_interp)
+    write.state(p["indat_file"], dat_interp, profile=p.get("write_profile"))
 
 
-def model_resample(xgin: dict[str, T.Any], dat, xg: dict[str, T.Any]):
+def model_resample(
+    xgin: dict[str, T.Any], dat, xg: dict[str, T.Any], dtype: str | None = None
+):
     """resample a grid
     usually used to upsample an equilibrium simulation grid
 
@@ -82,6 +88,9 @@ def model_resample(xgin: dict[str, T.Any], dat, xg: dict[str, T.Any]):
         original grid (usually equilibrium sim grid)
     dat: xarray.Dataset
         data to interpolate
+    dtype: str, optional
+        "native" (same as dat), "float32" or "float64" of the interpolated data.
+        Default is the global policy, see gemini3d.utils.set_dtype
 
     Returns
     -------
@@ -94,6 +103,7 @@ def model_resample(xgin: dict[str, T.Any], dat, xg: dict[str, T.Any]):
     lx1, lx2, lx3 = xg["lx"]
 
     # %% ALLOCATIONS
+    dt = get_dtype(dtype) or dat["ns"].dtype
 
     dat_interp = xarray.Dataset(
         coords={
@@ -106,7 +116,7 @@ def model_resample(xgin: dict[str, T.Any], dat, xg: dict[str, T.Any]):
     for k in {"ns", "vs1", "Ts"}:
         dat_interp[k] = (
             ("species", "x1", "x2", "x3"),
-            np.empty((LSP, lx1, lx2, lx3), dtype=np.float32),
+            np.empty((LSP, lx1, lx2, lx3), dtype=dt),
         )
 
     # %% INTERPOLATE ONTO NEWER GRID
@@ -114,6 +124,7 @@ def model_resample(xgin: dict[str, T.Any], dat, xg: dict[str, T.Any]):
     Note that float64 upcasting is used to match fast internal
     Cython code. The coordinates and values need to same type
     to avoid false bounds errors due to IEEE754 rounding.
+    Only one species slab at a time is upcast; results are stored as dtype.
     """
     X2 = xgin["x2"][2:-2].astype(np.float64)
     X1 = xgin["x1"][2:-2].astype(np.float64)
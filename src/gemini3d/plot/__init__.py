@@ -12,8 +12,10 @@ import typing as T
 from datetime import datetime
 import logging
 import matplotlib as mpl
+import xarray
 
 from .. import read
+from .. import catalog
 from ..utils import to_datetime
 from .core import save_fig
 from .glow import glow
@@ -59,6 +61,9 @@ def plot_all(direc: Path, var: set[str] | None = None, saveplot_fmt: str | None
         variables to plot, default is all
     saveplot_fmt: str, optional
         format to save plots, default is n
+
+    If the simulation has a catalog (gemini3d.catalog), each variable has
+    the same color limits at all times.
     """
     direc = Path(direc).expanduser().resolve(strict=True)
 
@@ -69,21 +74,26 @@ def plot_all(direc: Path, var: set[str] | None = None, saveplot_fmt: str | None
     plotfun = grid2plotfun(xg)
     cfg = read.config(direc)
 
+    cat = catalog.load(direc)
+    limits = catalog.limits(cat) if cat else None
+
     #    fg = mpl.figure.Figure(constrained_layout=True)
     fg = mpl.figure.Figure(constrained_layout=True, dpi=150, figsize=(18, 4.5))
 
-    # %% loop over files / time
-    for t in cfg["time"]:
+    # %% loop over files / time, reading the next frames while plotting
+    for dat in read.iter_frames(direc, var, cfg=cfg, xg=xg):
         fg.clf()
         frame(
             fg,
             direc,
-            time=t,
+            time=to_datetime(dat.time),
             var=var,
             saveplot_fmt=saveplot_fmt,
             xg=xg,
             cfg=cfg,
             plotfun=plotfun,
+            dat=dat,
+            limits=limits,
         )
 
 
@@ -97,6 +107,8 @@ def frame(
     var: set[str] | None = None,
     xg: dict[str, T.Any] | None = None,
     cfg: dict[str, T.Any] | None = None,
+    dat: xarray.Dataset | None = None,
+    limits: dict[str, tuple[float, float]] | None = None,
 ):
     """
     Parameters
@@ -106,6 +118,11 @@ def frame(
         filename or directory + time to plot
     time: datetime.datetime, optional
         if path is a directory, time is required
+    dat: xarray.Dataset, optional
+        data already read for this time, e.g. from gemini3d.read.iter_frames
+    limits: dict, optional
+        (min, max) color limits of variables, e.g. from gemini3d.catalog.limits.
+        Default is the range of this frame.
     """
 
     if not var:
@@ -117,9 +134,10 @@ def frame(
 
     if time is None:
         # read a specific filename
-        dat = read.frame(path, var=var)
+        if dat is None:
+            dat = read.frame(path, var=var)
         path = path.parent
-    else:
+    elif dat is None:
         dat = read.frame(path, time, var=var)
 
     if not xg:
@@ -136,7 +154,14 @@ def frame(
             if plotfun.__name__.startswith("curv"):
                 plotfun(fg, t0, xg, dat[k], cfg)
             else:
-                plotfun(fg, t0, xg, dat[k].squeeze(), wavelength=dat.get("wavelength"))
+                plotfun(
+                    fg,
+                    t0,
+                    xg,
+                    dat[k].squeeze(),
+                    wavelength=dat.get("wavelength"),
+                    limits=limits.get(k) if limits else None,
+                )
             save_fig(fg, path, name=k, fmt=saveplot_fmt, time=t0)
         except ValueError as e:
             logging.error(f"SKIP: plot {k} at {t0} due to {e}")
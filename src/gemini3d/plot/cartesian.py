@@ -33,6 +33,7 @@ def plot_interp(
     *,
     name: str = "",
     ref_alt: float = REF_ALT,
+    limits: tuple[float, float] | None = None,
     **kwargs,
 ) -> None:
     """
@@ -42,6 +43,9 @@ def plot_interp(
 
     parm: xarray.DataArray
         parameter to plot
+    limits: (float, float), optional
+        (min, max) of parm setting the color limits, e.g. over all times
+        from gemini3d.catalog.limits. Default is this frame's.
 
     xp:  eastward distance (rads.)
         should be interpreted as northward distance (in rads.).
@@ -62,19 +66,23 @@ def plot_interp(
     cmap = None
     is_Efield = False
 
+    if limits is None:
+        limits = (float(parm.min()), float(parm.max()))
+    amax: T.Any = max(abs(limits[0]), abs(limits[1]))
+
     if name.startswith("J") or name == "Phitop":
         cmap = "bwr"
-        clim = (-abs(parm).max().data, abs(parm).max().data)
+        clim = (-amax, amax)
     elif name.startswith("v"):
         cmap = "bwr"
         # clim = (-80.0, 80.0)
-        clim = (-abs(parm).max().data, abs(parm).max().data)
+        clim = (-amax, amax)
     elif name.startswith(("V", "E")):
         is_Efield = True
         cmap = "bwr"
-        clim = (-abs(parm).max().data, abs(parm).max().data)
+        clim = (-amax, amax)
     elif name.startswith("T"):
-        clim = (0.0, parm.max().data)
+        clim = (0.0, limits[1])
     elif name.startswith("n"):
         clim = (1e-7, None)
     else:
@@ -1,7 +1,6 @@
 from __future__ import annotations
 from pathlib import Path
 import typing as T
-import logging
 
 import matplotlib as mpl
 
@@ -82,14 +81,11 @@ def Efield(direc: Path) -> None:
     cfg = read.config(direc)
     path = find.inputs(direc, cfg.get("E0dir"))
 
-    for t in efield_times(cfg):
-        try:
-            file = find.frame(path, t)
-        except FileNotFoundError:
-            logging.error(f"no E-field data found at {t} in {path}")
-            continue
+    E = read.Efield_series(path, efield_times(cfg))
 
-        dat = read.Efield(file)
+    for i in range(E.time.size):
+        t = to_datetime(E.time[i])
+        dat = E.isel(time=i)
 
         for k in {"Exit", "Eyit", "Vminx1it", "Vmaxx1it", "Vminx2ist", "Vmaxx2ist"}:
             fg.clf()
@@ -122,14 +118,11 @@ def precip(direc: Path) -> None:
     cfg = read.config(direc)
     precip_path = find.inputs(direc, cfg.get("precdir"))
 
-    for t in precip_times(cfg):
-        try:
-            file = find.frame(precip_path, t)
-        except FileNotFoundError:
-            logging.error(f"no precipitation data found at {t} in {precip_path}")
-            continue
+    P = read.precip_series(precip_path, precip_times(cfg))
 
-        dat = read.precip(file)
+    for i in range(P.time.size):
+        t = to_datetime(P.time[i])
+        dat = P.isel(time=i)
 
         for k in {"E0", "Q"}:
             fg.clf()
@@ -0,0 +1,295 @@
+"""
+convert Gemini3D legacy raw .dat outputs to HDF5, in parallel and resumable.
+
+Each file is written to a temporary name, read back and compared with the raw
+data (which also checks the HDF5 checksums), then renamed into place.
+A converted file is skipped on later runs if it records the size and
+modification time of its raw file, so an interrupted conversion resumes where it stopped.
+
+    python -m gemini3d.raw.convert data /path/to/raw /path/to/h5
+    python -m gemini3d.raw.convert neutral /path/to/raw /path/to/h5
+
+For clarity, the user must provide a config.nml for the original raw data.
+"""
+
+from __future__ import annotations
+from pathlib import Path
+import typing as T
+import argparse
+import concurrent.futures
+import logging
+import os
+
+import numpy as np
+import h5py
+
+from . import read as raw_read
+from .. import read
+from ..hdf5 import write as h5write
+
+# not frames
+SKIP_STEMS = {"simsize", "simgrid", "initial_conditions"}
+
+# config and grid shared by worker processes, sent once per worker
+_worker_state: dict[str, T.Any] = {}
+
+
+def data(
+    indir: Path,
+    outdir: Path,
+    *,
+    workers: int | None = None,
+    clvl: int | None = None,
+    profile: str | None = None,
+    force: bool = False,
+) -> list[Path]:
+    """
+    convert raw simulation output frames to HDF5
+
+    Parameters
+    ----------
+    indir: pathlib.Path
+        raw .dat file directory with config.nml, or one .dat file
+    outdir: pathlib.Path
+        directory to write HDF5 files
+    workers: int, optional
+        number of worker processes, default CPU count. 1 converts in this process.
+    clvl: int, optional
+        GZIP compression level, default that of the write profile
+    profile: str, optional
+        HDF5 write profile, see gemini3d.hdf5.write.get_profile
+    force: bool, optional
+        convert even if already converted
+
+    Returns
+    -------
+    files: list of pathlib.Path
+        converted HDF5 files, including those already converted
+    """
+
+    infiles, indir = _infiles(indir)
+
+    cfg = read.config(indir)
+    if "flagoutput" not in cfg:
+        raise LookupError(f"need to specify flagoutput in {indir}/config.nml")
+
+    try:
+        # only the coordinates are needed, and are sent to each worker
+        xg = {
+            k: np.array(v)
+            for k, v in raw_read.grid(indir).items()
+            if k in {"x1", "x2", "x3"}
+        }
+    except FileNotFoundError:
+        xg = {}
+
+    # resolved here, as workers don't see set_profile() of this process
+    state = {"cfg": cfg, "xg": xg, "clvl": clvl, "profile": h5write.get_profile(profile)}
+
+    return _run(_data_file, infiles, outdir, state, workers, force)
+
+
+def neutral(
+    indir: Path,
+    outdir: Path,
+    *,
+    workers: int | None = None,
+    clvl: int | None = None,
+    profile: str | None = None,
+    force: bool = False,
+) -> list[Path]:
+    """
+    convert raw 2-D neutral input files to HDF5, with simsize.h5.
+    simsize.dat must be in the same directory as the neutral .dat files.
+
+    Parameters are as for data()
+    """
+
+    infiles, indir = _infiles(indir)
+
+    outdir = Path(outdir).expanduser()
+    outdir.mkdir(parents=True, exist_ok=True)
+
+    lx = raw_read.simsize(indir)
+    logging.info(f"{indir} lx: {lx}")
+    with h5py.File(outdir / "simsize.h5", "w") as f:
+        f["lx1"] = lx[0]
+        f["lx2"] = lx[1]
+
+    state = {"clvl": clvl, "profile": h5write.get_profile(profile)}
+
+    return _run(_neutral_file, infiles, outdir, state, workers, force)
+
+
+def _infiles(indir: Path) -> tuple[list[Path], Path]:
+    indir = Path(indir).expanduser()
+
+    if indir.is_file():
+        return [indir], indir.parent
+    elif indir.is_dir():
+        files = sorted(f for f in indir.glob("*.dat") if f.stem not in SKIP_STEMS)
+        if not files:
+            raise FileNotFoundError(f"no .dat files found in {indir}")
+        return files, indir
+
+    raise FileNotFoundError(indir)
+
+
+def _run(
+    convert: T.Callable[[Path, Path], None],
+    infiles: list[Path],
+    outdir: Path,
+    state: dict[str, T.Any],
+    workers: int | None,
+    force: bool,
+) -> list[Path]:
+    outdir = Path(outdir).expanduser()
+    outdir.mkdir(parents=True, exist_ok=True)
+
+    jobs = []
+    outfiles = []
+    for infile in infiles:
+        outfile = outdir / f"{infile.stem}.h5"
+        outfiles.append(outfile)
+        if not force and converted(infile, outfile):
+            logging.info(f"SKIP: {outfile} already converted")
+            continue
+        jobs.append((infile, outfile))
+
+    logging.info(f"converting {len(jobs)} of {len(infiles)} files to {outdir}")
+
+    if workers == 1 or len(jobs) <= 1:
+        _init_worker(state)
+        for infile, outfile in jobs:
+            convert(infile, outfile)
+        return outfiles
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(state,)
+    ) as pool:
+        futures = {pool.submit(convert, i, o): i for i, o in jobs}
+        for fut in concurrent.futures.as_completed(futures):
+            # raise the first failure; files already done stay converted
+            fut.result()
+
+    return outfiles
+
+
+def converted(infile: Path, outfile: Path) -> bool:
+    """outfile was converted and verified from infile as it is now"""
+
+    try:
+        with h5py.File(outfile, "r") as f:
+            source = f.attrs.get("source")
+    except OSError:
+        return False
+
+    st = infile.stat()
+
+    return source is not None and tuple(source) == (st.st_size, st.st_mtime_ns)
+
+
+def _init_worker(state: dict[str, T.Any]) -> None:
+    _worker_state.update(state)
+
+
+def _data_file(infile: Path, outfile: Path) -> None:
+    cfg = _worker_state["cfg"]
+    flag = cfg["flagoutput"]
+
+    dat = raw_read.data(infile, cfg, _worker_state["xg"], var={"ne"})
+
+    expect = {}
+    for k, name in h5write.FRAME_NAMES[flag].items():
+        if k in dat.data_vars:
+            # HDF5 storage order: (species, x3, x2, x1)
+            dims: list[T.Hashable] = [d for d in dat[k].dims if d == "species"]
+            dims += [d for d in dat[k].dims[::-1] if d != "species"]
+            expect[name] = dat[k].transpose(*dims).values
+
+    _write(
+        infile,
+        outfile,
+        expect,
+        lambda fn: h5write.frame(
+            fn, dat, flag, _worker_state["clvl"], profile=_worker_state["profile"]
+        ),
+    )
+
+
+def _neutral_file(infile: Path, outfile: Path) -> None:
+    dat = {k: v.transpose() for k, v in raw_read.neutral2(infile).items()}
+
+    _write(
+        infile,
+        outfile,
+        dat,
+        lambda fn: h5write.neutral(
+            fn, dat, _worker_state["clvl"], profile=_worker_state["profile"]
+        ),
+    )
+
+
+def _write(
+    infile: Path,
+    outfile: Path,
+    expect: dict[str, np.ndarray],
+    write: T.Callable[[Path], None],
+) -> None:
+    """write to a temporary file, verify against expect, stamp the source and rename"""
+
+    logging.info(f"{infile} => {outfile}")
+
+    # raw data is memory-mapped, so it is read during write()
+    st = infile.stat()
+
+    tmp = outfile.with_name(outfile.name + ".tmp")
+    try:
+        write(tmp)
+
+        with h5py.File(tmp, "r+") as f:
+            for name, a in expect.items():
+                # reading every chunk also verifies any fletcher32 checksums
+                if not np.array_equal(f[name][()], a.astype(np.float32), equal_nan=True):
+                    raise ValueError(f"{name}: {tmp} does not match {infile}")
+            f.attrs["source"] = (st.st_size, st.st_mtime_ns)
+
+        os.replace(tmp, outfile)
+    finally:
+        # a failed write or verification leaves no partial file
+        tmp.unlink(missing_ok=True)
+
+
+def cli():
+    p = argparse.ArgumentParser(description="convert Gemini3D raw .dat files to HDF5")
+    p.add_argument("kind", choices=["data", "neutral"], help="type of raw files")
+    p.add_argument("indir", help="Gemini .dat file directory")
+    p.add_argument("outdir", help="directory to write HDF5 files")
+    p.add_argument("-j", "--workers", help="number of worker processes", type=int)
+    p.add_argument("-clvl", help="GZIP compression level", type=int)
+    p.add_argument("-profile", help="HDF5 write profile", choices=h5write.WRITE_PROFILES)
+    p.add_argument(
+        "-f", "--force", help="convert already converted files", action="store_true"
+    )
+    p.add_argument("-v", "--verbose", action="store_true")
+    P = p.parse_args()
+
+    level = logging.INFO if P.verbose else logging.WARNING
+    logging.basicConfig(format="%(message)s", level=level)
+
+    convert = data if P.kind == "data" else neutral
+
+    files = convert(
+        P.indir,
+        P.outdir,
+        workers=P.workers,
+        clvl=P.clvl,
+        profile=P.profile,
+        force=P.force,
+    )
+
+    print(f"DONE: {len(files)} files in {P.indir} converted to {P.outdir}")
+
+
+if __name__ == "__main__":
+    cli()
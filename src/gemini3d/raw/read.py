@@ -1,6 +1,10 @@
 """
 raw binary file I/O.
 Raw files are deprecated and do not contain most features of Gemini
+
+Files are memory-mapped rather than read: each variable is a Fortran-ordered
+view at its offset in the file, so only the parts of a file that are used are
+paged in from disk. Raw files are all float64.
 """
 
 from __future__ import annotations
@@ -15,10 +19,39 @@ import numpy as np
 import xarray
 
 from .. import find
-from .. import WAVELEN, LSP
+from .. import WAVELEN, LSP, SPECIES
 from .. import read
 
 
+class RawFile:
+    """
+    memory-mapped raw file, read sequentially like the Fortran writer wrote it.
+    read() returns views of the map, nothing is copied.
+    """
+
+    def __init__(self, file: Path):
+        self.file = file
+        self.map = np.memmap(file, dtype=np.float64, mode="r")
+        self.pos = 0
+
+    def read(self, shape: int | tuple[int, ...] | list[int]) -> np.ndarray:
+        """next array of shape, in Fortran order"""
+
+        n = int(np.prod(shape))
+        if self.pos + n > self.map.size:
+            raise ValueError(
+                f"{self.file} is too small to hold {shape} at item {self.pos}"
+            )
+
+        a = self.map[self.pos : self.pos + n]
+        self.pos += n
+
+        return a.reshape(shape, order="F")
+
+    def at_end(self) -> bool:
+        return self.pos >= self.map.size
+
+
 def simsize(path: Path) -> tuple[int, ...]:
     """
     get simulation size
@@ -72,8 +105,7 @@ def grid(file: Path, shape: bool = False) -> dict[str, T.Any]:
 
     lx = simsize(file)
 
-    if not file.is_file():
-        f = find.find_stem(file, stem="simgrid", suffix=".dat")
+    f = file if file.is_file() else find.find_stem(file, stem="simgrid", suffix=".dat")
     if not f:
         raise FileNotFoundError(f"did not find simgrid.dat in {file}")
 
@@ -88,19 +120,12 @@ def grid(file: Path, shape: bool = False) -> dict[str, T.Any]:
 def grid2(file: Path, lx: tuple[int, ...] | list[int]) -> dict[str, T.Any]:
     """for Efield"""
 
-    ft = np.float64
-
     if not file.is_file():
         raise FileNotFoundError(file)
 
-    with file.open("rb") as f:
-        xg = {
-            "lx": lx,
-            "mlon": np.fromfile(f, ft, lx[0]),
-            "mlat": np.fromfile(f, ft, lx[1]),
-        }
+    f = RawFile(file)
 
-    return xg
+    return {"lx": lx, "mlon": f.read(lx[0]), "mlat": f.read(lx[1])}
 
 
 def grid3(file: Path, lx: tuple[int, ...] | list[int]) -> dict[str, T.Any]:
@@ -111,54 +136,50 @@ def grid3(file: Path, lx: tuple[int, ...] | list[int]) -> dict[str, T.Any]:
     if not file.is_file():
         raise FileNotFoundError(file)
 
-    lgridghost = (lx[0] + 4) * (lx[1] + 4) * (lx[2] + 4)
-    gridsizeghost = [lx[0] + 4, lx[1] + 4, lx[2] + 4]
-
-    ft = np.float64
+    ghost = [lx[0] + 4, lx[1] + 4, lx[2] + 4]
 
     xg: dict[str, T.Any] = {"lx": lx}
     # NOTE: keep type hint to avoid platform-sensitive mypy failure
 
-    read = np.fromfile
-
-    with file.open("rb") as f:
-        for i in (1, 2, 3):
-            xg[f"x{i}"] = read(f, ft, lx[i - 1] + 4)
-            xg[f"x{i}i"] = read(f, ft, lx[i - 1] + 1)
-            xg[f"dx{i}b"] = read(f, ft, lx[i - 1] + 3)
-            xg[f"dx{i}h"] = read(f, ft, lx[i - 1])
-        for i in (1, 2, 3):
-            xg[f"h{i}"] = read(f, ft, lgridghost).reshape(gridsizeghost)
-        L = [lx[0] + 1, lx[1], lx[2]]
-        for i in (1, 2, 3):
-            xg[f"h{i}x1i"] = read(f, ft, np.prod(L)).reshape(L)
-        L = [lx[0], lx[1] + 1, lx[2]]
-        for i in (1, 2, 3):
-            xg[f"h{i}x2i"] = read(f, ft, np.prod(L)).reshape(L)
-        L = [lx[0], lx[1], lx[2] + 1]
-        for i in (1, 2, 3):
-            xg[f"h{i}x3i"] = read(f, ft, np.prod(L)).reshape(L)
-        for i in (1, 2, 3):
-            xg[f"gx{i}"] = read(f, ft, np.prod(lx)).reshape(lx)
-        for k in ("alt", "glat", "glon", "Bmag"):
-            xg[k] = read(f, ft, np.prod(lx)).reshape(lx)
-        xg["Bincl"] = read(f, ft, lx[1] * lx[2]).reshape(lx[1:])
-        xg["nullpts"] = read(f, ft, np.prod(lx)).reshape(lx)
-        if f.tell() == file.stat().st_size:  # not EOF
-            return xg
-
-        L = [lx[0], lx[1], lx[2], 3]
-        for i in (1, 2, 3):
-            xg[f"e{i}"] = read(f, ft, np.prod(L)).reshape(L)
-        for k in ("er", "etheta", "ephi"):
-            xg[k] = read(f, ft, np.prod(L)).reshape(L)
-        for k in ("r", "theta", "phi"):
-            xg[k] = read(f, ft, np.prod(lx)).reshape(lx)
-        if f.tell() == file.stat().st_size:  # not EOF
-            return xg
-
-        for k in ("x", "y", "z"):
-            xg[k] = read(f, ft, np.prod(lx)).reshape(lx)
+    f = RawFile(file)
+
+    for i in (1, 2, 3):
+        xg[f"x{i}"] = f.read(lx[i - 1] + 4)
+        xg[f"x{i}i"] = f.read(lx[i - 1] + 1)
+        xg[f"dx{i}b"] = f.read(lx[i - 1] + 3)
+        xg[f"dx{i}h"] = f.read(lx[i - 1])
+    for i in (1, 2, 3):
+        xg[f"h{i}"] = f.read(ghost)
+    L = [lx[0] + 1, lx[1], lx[2]]
+    for i in (1, 2, 3):
+        xg[f"h{i}x1i"] = f.read(L)
+    L = [lx[0], lx[1] + 1, lx[2]]
+    for i in (1, 2, 3):
+        xg[f"h{i}x2i"] = f.read(L)
+    L = [lx[0], lx[1], lx[2] + 1]
+    for i in (1, 2, 3):
+        xg[f"h{i}x3i"] = f.read(L)
+    for i in (1, 2, 3):
+        xg[f"gx{i}"] = f.read(lx)
+    for k in ("alt", "glat", "glon", "Bmag"):
+        xg[k] = f.read(lx)
+    xg["Bincl"] = f.read(lx[1:])
+    xg["nullpts"] = f.read(lx)
+    if f.at_end():
+        return xg
+
+    L = [lx[0], lx[1], lx[2], 3]
+    for i in (1, 2, 3):
+        xg[f"e{i}"] = f.read(L)
+    for k in ("er", "etheta", "ephi"):
+        xg[k] = f.read(L)
+    for k in ("r", "theta", "phi"):
+        xg[k] = f.read(lx)
+    if f.at_end():
+        return xg
+
+    for k in ("x", "y", "z"):
+        xg[k] = f.read(lx)
 
     return xg
 
@@ -168,8 +189,6 @@ def Efield(file: Path) -> xarray.Dataset:
     load Efield_inputs files that contain input electric field in V/m
     """
 
-    ft = np.float64
-
     lx = simsize(file.parent)
 
     m = grid2(file.parent / "simgrid.dat", lx)
@@ -179,20 +198,17 @@ def Efield(file: Path) -> xarray.Dataset:
 
     dat = xarray.Dataset(coords={"mlon": m["mlon"], "mlat": m["mlat"]})
 
-    with file.open("rb") as f:
-        """
-        NOTE: this is a float64 from Matlab raw generation
-        """
-        dat["flagdirich"] = int(np.fromfile(f, ft, 1))
-        for p in ("Exit", "Eyit", "Vminx1it", "Vmaxx1it"):
-            dat[p] = (("x2", "x3"), read2D(f, lx))
-        for p in ("Vminx2ist", "Vmaxx2ist"):
-            dat[p] = (("x2",), np.fromfile(f, ft, lx[1]))
-        for p in ("Vminx3ist", "Vmaxx3ist"):
-            dat[p] = (("x3",), np.fromfile(f, ft, lx[0]))
-        filesize = file.stat().st_size
-        if f.tell() != filesize:
-            logging.error(f"{file} size {filesize} != file read position {f.tell()}")
+    f = RawFile(file)
+    # NOTE: this is a float64 from Matlab raw generation
+    dat["flagdirich"] = int(f.read(1)[0])
+    for p in ("Exit", "Eyit", "Vminx1it", "Vmaxx1it"):
+        dat[p] = (("x2", "x3"), read2D(f, lx))
+    for p in ("Vminx2ist", "Vmaxx2ist"):
+        dat[p] = (("x2",), f.read(lx[1]))
+    for p in ("Vminx3ist", "Vmaxx3ist"):
+        dat[p] = (("x3",), f.read(lx[0]))
+    if not f.at_end():
+        logging.error(f"{file} size {f.map.size} != file read position {f.pos} [float64]")
 
     return dat
 
@@ -206,17 +222,38 @@ def neutral2(file: Path) -> dict[str, T.Any]:
 
     dat: dict[str, T.Any] = {}
 
-    with file.open("rb") as f:
-        for p in ("dn0all", "dnN2all", "dnO2all", "dvnrhoall", "dvnzall", "dTnall"):
-            dat[p] = read2D(f, lx)
+    f = RawFile(file)
+    for p in ("dn0all", "dnN2all", "dnO2all", "dvnrhoall", "dvnzall", "dTnall"):
+        dat[p] = read2D(f, lx)
 
     return dat
 
 
 def data(
-    file, cfg: dict[str, T.Any], xg: dict[str, T.Any] | None = None
+    file,
+    cfg: dict[str, T.Any],
+    xg: dict[str, T.Any] | None = None,
+    var: set[str] | None = None,
 ) -> xarray.Dataset:
-    var = {"ne", "Ti", "Te", "v1", "v2", "v3", "J1", "J2", "J3", "Phi"}
+    """
+    read a frame of simulation data.
+    Variables stored in the file are memory-mapped views; only the derived
+    variables in var (default all) are computed.
+
+    Parameters
+    ----------
+    file: pathlib.Path
+        raw frame file
+    cfg: dict
+        simulation parameters, with "flagoutput"
+    xg: dict, optional
+        grid with x1, x2, x3
+    var: set of str, optional
+        variable(s) to derive e.g. "ne", "Ti"
+    """
+
+    if not var:
+        var = {"ne", "Ti", "Te", "v1", "v2", "v3", "J1", "J2", "J3", "Phi"}
 
     flag = cfg.get("flagoutput")
     if flag == 3:
@@ -235,6 +272,24 @@ def data(
     return dat
 
 
+def _coords(
+    file: Path, lx: tuple[int, ...], xg: dict[str, T.Any] | None
+) -> xarray.Dataset:
+    try:
+        if not xg:
+            xg = grid(file.parent)
+
+        return xarray.Dataset(
+            coords={"x1": xg["x1"][2:-2], "x2": xg["x2"][2:-2], "x3": xg["x3"][2:-2]}
+        )
+    except FileNotFoundError:
+        # perhaps converting raw data, and didn't have the huge grid file
+        logging.error("simgrid.dat missing, returning data without grid information")
+        return xarray.Dataset(
+            coords={"x1": range(lx[0]), "x2": range(lx[1]), "x3": range(lx[2])}
+        )
+
+
 def frame3d_curv(file: Path, xg: dict[str, T.Any] | None = None) -> xarray.Dataset:
     """
     curvilinear
@@ -244,6 +299,9 @@ def frame3d_curv(file: Path, xg: dict[str, T.Any] | None = None) -> xarray.Datas
 
     file: pathlib.Path
         filename to read
+
+    "ns", "vs1", "Ts" are returned with a species dimension like the HDF5 reader,
+    ne, v1, Ti, Te are computed from them by gemini3d.read.derive()
     """
 
     if not file.is_file():
@@ -251,43 +309,19 @@ def frame3d_curv(file: Path, xg: dict[str, T.Any] | None = None) -> xarray.Datas
 
     lx = simsize(file.parent)
 
-    try:
-        if not xg:
-            xg = grid(file.parent)
+    dat = _coords(file, lx, xg).assign_coords(species=SPECIES)
 
-        dat = xarray.Dataset(
-            coords={"x1": xg["x1"][2:-2], "x2": xg["x2"][2:-2], "x3": xg["x3"][2:-2]}
-        )
-    except FileNotFoundError:
-        # perhaps converting raw data, and didn't have the huge grid file
-        logging.error("simgrid.dat missing, returning data without grid information")
-        dat = xarray.Dataset(
-            coords={"x1": range(lx[0]), "x2": range(lx[1]), "x3": range(lx[2])}
-        )
+    f = RawFile(file)
+    dat = dat.assign_coords({"time": time(f)})
 
-    with file.open("rb") as f:
-        dat = dat.assign_coords({"time": time(f)})
+    for p in ("ns", "vs1", "Ts"):
+        # Fortran (x1, x2, x3, species) => view (species, x1, x2, x3)
+        dat[p] = (("species", "x1", "x2", "x3"), np.moveaxis(read4D(f, LSP, lx), 3, 0))
 
-        ns = read4D(f, LSP, lx)
-        dat["ne"] = (("x1", "x2", "x3"), ns[:, :, :, LSP - 1])
+    for p in ("J1", "J2", "J3", "v2", "v3"):
+        dat[p] = (("x1", "x2", "x3"), read3D(f, lx))
 
-        vs1 = read4D(f, LSP, lx)
-        dat["v1"] = (
-            ("x1", "x2", "x3"),
-            (ns[:, :, :, :6] * vs1[:, :, :, :6]).sum(axis=3) / dat["ne"],
-        )
-
-        Ts = read4D(f, LSP, lx)
-        dat["Ti"] = (
-            ("x1", "x2", "x3"),
-            (ns[:, :, :, :6] * Ts[:, :, :, :6]).sum(axis=3) / dat["ne"],
-        )
-        dat["Te"] = (("x1", "x2", "x3"), Ts[:, :, :, LSP - 1].squeeze())
-
-        for p in ("J1", "J2", "J3", "v2", "v3"):
-            dat[p] = (("x1", "x2", "x3"), read3D(f, lx))
-
-        dat["Phitop"] = (("x2", "x3"), read2D(f, lx))
+    dat["Phitop"] = (("x2", "x3"), read2D(f, lx))
 
     return dat
 
@@ -306,27 +340,15 @@ def frame3d_curvavg(file: Path, xg: dict[str, T.Any] | None = None) -> xarray.Da
 
     lx = simsize(file.parent)
 
-    try:
-        if not xg:
-            xg = grid(file.parent)
-
-        dat = xarray.Dataset(
-            coords={"x1": xg["x1"][2:-2], "x2": xg["x2"][2:-2], "x3": xg["x3"][2:-2]}
-        )
-    except FileNotFoundError:
-        # perhaps converting raw data, and didn't have the huge grid file
-        logging.error("simgrid.dat missing, returning data without grid information")
-        dat = xarray.Dataset(
-            coords={"x1": range(lx[0]), "x2": range(lx[1]), "x3": range(lx[2])}
-        )
+    dat = _coords(file, lx, xg)
 
-    with file.open("rb") as f:
-        dat = dat.assign_coords({"time": time(f)})
+    f = RawFile(file)
+    dat = dat.assign_coords({"time": time(f)})
 
-        for p in ("ne", "v1", "Ti", "Te", "J1", "J2", "J3", "v2", "v3"):
-            dat[p] = (("x1", "x2", "x3"), read3D(f, lx))
+    for p in ("ne", "v1", "Ti", "Te", "J1", "J2", "J3", "v2", "v3"):
+        dat[p] = (("x1", "x2", "x3"), read3D(f, lx))
 
-        dat["Phitop"] = (("x2", "x3"), read2D(f, lx))
+    dat["Phitop"] = (("x2", "x3"), read2D(f, lx))
 
     return dat
 
@@ -345,59 +367,47 @@ def frame3d_curvne(file: Path, xg: dict[str, T.Any] | None = None):
 
     lx = simsize(file.parent)
 
-    try:
-        if not xg:
-            xg = grid(file.parent)
+    dat = _coords(file, lx, xg)
 
-        dat = xarray.Dataset(
-            coords={"x1": xg["x1"][2:-2], "x2": xg["x2"][2:-2], "x3": xg["x3"][2:-2]}
-        )
-    except FileNotFoundError:
-        # perhaps converting raw data, and didn't have the huge grid file
-        logging.error("simgrid.dat missing, returning data without grid information")
-        dat = xarray.Dataset(
-            coords={"x1": range(lx[0]), "x2": range(lx[1]), "x3": range(lx[2])}
-        )
+    f = RawFile(file)
+    dat = dat.assign_coords({"time": time(f)})
 
-    with file.open("rb") as f:
-        dat = dat.assign_coords({"time": time(f)})
-
-        dat["ne"] = (("x1", "x2", "x3"), read3D(f, lx))
+    dat["ne"] = (("x1", "x2", "x3"), read3D(f, lx))
 
     return dat
 
 
-def read4D(f: T.BinaryIO, lsp: int, lx: tuple[int, ...] | list[int]):
+def read4D(f: RawFile, lsp: int, lx: tuple[int, ...] | list[int]) -> np.ndarray:
     """
-    read 4D array from raw file
+    view of next 4D array of raw file
     """
 
     if len(lx) != 3:
         raise ValueError(f"lx must have 3 elements, you have lx={lx}")
 
-    return np.fromfile(f, np.float64, np.prod(lx) * lsp).reshape((*lx, lsp), order="F")
+    return f.read((*lx, lsp))
 
 
-def read3D(f: T.BinaryIO, lx: tuple[int, ...] | list[int]):
+def read3D(f: RawFile, lx: tuple[int, ...] | list[int]) -> np.ndarray:
     """
-    read 3D array from raw file
+    view of next 3D array of raw file
     """
 
     if len(lx) != 3:
         raise ValueError(f"lx must have 3 elements, you have lx={lx}")
 
-    return np.fromfile(f, np.float64, np.prod(lx)).reshape(*lx, order="F")
+    return f.read(lx)
 
 
-def read2D(f: T.BinaryIO, lx: tuple[int, ...] | list[int]):
+def read2D(f: RawFile, lx: tuple[int, ...] | list[int]) -> np.ndarray:
     """
-    read 2D array from raw file
+    view of next 2D array of raw file
     """
 
     if len(lx) == 3:
-        return np.fromfile(f, np.float64, np.prod(lx[1:])).reshape(*lx[1:], order="F")
+        return f.read(lx[1:])
     elif len(lx) == 2:
-        return np.fromfile(f, np.float64, np.prod(lx)).reshape(*lx, order="F")
+        return f.read(lx)
 
     raise ValueError(f"lx must have 2 or 3 elements, you have lx={lx}")
 
@@ -424,17 +434,15 @@ def glow_aurmap(file: Path, xg: dict[str, T.Any] | None = None):
     if len(lx) != 3:
         raise ValueError(f"lx must have 3 elements, you have lx={lx}")
 
-    with file.open("rb") as f:
-        raw = np.fromfile(f, np.float64, np.prod(lx[1:]) * len(WAVELEN)).reshape(
-            np.prod(lx[1:]) * len(WAVELEN), order="F"
-        )
+    # Fortran (x2, x3, wavelength)
+    raw = RawFile(file).read((lx[1], lx[2], len(WAVELEN)))
 
-    dat["rayleighs"] = (("wavelength", "x2", "x3"), raw)
+    dat["rayleighs"] = (("wavelength", "x2", "x3"), raw.transpose(2, 0, 1))
 
     return dat
 
 
-def time(f: T.BinaryIO) -> datetime:
-    t = np.fromfile(f, np.float64, 4)
+def time(f: RawFile) -> datetime:
+    t = f.read(4)
 
-    return datetime(int(t[0]), int(t[1]), int(t[2])) + timedelta(hours=t[3])
+    return datetime(int(t[0]), int(t[1]), int(t[2])) + timedelta(hours=float(t[3]))
@@ -5,19 +5,45 @@ https://docs.python.org/3/library/struct.html#struct-format-strings
 
 from __future__ import annotations
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
 import typing as T
+import logging
+import bisect
+import collections
+import concurrent.futures
+import functools
+import itertools
 
 import numpy as np
+import xarray
+import h5py
 
 from .config import read_nml
 from . import find
-from . import LSP
+from . import LSP, SPECIES
+from .utils import get_dtype
 
 from .hdf5 import read as h5read
+from .hdf5 import backend as h5backend
+from .hdf5 import pool as h5pool
+from .hdf5 import cube as h5cube
+from .grid import gridmodeldata
 
+# index slice, index or closed (min, max) coordinate interval
+Selection = T.Union[slice, int, T.Tuple[float, float], None]
 
-# do NOT use lru_cache--can have weird unexpected effects with complicated setups
+# config and grid shared by iter_frames() worker processes, sent once per worker
+_worker_state: dict[str, T.Any] = {}
+
+SLAB_BYTES = 2**24  # size of each species slab in ion_average() [bytes]
+
+FRAME_CACHE_SIZE = 4  # frames kept by frame_at() for reuse by the next query
+# (source, modification time, time, var, selection) => frame, least recently used first
+_frame_cache: collections.OrderedDict[tuple, xarray.Dataset] = collections.OrderedDict()
+
+
+# do NOT use lru_cache--can have weird unexpected effects with complicated setups.
+# The file is cached by namelist.read_all() until it changes, parsed anew each call.
 def config(path: Path) -> dict[str, T.Any]:
     """
     read simulation input configuration from .nml Fortran namelist file
@@ -43,7 +69,11 @@ def simsize(path: Path) -> tuple[int, ...]:
 
 
 def grid(
-    path: Path, *, var: set[str] | None = None, shape: bool = False
+    path: Path,
+    *,
+    var: set[str] | None = None,
+    shape: bool = False,
+    dtype: str | None = None,
 ) -> dict[str, T.Any]:
     """
     get simulation grid
@@ -54,14 +84,22 @@ def grid(
     path: pathlib.Path
         path to simgrid.*
     var: set of str
-        read only these grid variables
+        read these grid variables now; others are read on first access
     shape: bool, optional
         read only the shape of the grid instead of the data iteslf
+    dtype: str, optional
+        "native" (as stored), "float32" or "float64".
+        Default is the global policy, see gemini3d.utils.set_dtype
+
+    Returns
+    -------
+    xg: gemini3d.hdf5.read.Grid
+        dict of grid variables, each read from disk when first used
     """
 
     fn = find.grid(path)
 
-    xg = h5read.grid(fn, var=var, shape=shape)
+    xg = h5read.grid(fn, var=var, shape=shape, dtype=dtype)
 
     xg["filename"] = fn
 
@@ -75,6 +113,14 @@ def frame(
     *,
     cfg: dict[str, T.Any] | None = None,
     xg: dict[str, T.Any] | None = None,
+    x1: Selection = None,
+    x2: Selection = None,
+    x3: Selection = None,
+    alt: tuple[float, float] | None = None,
+    glat: tuple[float, float] | None = None,
+    glon: tuple[float, float] | None = None,
+    species: T.Sequence[str | int] | None = None,
+    dtype: str | None = None,
 ):
     """
     load a frame of simulation data, automatically selecting the correct
@@ -82,16 +128,33 @@ def frame(
 
     Parameters
     ----------
-    file: pathlib.Path
-        filename for this timestep
+    path: pathlib.Path
+        filename for this timestep, or simulation output directory
     time: datetime.datetime
-        time to load from simulation output
+        time to load from simulation output directory.
+        If the directory was repacked (gemini3d.repack), the repacked file is read
+        unless the frame file is newer.
     var: set of str
         variable(s) to read
     cfg: dict
         to avoid reading config.nml
     xg: dict
         to avoid reading simgrid.*, useful to save time when reading data files in a loop
+    x1, x2, x3: slice, int or (min, max), optional
+        read only this region: index slice, index, or closed coordinate interval
+    alt, glat, glon: (min, max), optional
+        read only the index box enclosing grid cells in this closed interval
+        of altitude [m], geographic latitude or longitude [deg]
+
+    species: list of str or int, optional
+        species names (gemini3d.SPECIES) or indices of "ns", "vs1", "Ts" to read.
+        Default is all species if those variables are requested.
+    dtype: str, optional
+        "native" (as stored), "float32" or "float64", for data and derived variables.
+        Default is the global policy, see gemini3d.utils.set_dtype
+
+    Only the selected hyperslab is read from disk. See region() for details.
+    Only the species needed for the requested variables are read.
 
     Returns
     -------
@@ -110,35 +173,843 @@ def frame(
 
     # %% file or directory
     path = Path(path).expanduser()
+    src: h5cube.Source = path
     if path.is_dir():
         if time is None:
             raise ValueError(
                 f"must specify time when giving directory {path} instead of file"
             )
-        path = find.frame(path, time)
+        src = h5cube.source(path, time)
+        path = src[0] if isinstance(src, tuple) else src
     # %% config file needed
     if not cfg:
         cfg = config(path.parent)
 
-    flag = h5read.flagoutput(path, cfg)
+    # %% region of interest
+    key = None
+    phys = {"alt": alt, "glat": glat, "glon": glon}
+    if any(s is not None for s in (x1, x2, x3, *phys.values())):
+        need = {"x1", "x2", "x3"} | {k for k, v in phys.items() if v is not None}
+        xr = xg if xg and need <= xg.keys() else grid(path.parent, var=need, dtype=dtype)
+        key = region(xr, x1=x1, x2=x2, x3=x3, **phys)
+        if not xg:
+            xg = xr
+
+    # one open of the frame file for output type, data and time
+    with h5cube.open_source(src) as f:
+        flag = h5read.flagoutput(f, cfg)
+
+        if flag == 3:
+            dat = h5read.frame3d_curvne(f, xg, key, dtype)
+        elif flag == 1:
+            dat = h5read.frame3d_curv(f, var, xg, key, species, dtype)
+        elif flag == 2:
+            dat = h5read.frame3d_curvavg(f, var, xg, key, dtype)
+        else:
+            raise ValueError(f"Unsure how to read {path} with flagoutput {flag}")
+
+        dat = dat.assign_coords({"time": h5read.time(f)})
+
+    dat.attrs["filename"] = path
+
+    dat.update(derive(dat, var, flag, dtype))
+
+    return dat
+
+
+def frame_at(
+    direc: Path,
+    time: datetime,
+    var: set[str] | None = None,
+    *,
+    method: str = "linear",
+    cfg: dict[str, T.Any] | None = None,
+    xg: dict[str, T.Any] | None = None,
+    **kwargs,
+) -> xarray.Dataset:
+    """
+    simulation data at any time of the simulation, interpolated between
+    the output frames before and after it.
+
+    The last FRAME_CACHE_SIZE frames read are kept, so a sequence of times,
+    e.g. of observations, reads each frame once.
+
+    Parameters
+    ----------
+    direc: pathlib.Path
+        simulation output directory
+    time: datetime.datetime
+        time of data
+    var: set of str, optional
+        variable(s) to read
+    method: str, optional
+        "linear" in time, or "nearest" output frame
+    cfg: dict, optional
+        to avoid reading config.nml
+    xg: dict, optional
+        to avoid reading simgrid.*
+    kwargs:
+        passed to frame(), e.g. region x1=, alt=, species=, dtype=.
+        Only that region of each frame is read and interpolated.
+
+    Returns
+    -------
+    dat: xarray.Dataset
+        simulation data at time. Data at an output time is shared with the cache,
+        so copy it before modifying in place.
+    """
+
+    if method not in {"linear", "nearest"}:
+        raise ValueError(f"unknown time interpolation method {method}")
+
+    direc = Path(direc).expanduser()
+
+    if not cfg:
+        cfg = config(direc)
+
+    times = cfg["time"]
+    # as find.frame, to match frame file names rounded by Gemini3D
+    tol = timedelta(seconds=1)
+    if not times[0] - tol <= time <= times[-1] + tol:
+        raise ValueError(f"{time} is outside simulation times {times[0]} to {times[-1]}")
+
+    i = bisect.bisect_right(times, time)
+    t0 = times[max(i - 1, 0)]
+    t1 = times[min(i, len(times) - 1)]
+
+    for t in (t0, t1):
+        if abs(time - t) <= tol:
+            return _cached_frame(direc, t, var, cfg, xg, kwargs)
+
+    w = (time - t0) / (t1 - t0)
+    if method == "nearest":
+        return _cached_frame(direc, t0 if w < 0.5 else t1, var, cfg, xg, kwargs)
+
+    A = _cached_frame(direc, t0, var, cfg, xg, kwargs)
+    B = _cached_frame(direc, t1, var, cfg, xg, kwargs)
+
+    dat = A.drop_vars("time") * (1 - w) + B.drop_vars("time") * w
+    dat = dat.assign_coords({"time": time})
+    dat.attrs["filename"] = [A.attrs["filename"], B.attrs["filename"]]
+
+    return dat
+
+
+def _cached_frame(
+    direc: Path,
+    time: datetime,
+    var: set[str] | None,
+    cfg: dict[str, T.Any],
+    xg: dict[str, T.Any] | None,
+    kwargs: dict[str, T.Any],
+) -> xarray.Dataset:
+    src = h5cube.source(direc, time)
+    file = src[0] if isinstance(src, tuple) else src
+
+    key = (
+        src,
+        file.stat().st_mtime_ns,
+        time,
+        tuple(sorted([var] if isinstance(var, str) else var or ())),
+        repr(sorted(kwargs.items())),
+    )
+
+    dat = _frame_cache.pop(key, None)
+    if dat is None:
+        dat = frame(direc, time, var, cfg=cfg, xg=xg, **kwargs)
+
+    _frame_cache[key] = dat
+    while len(_frame_cache) > FRAME_CACHE_SIZE:
+        _frame_cache.popitem(last=False)
+
+    return dat
+
+
+def region(
+    xg: dict[str, T.Any],
+    *,
+    x1: Selection = None,
+    x2: Selection = None,
+    x3: Selection = None,
+    alt: tuple[float, float] | None = None,
+    glat: tuple[float, float] | None = None,
+    glon: tuple[float, float] | None = None,
+) -> tuple[slice, slice, slice]:
+    """
+    convert a region of interest to (x1, x2, x3) index slices, for hyperslab reads
+
+    Parameters
+    ----------
+    xg: dict
+        simulation grid, with "alt", "glat", "glon" if those are selected on
+    x1, x2, x3: slice, int or (min, max), optional
+        index slice, index, or closed interval of the grid coordinate.
+        An index keeps a length-1 dimension.
+    alt, glat, glon: (min, max), optional
+        closed interval of altitude [m], geographic latitude or longitude [deg].
+        Since these vary over the whole (possibly curvilinear) grid, the smallest
+        index box enclosing all matching cells is used.
+
+    Returns
+    -------
+    key: tuple of slice
+        (x1, x2, x3) slices with non-negative start, stop and positive step
+    """
+
+    lx = get_lxs(xg)
+
+    key = []
+    for i, sel in enumerate((x1, x2, x3)):
+        n = lx[i]
+        x = xg[f"x{i + 1}"]
+        if x.size == n + 4:
+            x = x[2:-2]
+
+        if sel is None:
+            s = slice(None)
+        elif isinstance(sel, slice):
+            s = sel
+        elif isinstance(sel, (int, np.integer)):
+            s = slice(range(n)[sel], range(n)[sel] + 1)
+        else:
+            j = _interval(x, sel, f"x{i + 1}")
+            s = slice(j[0], j[-1] + 1)
+
+        r = range(n)[s]
+        if r.step < 0:
+            raise ValueError(f"x{i + 1}: negative step slices are not supported")
+        key.append(slice(r.start, r.stop, r.step))
+
+    for k, lim in (("alt", alt), ("glat", glat), ("glon", glon)):
+        if lim is None:
+            continue
+
+        lo, hi = sorted(lim)
+        inside = (xg[k] >= lo) & (xg[k] <= hi)
+        if not inside.any():
+            raise ValueError(f"no grid cells with {k} in [{lo}, {hi}]")
+
+        for i in range(3):
+            m = np.flatnonzero(inside.any(axis=tuple(a for a in range(3) if a != i)))
+            if key[i].step != 1:
+                raise ValueError(f"x{i + 1}: strided slice cannot be combined with {k}")
+            start = max(key[i].start, m[0])
+            stop = min(key[i].stop, m[-1] + 1)
+            if stop <= start:
+                raise ValueError(
+                    f"x{i + 1} selection does not intersect {k} in [{lo}, {hi}]"
+                )
+            key[i] = slice(start, stop, 1)
+
+    return key[0], key[1], key[2]
+
+
+def _interval(x: np.ndarray, lim: tuple[float, float], name: str) -> np.ndarray:
+    """indices of monotonic coordinate x in closed interval lim"""
+
+    lo, hi = sorted(lim)
+    i = np.flatnonzero((x >= lo) & (x <= hi))
+    if i.size == 0:
+        raise ValueError(f"no {name} in [{lo}, {hi}]")
+
+    return i
+
+
+def series(
+    direc: Path,
+    var: set[str] | None = None,
+    *,
+    times: list[datetime] | None = None,
+    cfg: dict[str, T.Any] | None = None,
+    xg: dict[str, T.Any] | None = None,
+    dtype: str | None = None,
+):
+    """
+    open all frames of a simulation as one lazily-loaded Dataset with a time dimension.
+    Data is read only when indexed, and then only the needed hyperslab of each file, e.g.
+
+        ds = gemini3d.read.series(direc, var={"ne", "Te"})
+        ne = ds["ne"].sel(time=t, x1=slice(200e3, 400e3)).values
+
+    Parameters
+    ----------
+    direc: pathlib.Path
+        simulation output directory
+    var: set of str, optional
+        variable(s) to make available
+    times: list of datetime.datetime, optional
+        times to include, default is all times in config.nml that have a file
+    cfg: dict, optional
+        to avoid reading config.nml
+    xg: dict, optional
+        to avoid reading simgrid.*
+    dtype: str, optional
+        "native" (as stored), "float32" or "float64".
+        Default is the global policy, see gemini3d.utils.set_dtype
+
+    Times in a repacked file (gemini3d.repack) are read from it, so a region over
+    all times is read from few chunks instead of opening each frame file.
+
+    Returns
+    -------
+    dat: xarray.Dataset
+        lazily-loaded simulation data
+    """
+
+    if not var:
+        var = {"ne", "Ti", "Te", "v1", "v2", "v3", "J1", "J2", "J3", "Phi"}
+
+    if isinstance(var, str):
+        var = [var]
+    var = set(var)
+
+    direc = Path(direc).expanduser()
+
+    if not cfg:
+        cfg = config(direc)
+
+    if times is None:
+        times = cfg["time"]
+
+    files: list[h5cube.Source] = []
+    found = []
+    for t in times:
+        try:
+            files.append(h5cube.source(direc, t))
+        except FileNotFoundError:
+            logging.warning(f"no frame at {t} in {direc}")
+            continue
+        found.append(t)
+
+    if not files:
+        raise FileNotFoundError(f"no simulation output frames found in {direc}")
+
+    if not xg:
+        xg = grid(direc, var={"x1", "x2", "x3"})
+
+    # the first frame may be a milestone, of another output type than the run
+    flag = cfg.get("flagoutput")
+    if flag is None:
+        with h5cube.open_source(files[0]) as f:
+            flag = h5read.flagoutput(f, cfg)
+
+    dat = h5backend.open_series(files, found, var, flag, xg, dtype)
+    dat.attrs["filename"] = direc
+
+    return dat
+
+
+def iter_frames(
+    direc: Path,
+    var: set[str] | None = None,
+    *,
+    times: list[datetime] | None = None,
+    prefetch: int = 2,
+    processes: bool = True,
+    cfg: dict[str, T.Any] | None = None,
+    xg: dict[str, T.Any] | None = None,
+    **kwargs,
+) -> T.Iterator[T.Any]:
+    """
+    iterate over frames in time order, reading the next frames in the background
+    while the caller processes the current one, e.g.
+
+        for dat in gemini3d.read.iter_frames(direc, {"ne", "Te"}, prefetch=2):
+            plot(dat)
+
+    Parameters
+    ----------
+    direc: pathlib.Path
+        simulation output directory
+    var: set of str, optional
+        variable(s) to read
+    times: list of datetime.datetime, optional
+        times to read, default is all times in config.nml
+    prefetch: int, optional
+        number of frames read ahead; at most this many frames are held besides
+        the one yielded. 0 reads each frame when requested.
+    processes: bool, optional
+        read in worker processes (default), else threads.
+        h5py holds the GIL while reading, so threads only overlap reads with
+        computations that release the GIL, like numpy.
+    cfg: dict, optional
+        to avoid reading config.nml
+    xg: dict, optional
+        to avoid reading simgrid.*. Read once and shared by all frames.
+        A gemini3d.shared.SharedGrid is mapped by worker processes rather than copied.
+    kwargs:
+        passed to frame(), e.g. x1=, species=, dtype=
+
+    Yields
+    ------
+    dat: xarray.Dataset
+        simulation data of each time
+    """
+
+    direc = Path(direc).expanduser()
+
+    if not cfg:
+        cfg = config(direc)
+
+    if times is None:
+        times = cfg["time"]
+
+    if not xg:
+        xg = grid(direc, var={"x1", "x2", "x3"}, dtype=kwargs.get("dtype"))
+
+    if prefetch < 1:
+        for t in times:
+            yield frame(direc, t, var, cfg=cfg, xg=xg, **kwargs)
+        return
+
+    pool: concurrent.futures.Executor
+    if processes:
+        # cfg and grid are sent to each worker once, not with every frame
+        pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=prefetch, initializer=_init_worker, initargs=(cfg, xg)
+        )
+        load = functools.partial(_read_frame, var=var, **kwargs)
+    else:
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=prefetch)
+        load = functools.partial(frame, var=var, cfg=cfg, xg=xg, **kwargs)
+
+    pending: collections.deque[concurrent.futures.Future] = collections.deque()
+
+    try:
+        for t in times:
+            pending.append(pool.submit(load, direc, t))
+            if len(pending) > prefetch:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for fut in pending:
+            fut.cancel()
+        pool.shutdown(wait=True)
+
+
+def probe(
+    direc: Path,
+    var: set[str] | None = None,
+    *,
+    alt,
+    glat,
+    glon,
+    times: list[datetime] | None = None,
+    cfg: dict[str, T.Any] | None = None,
+    xg: dict[str, T.Any] | None = None,
+    dtype: str | None = None,
+):
+    """
+    time series at geographic points (virtual probes), trilinearly interpolated.
+    The containing cells and weights are computed once, then only the 2x2x2 cell
+    neighborhood of each point is read from each frame.
+
+    Parameters
+    ----------
+    direc: pathlib.Path
+        simulation output directory
+    var: set of str, optional
+        variable(s) to read, e.g. "ne", "Ti", "Phi"
+    alt, glat, glon: float or array_like
+        point altitude [m], geographic latitude and longitude [deg]
+    times: list of datetime.datetime, optional
+        times to read, default is all times in config.nml that have a file
+    cfg: dict, optional
+        to avoid reading config.nml
+    xg: dict, optional
+        to avoid reading simgrid.*
+    dtype: str, optional
+        "native" (as stored), "float32" or "float64" of the result.
+        Interpolation is done in float64.
+
+    Returns
+    -------
+    dat: xarray.Dataset
+        variables with dimensions (time, point), NaN for points outside the grid
+    """
+
+    if not var:
+        var = {"ne", "Ti", "Te", "v1", "v2", "v3", "J1", "J2", "J3", "Phi"}
+
+    if isinstance(var, str):
+        var = [var]
+    var = set(var)
+
+    direc = Path(direc).expanduser()
+
+    if not cfg:
+        cfg = config(direc)
+
+    if times is None:
+        times = cfg["time"]
+
+    need = {"x1", "x2", "x3", "h1", "glat", "glon", "glatctr", "glonctr"}
+    if not xg or not {"x1", "x2", "x3", "h1"} <= xg.keys():
+        fn = find.grid(direc)
+        with h5pool.open_file(fn) as f:
+            need &= f.keys()
+        xg = grid(direc, var=need)
+
+    alt, glat, glon = (
+        a.ravel() for a in np.broadcast_arrays(*np.atleast_1d(alt, glat, glon))
+    )
+
+    w = gridmodeldata.probe_weights(xg, alt, glon, glat)
+    lx = get_lxs(xg)
+    Npt = alt.size
+
+    # hyperslab and corner weights of each point inside the grid
+    slabs = []
+    for ip in np.flatnonzero(w["inside"]):
+        cw = np.ones((1, 1, 1))
+        for i in range(3):
+            if lx[i] > 1:
+                f1 = w["frac"][ip, i]
+                cw = cw * np.array([1 - f1, f1]).reshape(
+                    [2 if a == i else 1 for a in range(3)]
+                )
+        key = tuple(slice(j, j + n) for j, n in zip(w["index"][ip], cw.shape))
+        slabs.append((ip, key, cw))
+
+    found = []
+    out: dict[str, list[np.ndarray]] = {k: [] for k in var}
+    native: dict[str, np.dtype] = {}
+    for t in times:
+        try:
+            src = h5cube.source(direc, t)
+        except FileNotFoundError:
+            logging.warning(f"no frame at {t} in {direc}")
+            continue
+        found.append(t)
+
+        with h5cube.open_source(src) as f:
+            flag = h5read.flagoutput(f, cfg)
+            for k in var:
+                name = "Phitop" if k == "Phi" else k
+                v = np.full(Npt, np.nan)
+                for ip, key, cw in slabs:
+                    if name == "Phitop":
+                        a = h5read.variable(f, name, flag, key[1:], lx)
+                        v[ip] = (a * cw.sum(axis=0)).sum()
+                    else:
+                        a = h5read.variable(f, name, flag, key, lx)
+                        v[ip] = (a * cw).sum()
+                    native[k] = a.dtype
+                out[k].append(v)
+
+    dt = get_dtype(dtype)
+
+    dat = xarray.Dataset(
+        coords={
+            "time": found,
+            "point": np.arange(Npt),
+            "alt": ("point", alt),
+            "glat": ("point", glat),
+            "glon": ("point", glon),
+        }
+    )
+    for k in var:
+        arr = np.array(out[k]).reshape(len(found), Npt)
+        dat[k] = (("time", "point"), arr.astype(dt or native.get(k, arr.dtype)))
+
+    dat.attrs["filename"] = direc
+
+    return dat
+
+
+def time_stack(
+    direc: Path,
+    var: set[str] | None = None,
+    *,
+    x1: Selection = None,
+    x2: Selection = None,
+    x3: Selection = None,
+    alt=None,
+    glat=None,
+    glon=None,
+    times: list[datetime] | None = None,
+    workers: int = 2,
+    out: Path | None = None,
+    cfg: dict[str, T.Any] | None = None,
+    xg: dict[str, T.Any] | None = None,
+    dtype: str | None = None,
+):
+    """
+    the same 1-D or 2-D slice of every frame stacked in time, e.g. a keogram or
+    altitude-time plot, reading only the slice from each frame.
+
+    The slice is given either by grid index (x1, x2, x3), e.g. x2=10, x3=20 for
+    an altitude profile, or by geographic points (alt, glat, glon) broadcast
+    to a 1-D or 2-D shape, e.g. alt=300e3, glon=-147, glat=np.linspace(60, 70, 100).
+    Interpolation weights of the points are computed once, then the smallest
+    hyperslab enclosing their cells is read from each frame.
+
+    Parameters
+    ----------
+    direc: pathlib.Path
+        simulation output directory
+    var: set of str, optional
+        variable(s) to read, e.g. "ne", "Ti", "Phi"
+    x1, x2, x3: slice, int or (min, max), optional
+        index slice, index (dimension dropped), or closed coordinate interval
+    alt, glat, glon: float or array_like, optional
+        points of the slice: altitude [m], geographic latitude and longitude [deg]
+    times: list of datetime.datetime, optional
+        times to read, default is all times in config.nml that have a file
+    workers: int, optional
+        number of worker processes reading frames, 0 reads in this process
+    out: pathlib.Path, optional
+        HDF5 file to write each time to as it is read, instead of returning the
+        data, for runs too long to hold in memory
+    cfg: dict, optional
+        to avoid reading config.nml
+    xg: dict, optional
+        to avoid reading simgrid.*
+    dtype: str, optional
+        "native" (as stored), "float32" or "float64" of the result.
+        Interpolation is done in float64.
+
+    Returns
+    -------
+    dat: xarray.Dataset or pathlib.Path
+        variables with dimensions (time, slice dimensions), NaN for points outside the grid.
+        If out is given, the file written, with datasets of the same names and
+        time as /time/ymd, /time/UTsec.
+    """
+
+    if not var:
+        var = {"ne", "Ti", "Te", "v1", "v2", "v3", "J1", "J2", "J3", "Phi"}
+
+    if isinstance(var, str):
+        var = [var]
+    var = set(var)
+
+    direc = Path(direc).expanduser()
 
-    if flag == 3:
-        dat = h5read.frame3d_curvne(path, xg)
-    elif flag == 1:
-        dat = h5read.frame3d_curv(path, var, xg)
-    elif flag == 2:
-        dat = h5read.frame3d_curvavg(path, var, xg)
+    if not cfg:
+        cfg = config(direc)
+
+    if times is None:
+        times = cfg["time"]
+
+    points = any(a is not None for a in (alt, glat, glon))
+    if points and any(a is not None for a in (x1, x2, x3)):
+        raise ValueError("give the slice by x1, x2, x3 or by alt, glat, glon, not both")
+
+    need = {"x1", "x2", "x3", "lx"}
+    if points:
+        need |= {"h1", "glat", "glon", "glatctr", "glonctr"}
+        with h5pool.open_file(find.grid(direc)) as f:
+            need &= {*f.keys(), "lx"}
+    if not xg or not need <= xg.keys():
+        xg = grid(direc, var=need)
+
+    lx = get_lxs(xg)
+    dims: tuple[str, ...]
+    coords: dict[str, T.Any] = {}
+
+    if points:
+        alt, glat, glon = np.broadcast_arrays(*np.atleast_1d(alt, glat, glon))
+        if alt.ndim > 2:
+            raise ValueError("alt, glat, glon must broadcast to a 1-D or 2-D slice")
+        dims = ("point",) if alt.ndim == 1 else ("point1", "point2")
+        plan = _point_plan(xg, lx, alt, glat, glon)
+        coords = {"alt": (dims, alt), "glat": (dims, glat), "glon": (dims, glon)}
     else:
-        raise ValueError(f"Unsure how to read {path} with flagoutput {flag}")
+        key = region(xg, x1=x1, x2=x2, x3=x3)
+        drop = [isinstance(s, (int, np.integer)) for s in (x1, x2, x3)]
+        dims = tuple(f"x{i + 1}" for i in range(3) if not drop[i])
+        plan = {"key": key, "drop": drop, "dtype": dtype, "lx": lx}
+        for i in range(3):
+            x = xg[f"x{i + 1}"]
+            x = x[2:-2][key[i]] if x.size == lx[i] + 4 else x[key[i]]
+            coords[f"x{i + 1}"] = x[0] if drop[i] else (f"x{i + 1}", x)
+
+    dt = get_dtype(dtype)
+
+    if workers < 1:
+        # state passed directly, leaving _worker_state to pool worker processes
+        load = functools.partial(_stack_frame, var=var, state={"cfg": cfg, "plan": plan})
+        results: T.Iterator = map(load, itertools.repeat(direc), times)
+        return _stack(results, times, var, dims, coords, dt, out, direc)
+
+    load = functools.partial(_stack_frame, var=var)
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(cfg, {}, plan)
+    ) as pool:
+        results = pool.map(load, itertools.repeat(direc), times)
+        return _stack(results, times, var, dims, coords, dt, out, direc)
+
+
+def _point_plan(xg: dict[str, T.Any], lx, alt, glat, glon) -> dict[str, T.Any]:
+    """
+    hyperslab enclosing the cells of the points, and interpolation weight
+    of each cell corner relative to it
+    """
 
-    dat.attrs["filename"] = path
+    w = gridmodeldata.probe_weights(xg, alt, glon, glat)
+    inside = w["inside"]
+    index = w["index"][inside]
+    frac = w["frac"][inside]
+
+    step = [1 if n > 1 else 0 for n in lx]
+    if inside.any():
+        lo = index.min(axis=0)
+        hi = index.max(axis=0) + step
+    else:
+        lo = hi = np.zeros(3, dtype=int)
+    key = tuple(slice(int(a), int(b) + 1) for a, b in zip(lo, hi))
+    index = index - lo
+
+    corners = []
+    for c in itertools.product(*([0, 1] if d else [0] for d in step)):
+        cw = np.ones(index.shape[0])
+        for i in range(3):
+            if step[i]:
+                cw = cw * (frac[:, i] if c[i] else 1 - frac[:, i])
+        corners.append((index + c, cw))
+
+    return {
+        "key": key,
+        "corners": corners,
+        "inside": inside,
+        "shape": alt.shape,
+        "lx": lx,
+    }
+
+
+def _stack_frame(
+    direc: Path, time: datetime, var: set[str], state: dict[str, T.Any] | None = None
+) -> dict[str, tuple[np.ndarray, np.dtype]] | None:
+    """
+    slice of one frame and the stored dtype of each variable, None if no frame at time.
+    state has "cfg" and "plan", default _worker_state of a pool worker process.
+    """
 
-    dat.update(derive(dat, var, flag))
+    if state is None:
+        state = _worker_state
+
+    cfg = state["cfg"]
+    plan = state["plan"]
+
+    try:
+        src = h5cube.source(direc, time)
+    except FileNotFoundError:
+        return None
+
+    out = {}
+    with h5cube.open_source(src) as f:
+        flag = h5read.flagoutput(f, cfg)
+        for k in var:
+            name = "Phitop" if k == "Phi" else k
+            # Phitop has no x1 dimension
+            d = 1 if name == "Phitop" else 0
+            key = plan["key"][d:]
+            if "corners" in plan:
+                a = h5read.variable(f, name, flag, key, plan["lx"])
+                v = np.full(plan["inside"].shape, np.nan)
+                v[plan["inside"]] = sum(
+                    cw * a[tuple(i[:, d:].T)] for i, cw in plan["corners"]
+                )
+                out[k] = (v.reshape(plan["shape"]), a.dtype)
+            else:
+                a = h5read.variable(f, name, flag, key, plan["lx"], dtype=plan["dtype"])
+                out[k] = (
+                    a[tuple(0 if x else slice(None) for x in plan["drop"][d:])],
+                    a.dtype,
+                )
+
+    return out
+
+
+def _stack(
+    results: T.Iterable[dict[str, tuple[np.ndarray, np.dtype]] | None],
+    times: list[datetime],
+    var: set[str],
+    dims: tuple[str, ...],
+    coords: dict[str, T.Any],
+    dt: np.dtype | None,
+    out: Path | None,
+    direc: Path,
+):
+    """collect slices of each time in memory, or write them to file out"""
+
+    found = []
+    data: dict[str, list[np.ndarray]] = {k: [] for k in var}
+    native: dict[str, np.dtype] = {}
+
+    h = None
+    if out is not None:
+        out = Path(out).expanduser()
+        h5pool.evict(out)
+        h = h5py.File(out, "w")
+
+    try:
+        for t, r in zip(times, results):
+            if r is None:
+                logging.warning(f"no frame at {t} in {direc}")
+                continue
+            found.append(t)
+
+            for k, (a, native[k]) in r.items():
+                a = a.astype(dt or native[k], copy=False)
+                if h is None:
+                    data[k].append(a)
+                    continue
+                if k not in h:
+                    h.create_dataset(
+                        k,
+                        (0, *a.shape),
+                        dtype=a.dtype,
+                        maxshape=(None, *a.shape),
+                        chunks=(1, *a.shape),
+                    )
+                h[k].resize(len(found), axis=0)
+                h[k][-1] = a
+
+        if h is not None:
+            h["/time/ymd"] = np.array(
+                [(t.year, t.month, t.day) for t in found], dtype=np.int32
+            )
+            h["/time/UTsec"] = np.array(
+                [
+                    t.hour * 3600 + t.minute * 60 + t.second + t.microsecond / 1e6
+                    for t in found
+                ]
+            )
+            for k, c in coords.items():
+                h[f"/coords/{k}"] = c[1] if isinstance(c, tuple) else c
+            return out
+    finally:
+        if h is not None:
+            h.close()
+
+    dat = xarray.Dataset(coords={"time": found, **coords})
+    for k in var:
+        # Phi has no x1 dimension in a grid index slice
+        d = tuple(x for x in dims if x != "x1") if k == "Phi" and "x1" in coords else dims
+        shape = (len(found), *[dat.sizes[x] for x in d])
+        dat[k] = (("time", *d), np.array(data[k]).reshape(shape))
+
+    dat.attrs["filename"] = direc
 
     return dat
 
 
-def derive(dat, var: set[str], flag: int):
+def _init_worker(
+    cfg: dict[str, T.Any], xg: dict[str, T.Any], plan: dict[str, T.Any] | None = None
+) -> None:
+    _worker_state["cfg"] = cfg
+    _worker_state["xg"] = xg
+    _worker_state["plan"] = plan
+
+
+def _read_frame(direc: Path, time: datetime, **kwargs):
+    return frame(direc, time, cfg=_worker_state["cfg"], xg=_worker_state["xg"], **kwargs)
+
+
+def derive(dat, var: set[str], flag: int, dtype: str | None = None, workers: int = 1):
     """
     compute derived variables based on file data
 
@@ -147,6 +1018,11 @@ def derive(dat, var: set[str], flag: int):
 
     dat: xarray.DataSet
         data to derive from
+    dtype: str, optional
+        "native" (as read), "float32" or "float64" for the data variables.
+        Default is the global policy, see gemini3d.utils.set_dtype
+    workers: int, optional
+        threads computing ion averages v1, Ti, see ion_average()
 
     Returns
     -------
@@ -157,40 +1033,121 @@ def derive(dat, var: set[str], flag: int):
     lx = (dat.sizes["x1"], dat.sizes["x2"], dat.sizes["x3"])
 
     # %% Derived variables
+    # species arrays may hold only some species, so select by label
+    electrons = SPECIES[LSP - 1]
+
     if flag == 1:
-        if {"ne", "v1", "Ti"} & var:
-            dat["ne"] = (("x1", "x2", "x3"), dat["ns"][LSP - 1, :, :, :].data)
-            # np.any() in case neither is an np.ndarray
-            if dat["ns"].shape[0] != LSP or not np.array_equal(dat["ns"].shape[1:], lx):
+        if {"ne", "v1", "Ti"} & var and "ns" in dat:
+            if dat["ns"].shape[1:] != lx:
                 raise ValueError(
                     f"may have wrong permutation on read. lx: {lx}  ns x1,x2,x3: {dat['ns'].shape}"
                 )
-        if "v1" in var:
-            dat["v1"] = (
-                ("x1", "x2", "x3"),
-                (dat["ns"][:6, :, :, :] * dat["vs1"][:6, :, :, :]).sum(axis=0).data
-                / dat["ne"].data,
-            )
-        if "Ti" in var:
-            dat["Ti"] = (
-                ("x1", "x2", "x3"),
-                (dat["ns"][:6, :, :, :] * dat["Ts"][:6, :, :, :]).sum(axis=0).data
-                / dat["ne"].data,
-            )
-        if "Te" in var:
-            dat["Te"] = (("x1", "x2", "x3"), dat["Ts"][LSP - 1, :, :, :].data)
+            dat["ne"] = dat["ns"].sel(species=electrons, drop=True)
+        # one pass over ns for both
+        fields = {
+            k: dat[x] for k, x in (("v1", "vs1"), ("Ti", "Ts")) if k in var and x in dat
+        }
+        if fields:
+            avg = ion_average(dat["ns"], fields, workers=workers)
+            for k, a in avg.items():
+                dat[k] = (("x1", "x2", "x3"), a)
+        if "Te" in var and "Ts" in dat:
+            dat["Te"] = dat["Ts"].sel(species=electrons, drop=True)
 
         if "J1" in var:
             # np.any() in case neither is an np.ndarray
             if np.any(dat["J1"].shape != lx):
                 raise ValueError("J1 may have wrong permutation on read")
 
+    dt = get_dtype(dtype)
+    if dt is not None:
+        for k, v in dat.data_vars.items():
+            if v.dtype.kind == "f" and v.dtype != dt:
+                dat[k] = v.astype(dt)
+
     if "time" not in dat:
         dat = dat.assign_coords({"time": time(dat.filename)})
 
     return dat
 
 
+def ion_average(
+    ns: xarray.DataArray,
+    fields: dict[str, xarray.DataArray],
+    *,
+    workers: int = 1,
+) -> dict[str, np.ndarray]:
+    """
+    density-weighted average over ions of per-species fields, e.g. v1 from vs1
+    and Ti from Ts: sum(ns * field) / ne.
+
+    Computed slab by slab along the slowest varying grid axis into preallocated
+    outputs, reading each ns slab once for all fields, so besides the outputs
+    only a few slabs of SLAB_BYTES are allocated.
+
+    Parameters
+    ----------
+    ns: xarray.DataArray
+        (species, x1, x2, x3) densities, with ions and electrons
+    fields: dict of xarray.DataArray
+        output name => (species, x1, x2, x3) field to average
+    workers: int, optional
+        threads computing slabs in parallel; numpy releases the GIL
+
+    Returns
+    -------
+    avg: dict of numpy.ndarray
+        output name => (x1, x2, x3) average, in Fortran order
+    """
+
+    species = ns["species"].values.tolist()
+    ions = [species.index(s) for s in SPECIES[: LSP - 1]]
+    ie = species.index(SPECIES[LSP - 1])
+    n = ns.values
+
+    x = {}
+    for k, f in fields.items():
+        fs = f["species"].values.tolist()
+        x[k] = (f.values, [fs.index(s) for s in SPECIES[: LSP - 1]])
+
+    # slabs along the grid axis of largest stride, contiguous in storage
+    axis = 1 + int(np.argmax(n.strides[1:]))
+    m = n.shape[axis]
+    step = max(1, SLAB_BYTES // max(1, n[0].nbytes // m))
+
+    avg = {
+        k: np.empty(n.shape[1:], dtype=np.result_type(n, f), order="F")
+        for k, (f, _) in x.items()
+    }
+
+    def slab(j: int) -> None:
+        s = [slice(None)] * 3
+        s[axis - 1] = slice(j, min(j + step, m))
+        key = tuple(s)
+
+        acc = {k: np.zeros_like(a[key]) for k, a in avg.items()}
+        tmp = np.empty_like(next(iter(acc.values())))
+        for i, ion in enumerate(ions):
+            ni = n[ion][key]
+            for k, (f, fi) in x.items():
+                np.multiply(ni, f[fi[i]][key], out=tmp)
+                acc[k] += tmp
+        ne = n[ie][key]
+        for k, a in acc.items():
+            np.divide(a, ne, out=avg[k][key])
+
+    starts = range(0, m, step)
+    if workers > 1 and len(starts) > 1:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            # raise any failure
+            list(pool.map(slab, starts))
+    else:
+        for j in starts:
+            slab(j)
+
+    return avg
+
+
 def glow(fn: Path):
     """read GLOW data
 
@@ -240,6 +1197,106 @@ def precip(fn: Path):
     return h5read.precip(fn)
 
 
+def Efield_series(
+    direc: Path,
+    times: list[datetime] | None = None,
+    *,
+    workers: int | None = None,
+) -> xarray.Dataset:
+    """
+    open all E-field input files of a directory as one Dataset with a time dimension.
+    Coordinates are read once from simgrid.h5, and data only when indexed, e.g.
+
+        E = gemini3d.read.Efield_series(direc)
+        Exit = E["Exit"].sel(time=t).values
+
+    Parameters
+    ----------
+    direc: pathlib.Path
+        E-field input directory
+    times: list of datetime.datetime, optional
+        times to include, default is all files in direc
+    workers: int, optional
+        read all files now with this many processes instead of lazily
+
+    Returns
+    -------
+    dat: xarray.Dataset
+        electric field
+    """
+
+    return _input_series(direc, times, h5read.EFIELD_DATASETS, workers)
+
+
+def precip_series(
+    direc: Path,
+    times: list[datetime] | None = None,
+    *,
+    workers: int | None = None,
+) -> xarray.Dataset:
+    """
+    open all precipitation input files of a directory as one Dataset with a time dimension.
+    Coordinates are read once from simgrid.h5, and data only when indexed.
+
+    Parameters
+    ----------
+    direc: pathlib.Path
+        precipitation input directory
+    times: list of datetime.datetime, optional
+        times to include, default is all files in direc
+    workers: int, optional
+        read all files now with this many processes instead of lazily
+
+    Returns
+    -------
+    dat: xarray.Dataset
+        precipitation
+    """
+
+    return _input_series(direc, times, h5read.PRECIP_DATASETS, workers)
+
+
+def _input_series(
+    direc: Path,
+    times: list[datetime] | None,
+    names: dict[str, tuple[str, tuple[str, ...]]],
+    workers: int | None,
+) -> xarray.Dataset:
+    direc = Path(direc).expanduser()
+
+    if times is None:
+        times, files = find.frame_index(direc)
+    else:
+        files = []
+        found = []
+        for t in times:
+            try:
+                files.append(find.frame(direc, t))
+            except FileNotFoundError:
+                logging.warning(f"no input file at {t} in {direc}")
+                continue
+            found.append(t)
+        times = found
+
+    if not files:
+        raise FileNotFoundError(f"no input files found in {direc}")
+
+    with h5pool.open_file(direc / "simgrid.h5") as f:
+        coords = {"mlon": f["/mlon"][:], "mlat": f["/mlat"][:]}
+
+    dat = h5backend.open_inputs(files, times, names, coords)
+
+    if workers and workers > 1 and len(files) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            data = list(pool.map(h5read.input_datasets, files, itertools.repeat(names)))
+        for k in list(dat.data_vars):
+            dat[k] = (dat[k].dims, np.stack([d[str(k)] for d in data]))
+
+    dat.attrs["filename"] = direc
+
+    return dat
+
+
 def time(file: Path) -> datetime:
     """
     read simulation time of a file
@@ -0,0 +1,235 @@
+"""
+repack the per-time output frames of a simulation into one time-chunked HDF5 file,
+making time series of a point or region much faster to read than opening every frame file.
+
+gemini3d.read.frame, series, iter_frames and probe use the repacked file when present,
+unless a frame file is newer than it.
+
+    python -m gemini3d.repack path/to/sim
+"""
+
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import logging
+import time
+import os
+
+import numpy as np
+import h5py
+
+from . import find
+from . import read
+from .hdf5 import read as h5read
+from .hdf5 import pool
+from .hdf5 import cube as h5cube
+from .hdf5.cube import CUBE_NAME
+from .hdf5.write import CLVL
+
+CHUNK_BYTES = 2**20  # target uncompressed chunk size [bytes]
+CHUNK_TIMES = 8  # times per chunk
+
+
+def repack(direc: Path, out: Path | None = None, *, delete: bool = False) -> Path:
+    """
+    repack all frames of a simulation directory into one file.
+    One frame is in memory at a time.
+
+    If out already exists, its times are kept, except those with a newer frame file,
+    so frames written since an earlier repack (e.g. of a running simulation) are added.
+
+    Parameters
+    ----------
+    direc: pathlib.Path
+        simulation output directory
+    out: pathlib.Path, optional
+        file to write, default direc / CUBE_NAME, where readers look for it
+    delete: bool, optional
+        delete the frame files once repacked
+
+    Returns
+    -------
+    out: pathlib.Path
+        repacked file
+    """
+
+    direc = Path(direc).expanduser()
+
+    cfg = read.config(direc)
+
+    if out is None:
+        out = direc / CUBE_NAME
+    out = Path(out).expanduser()
+
+    packed = out.is_file()
+    mtime = out.stat().st_mtime_ns if packed else 0
+
+    sources: list[h5cube.Source] = []
+    for t in cfg["time"]:
+        try:
+            file: Path | None = find.frame(direc, t)
+        except FileNotFoundError:
+            file = None
+
+        it = h5cube.index(out, t) if packed else None
+        if it is not None and (file is None or file.stat().st_mtime_ns <= mtime):
+            sources.append((out, it))
+        elif file is not None:
+            sources.append(file)
+        else:
+            logging.warning(f"no frame at {t} in {direc}")
+
+    if not sources:
+        raise FileNotFoundError(f"no simulation output frames found in {direc}")
+
+    write(out, sources)
+
+    if delete:
+        for src in sources:
+            if not isinstance(src, tuple):
+                pool.evict(src)
+                src.unlink()
+
+    return out
+
+
+def write(out: Path, files: list[h5cube.Source]) -> None:
+    """
+    stream frame files into one file where each dataset has a leading time dimension.
+    The file is written under a temporary name and then renamed, so an interrupted
+    write leaves no partial file for readers to use.
+
+    Frames may have different datasets, e.g. milestone frames of a flagoutput=2 run
+    have the full state instead of the averages. Times of a dataset whose frame lacks
+    it are NaN, and "/time/has/<dataset>" records which times have it.
+
+    Parameters
+    ----------
+    out: pathlib.Path
+        file to write
+    files: list of pathlib.Path or (pathlib.Path, int)
+        frame files, or (cube file, time index) e.g. of out, in time order
+    """
+
+    Nt = len(files)
+
+    # dataset name => times having it
+    names: dict[str, list[int]] = {}
+    for it, file in enumerate(files):
+        with h5cube.open_source(file) as f:
+            for n in _datasets(f):
+                names.setdefault(n, []).append(it)
+
+    tmp = out.with_suffix(".tmp")
+    try:
+        with h5py.File(tmp, "w") as h:
+            ymd = h.create_dataset("/time/ymd", (Nt, 3), dtype=np.int32)
+            UTsec = h.create_dataset("/time/UTsec", (Nt,), dtype=np.float64)
+
+            for n, its in names.items():
+                if len(its) < Nt:
+                    has = np.zeros(Nt, dtype=bool)
+                    has[its] = True
+                    h.create_dataset(f"/time/has/{n}", data=has)
+
+            for it, file in enumerate(files):
+                logging.info(f"{file} => {out}")
+                with h5cube.open_source(file) as f:
+                    t = h5read.time(f)
+                    ymd[it] = (t.year, t.month, t.day)
+                    UTsec[it] = (
+                        t.hour * 3600 + t.minute * 60 + t.second + t.microsecond / 1e6
+                    )
+
+                    for n in _datasets(f):
+                        if n not in h:
+                            _create(h, n, f[n], Nt)
+                        elif h[n].shape[1:] != f[n].shape:
+                            raise ValueError(
+                                f"{file}: {n} shape {f[n].shape} != {h[n].shape[1:]} of other frames"
+                            )
+                        h[n][it] = f[n][()]
+
+        pool.evict(out)
+        os.replace(tmp, out)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _datasets(f: h5py.File | h5cube.CubeFrame) -> list[str]:
+    """names of all datasets in a frame file, or a time of a cube file, except time"""
+
+    if isinstance(f, h5cube.CubeFrame):
+        return [n for n in _datasets(f.file) if h5cube.has(f.file, n, f.it)]
+
+    names: list[str] = []
+
+    def visit(name: str, obj) -> None:
+        if isinstance(obj, h5py.Dataset) and not name.startswith("time/"):
+            names.append(name)
+
+    f.visititems(visit)
+
+    return names
+
+
+def _create(h: h5py.File, name: str, d: h5py.Dataset, Nt: int) -> None:
+    """
+    time-dimensioned dataset of frame dataset d; scalars are not chunked.
+    Float data is NaN at times not written.
+    """
+
+    fill = np.nan if d.dtype.kind in "fc" else None
+
+    if not d.shape:
+        h.create_dataset(name, shape=(Nt,), dtype=d.dtype, fillvalue=fill)
+        return
+
+    h.create_dataset(
+        name,
+        shape=(Nt, *d.shape),
+        dtype=d.dtype,
+        chunks=chunks(d.shape, Nt, d.dtype.itemsize),
+        compression="gzip",
+        compression_opts=CLVL,
+        shuffle=True,
+        fillvalue=fill,
+    )
+
+
+def chunks(shape: tuple[int, ...], Nt: int, itemsize: int) -> tuple[int, ...]:
+    """
+    chunk shape of CHUNK_TIMES times, halving the largest frame dimension
+    until the chunk is at most CHUNK_BYTES
+    """
+
+    c = [min(Nt, CHUNK_TIMES), *shape]
+    while np.prod(c) * itemsize > CHUNK_BYTES and max(c[1:]) > 1:
+        i = 1 + int(np.argmax(c[1:]))
+        c[i] = (c[i] + 1) // 2
+
+    return tuple(c)
+
+
+def cli():
+    p = argparse.ArgumentParser(
+        description="repack simulation output frames into one file"
+    )
+    p.add_argument("direc", help="simulation output directory")
+    p.add_argument("-o", "--out", help=f"output file (default: direc/{CUBE_NAME})")
+    p.add_argument(
+        "--delete", help="delete frame files after repacking", action="store_true"
+    )
+    p.add_argument("-v", "--verbose", action="store_true")
+    P = p.parse_args()
+
+    level = logging.DEBUG if P.verbose else logging.WARNING
+    logging.basicConfig(format="%(message)s", level=level)
+
+    tic = time.monotonic()
+    out = repack(P.direc, P.out, delete=P.delete)
+    print(f"repacked {P.direc} => {out} in {time.monotonic() - tic:.3f} seconds.")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,194 @@
+"""
+share a simulation grid between processes without each holding a copy.
+
+SharedGrid copies the grid arrays once into one shared memory block, or a
+memory-mapped file e.g. where /dev/shm is small. Pickling it, as when passing it to
+ProcessPoolExecutor workers, sends only the block name and array layout:
+each worker maps the block and gets read-only numpy views of the same memory.
+
+    import gemini3d.read
+    from gemini3d.shared import SharedGrid
+
+    with SharedGrid(gemini3d.read.grid(direc)) as xg:
+        with concurrent.futures.ProcessPoolExecutor() as pool:
+            pool.map(work, itertools.repeat(xg), times)
+"""
+
+from __future__ import annotations
+from pathlib import Path
+import typing as T
+import sys
+import mmap
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .hdf5.read import Grid
+
+ALIGN = 64  # array offsets in the block [bytes]
+
+# variable => (offset, shape, dtype, memory order)
+Layout = T.Dict[str, T.Tuple[int, T.Tuple[int, ...], str, str]]
+
+# block name => bytes of the block mapped in this process, while any view of it exists
+_blocks: weakref.WeakValueDictionary[str, np.ndarray] = weakref.WeakValueDictionary()
+
+
+class SharedGrid(dict):
+    """
+    grid whose numeric arrays are read-only views of one block shared between processes.
+    Other values, e.g. "filename", are copied as usual when pickled.
+
+    Parameters
+    ----------
+    xg: dict
+        simulation grid, e.g. from gemini3d.read.grid
+    file: pathlib.Path, optional
+        memory-map this file as the block instead of shared memory
+
+    The process creating it removes the block by close(), or on leaving a with block.
+    The memory is freed once no process has views of it.
+    """
+
+    def __init__(self, xg: T.Mapping[str, T.Any], file: Path | None = None):
+        super().__init__()
+
+        # arrays of a lazy grid not read yet are streamed from its file into the block
+        # one by one, so the whole grid is never in memory besides the block
+        lazy = xg if isinstance(xg, Grid) else None
+
+        data: dict[str, T.Any] = {}
+        layout: Layout = {}
+        size = 0
+        for k in xg:
+            spec = lazy.spec(k) if lazy is not None else None
+            if spec is not None:
+                shape, dtype = spec
+                layout[k] = (size, shape, dtype.str, "F")
+                size += -(-int(np.prod(shape)) * dtype.itemsize // ALIGN) * ALIGN
+                continue
+
+            v = data[k] = xg[k]
+            if isinstance(v, np.ndarray) and v.dtype.kind in "biufc" and v.size > 1:
+                order = "F" if v.flags.f_contiguous and not v.flags.c_contiguous else "C"
+                layout[k] = (size, v.shape, v.dtype.str, order)
+                size += -(-v.nbytes // ALIGN) * ALIGN
+        size = max(size, 1)
+
+        self._shm: shared_memory.SharedMemory | None = None
+        if file is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+            self._name = self._shm.name
+            block = _map(self._shm)
+        else:
+            file = Path(file).expanduser()
+            with file.open("w+b") as f:
+                f.truncate(size)
+                block = np.frombuffer(mmap.mmap(f.fileno(), 0), dtype=np.uint8)
+            self._name = str(file)
+
+        self._file = file is not None
+        self._layout = layout
+        self._owner = True
+
+        _blocks[self._name] = block
+
+        for k in xg:
+            if k in layout:
+                a = _view(block, *layout[k])
+                if k in data:
+                    a[...] = data.pop(k)
+                else:
+                    T.cast(Grid, lazy).read_into(k, a)
+                a.flags.writeable = False
+                v = a
+            else:
+                v = data[k]
+            dict.__setitem__(self, k, v)
+
+    def __reduce__(self):
+        other = {k: v for k, v in self.items() if k not in self._layout}
+        return (_attach, (self._name, self._file, self._layout, other))
+
+    def __enter__(self) -> SharedGrid:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        drop the views, and in the process that created the block, remove its name
+        so no more processes can attach.
+        Views already made, here or in other processes, stay valid until released.
+        """
+
+        self.clear()
+
+        if not self._owner:
+            return
+        self._owner = False
+
+        if self._shm is not None:
+            self._shm.unlink()
+        else:
+            Path(self._name).unlink(missing_ok=True)
+
+
+def _map(shm: shared_memory.SharedMemory) -> np.ndarray:
+    """
+    bytes of shm. shm is closed once the last view of them is released,
+    as closing it before would leave the views dangling.
+    """
+
+    assert shm.buf is not None, f"shared memory {shm.name} is closed"
+    block = np.frombuffer(shm.buf, dtype=np.uint8)
+    # views of block keep its base, the buffer taken from shm, alive, not block itself
+    weakref.finalize(block.base, shm.close).atexit = False
+
+    return block
+
+
+def _view(
+    block: np.ndarray, offset: int, shape: tuple[int, ...], dtype: str, order: str
+) -> np.ndarray:
+    n = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return (
+        block[offset : offset + n]
+        .view(dtype)
+        .reshape(shape, order="F" if order == "F" else "C")
+    )
+
+
+def _attach(name: str, file: bool, layout: Layout, other: dict[str, T.Any]) -> SharedGrid:
+    """map a block created by another process, or reuse its mapping in this one"""
+
+    block = _blocks.get(name)
+    if block is None:
+        if file:
+            with open(name, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            block = np.frombuffer(mm, dtype=np.uint8)
+        elif sys.version_info >= (3, 13):
+            # only the creating process removes the block
+            block = _map(shared_memory.SharedMemory(name=name, track=False))
+        else:
+            block = _map(shared_memory.SharedMemory(name=name))
+        _blocks[name] = block
+
+    xg = SharedGrid.__new__(SharedGrid)
+    xg._shm = None
+    xg._name = name
+    xg._file = file
+    xg._layout = layout
+    xg._owner = False
+
+    for k, v in other.items():
+        dict.__setitem__(xg, k, v)
+    for k, lay in layout.items():
+        a = _view(block, *lay)
+        a.flags.writeable = False
+        dict.__setitem__(xg, k, a)
+
+    return xg
@@ -1,14 +1,139 @@
 from __future__ import annotations
 from pathlib import Path
+from datetime import datetime, timedelta
+import typing as T
 
+import numpy as np
+import h5py
 import pytest
 
+from gemini3d import LSP
+from gemini3d import namelist
+from gemini3d.hdf5 import write as h5write
+from gemini3d.grid.convert import Re
+from gemini3d.utils import datetime2stem
+
 
 class Helpers:
     @staticmethod
     def get_test_datadir() -> Path:
         return Path(__file__).parent / "data"
 
+    @staticmethod
+    def synthetic_run(
+        path: Path,
+        lx: tuple[int, int, int] = (8, 6, 4),
+        Nt: int = 3,
+        flagoutput: int = 1,
+        milestones: tuple[int, ...] = (),
+    ) -> Path:
+        """
+        write a small Cartesian simulation output directory without running Gemini3D.
+        Values are deterministic functions of (time index, species, x1, x2, x3)
+        so readers can be checked against numpy slicing.
+        Frames of time indices in milestones are full (flagoutput=1) output.
+        """
+
+        t0 = datetime(2013, 2, 20, 5)
+        dtout = 60.0
+
+        cfg = path / "inputs/config.nml"
+        cfg.parent.mkdir(parents=True, exist_ok=True)
+        namelist.write(
+            cfg,
+            "base",
+            {
+                "ymd": [t0.year, t0.month, t0.day],
+                "UTsec0": t0.hour * 3600.0,
+                "tdur": dtout * (Nt - 1),
+                "dtout": dtout,
+                "activ": [108.9, 111.0, 5],
+                "tcfl": 0.9,
+                "Teinf": 1500.0,
+            },
+        )
+        namelist.write(cfg, "flags", {"flagoutput": flagoutput, "potsolve": 1})
+        namelist.write(
+            cfg,
+            "files",
+            {
+                "indat_size": "inputs/simsize.h5",
+                "indat_grid": "inputs/simgrid.h5",
+                "indat_file": "inputs/initial_conditions.h5",
+            },
+        )
+
+        xg: dict[str, T.Any] = {"lx": np.array(lx)}
+        for i, n in enumerate(lx):
+            xg[f"x{i+1}"] = np.arange(-2, n + 2) * 10e3 + 80e3 * (i == 0)
+        x1 = xg["x1"][2:-2]
+        xg["alt"] = np.broadcast_to(x1[:, None, None], lx).copy()
+        xg["h1"] = np.ones([n + 4 for n in lx])
+        # Cartesian: x2 east, x3 north of the grid center at x2 = x3 = 0
+        xg["glatctr"] = 65.0
+        xg["glonctr"] = -147.0
+        x2, x3 = np.meshgrid(xg["x2"][2:-2], xg["x3"][2:-2], indexing="ij")
+        xg["glat"] = np.broadcast_to(65.0 + np.degrees(x3 / Re), lx).copy()
+        xg["glon"] = np.broadcast_to(
+            -147.0 + np.degrees(x2 / (Re * np.cos(np.radians(65.0)))), lx
+        ).copy()
+        h5write.grid(path / "inputs/simsize.h5", path / "inputs/simgrid.h5", xg)
+
+        for it in range(Nt):
+            t = t0 + timedelta(seconds=dtout * it)
+            with h5py.File(path / (datetime2stem(t) + ".h5"), "w") as f:
+                h5write.write_time(f, t)
+                flag = 1 if it in milestones else flagoutput
+                for name, arr in Helpers.synthetic_frame(lx, it, flag).items():
+                    # disk is Fortran order (x1, x2, x3, species), h5py is C order
+                    p = (0, 3, 2, 1) if arr.ndim == 4 else None
+                    f[name] = arr.transpose(p).astype(np.float32)
+
+        return path
+
+    @staticmethod
+    def synthetic_frame(
+        lx: tuple[int, int, int], it: int, flagoutput: int = 1
+    ) -> dict[str, np.ndarray]:
+        """C-order (species, x1, x2, x3) values as written by synthetic_run()"""
+
+        i1, i2, i3 = np.meshgrid(*[np.arange(n) for n in lx], indexing="ij")
+        base = 1 + i1 + 10 * i2 + 100 * i3 + 1000 * it
+
+        if flagoutput == 1:
+            isp = np.arange(LSP)[:, None, None, None]
+            dat = {
+                "nsall": 1e9 * (isp + 1) * base,
+                "vs1all": (isp - 3) * base,
+                "Tsall": 1000 + isp * 10 + base,
+            }
+            for k in ("J1", "J2", "J3"):
+                dat[f"{k}all"] = 1e-6 * base
+            for k in ("v2", "v3"):
+                dat[f"{k}avgall"] = -base
+        elif flagoutput == 2:
+            dat = {}
+            for k in (
+                "neall",
+                "v1avgall",
+                "Tavgall",
+                "TEall",
+                "J1all",
+                "J2all",
+                "J3all",
+                "v2avgall",
+                "v3avgall",
+            ):
+                dat[k] = 1.0 * base
+        elif flagoutput == 3:
+            dat = {"ne": 1e9 * base}
+        else:
+            raise ValueError(f"unknown flagoutput {flagoutput}")
+
+        dat["Phiall"] = 1.0 * base[0]
+
+        return dat
+
 
 @pytest.fixture
 def helpers():
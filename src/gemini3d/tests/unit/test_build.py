@@ -0,0 +1,147 @@
+"""
+incremental setup build graph
+"""
+
+import numpy as np
+import pytest
+
+from gemini3d import build
+
+
+def stages():
+    return {
+        "b": {"deps": ("a",), "config": ("y", "z*"), "outputs": ("fb",)},
+        "a": {
+            "deps": (),
+            "config": ("x",),
+            "inputs": lambda cfg: [cfg["src"]],
+            "outputs": ("fa",),
+        },
+    }
+
+
+def make(cfg, names):
+    for n in names:
+        cfg[f"f{n}"].write_text(n)
+
+
+def test_build(tmp_path):
+    src = tmp_path / "src.txt"
+    src.write_text("0")
+    cfg = {
+        "out_dir": tmp_path,
+        "x": 1,
+        "y": [1.0, 2.0],
+        "z_foo": "bar",
+        "src": src,
+        "fa": tmp_path / "a.txt",
+        "fb": tmp_path / "b.txt",
+    }
+
+    assert build.order(stages()) == ["a", "b"]
+
+    def rebuild():
+        keys, stale = build.plan(cfg, stages())
+        make(cfg, stale)
+        for n in stale:
+            build.record(cfg, stages(), n, keys)
+        return stale
+
+    assert rebuild() == ["a", "b"]
+    assert rebuild() == []
+    assert build.load(tmp_path)["stages"].keys() == {"a", "b"}
+
+    # unrelated config
+    cfg["w"] = 3
+    assert rebuild() == []
+
+    cfg["z_foo"] = "baz"
+    assert rebuild() == ["b"]
+
+    # upstream config and input files
+    cfg["x"] = 2
+    assert rebuild() == ["a", "b"]
+    src.write_text("1")
+    assert rebuild() == ["a", "b"]
+
+    # missing or modified output
+    cfg["fa"].unlink()
+    assert rebuild() == ["a"]
+    cfg["fb"].write_text("modified")
+    assert rebuild() == ["b"]
+
+    assert build.plan(cfg, stages(), force=True)[1] == ["a", "b"]
+
+
+def test_build_errors(tmp_path):
+    cfg = {"out_dir": tmp_path, "fa": tmp_path / "a.txt"}
+    s = {"a": {"deps": (), "config": (), "outputs": ("fa",)}}
+
+    keys, stale = build.plan(cfg, s)
+    with pytest.raises(FileNotFoundError):
+        build.record(cfg, s, "a", keys)
+
+    s["a"]["deps"] = ("b",)
+    s["b"] = {"deps": ("a",), "config": (), "outputs": ()}
+    with pytest.raises(ValueError):
+        build.order(s)
+
+
+def _write(cfg, xg, name):
+    # stage "c" comes after "a", reading its output
+    prev = cfg["fa"].read_text() if name == "c" else ""
+    cfg[f"f{name}"].write_text(f"{prev}{name}{xg['alt'].sum()}")
+
+
+def _a(cfg, xg):
+    _write(cfg, xg, "a")
+
+
+def _b(cfg, xg):
+    _write(cfg, xg, "b")
+
+
+def _c(cfg, xg):
+    _write(cfg, xg, "c")
+
+
+def _fail(cfg, xg):
+    raise ValueError("bad stage")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run(workers, tmp_path):
+    cfg = {"out_dir": tmp_path, **{f"f{n}": tmp_path / f"{n}.txt" for n in "abc"}}
+    s = {
+        "a": {"deps": (), "config": (), "outputs": ("fa",), "build": _a},
+        "b": {"deps": ("a",), "after": (), "config": (), "outputs": ("fb",), "build": _b},
+        "c": {"deps": ("a",), "config": (), "outputs": ("fc",), "build": _c},
+    }
+    xg = {"alt": np.arange(10.0), "filename": "grid.h5"}
+
+    keys, stale = build.plan(cfg, s)
+    build.run(cfg, s, keys, stale, xg, workers=workers)
+
+    assert cfg["fb"].read_text() == "b45.0"
+    assert cfg["fc"].read_text() == "a45.0c45.0"
+    assert build.plan(cfg, s)[1] == []
+
+    # a failed stage is raised, stages independent of it are still built and recorded
+    cfg["fb"].unlink()
+    cfg["fc"].unlink()
+    s["b"]["build"] = _fail
+    keys, stale = build.plan(cfg, s)
+    assert stale == ["b", "c"]
+    with pytest.raises(ValueError, match="bad stage"):
+        build.run(cfg, s, keys, stale, xg, workers=workers)
+    assert build.plan(cfg, s)[1] == ["b"]
+
+    # stages after a failed stage are not built
+    s["a"]["build"] = _fail
+    s["b"]["build"] = _b
+    keys, stale = build.plan(cfg, s, force=True)
+    cfg["fc"].unlink()
+    with pytest.raises(ValueError, match="bad stage"):
+        build.run(cfg, s, keys, stale, xg, workers=workers)
+    assert not cfg["fc"].is_file()
+    assert cfg["fb"].read_text() == "b45.0"
@@ -0,0 +1,58 @@
+"""
+run catalog of synthetic simulation output
+"""
+
+import numpy as np
+from pytest import approx
+
+from gemini3d import catalog, find
+import gemini3d.read as read
+
+
+def test_catalog(tmp_path, helpers):
+    direc = helpers.synthetic_run(tmp_path, Nt=3)
+    t = read.config(direc)["time"]
+
+    # a frame not yet written
+    last = find.frame(direc, t[2])
+    hold = last.rename(direc / "inputs" / last.name)
+
+    cat = catalog.build(direc, workers=2)
+    assert catalog.load(direc) == cat
+    assert catalog.times(cat) == t[:2]
+
+    e = cat["frames"][1]
+    assert e["file"] == find.frame(direc, t[1]).name
+    assert e["flagoutput"] == 1
+    dat = read.frame(direc, t[1])
+    assert set(e["vars"]) == set(dat.data_vars)
+    ne = dat["ne"].values
+    assert e["vars"]["ne"]["shape"] == list(ne.shape)
+    assert e["vars"]["ne"]["max"] == approx(ne.max())
+    assert e["vars"]["ne"]["mean"] == approx(ne.mean(dtype=np.float64))
+    assert e["vars"]["ne"]["nan"] == 0
+
+    lim = catalog.limits(cat)
+    assert lim["Te"][1] == approx(
+        max(read.frame(direc, s)["Te"].values.max() for s in t[:2])
+    )
+
+    # only new or changed frames are scanned again
+    scanned = []
+    scan = catalog._scan
+
+    def count(direc, time):
+        scanned.append(time)
+        return scan(direc, time)
+
+    catalog._scan = count
+    try:
+        hold.rename(last)
+        cat2 = catalog.build(direc, workers=1)
+    finally:
+        catalog._scan = scan
+
+    assert scanned == [t[2]]
+    assert cat2["frames"][:2] == cat["frames"]
+    assert catalog.missing(cat2, cat) == [t[2]]
+    assert not catalog.missing(cat, cat2)
@@ -1,6 +1,8 @@
 import pytest
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
+import json
+import os
 
 import gemini3d
 import gemini3d.find as find
@@ -68,3 +70,62 @@ def test_frame(name, tmp_path):
 
     fn = find.frame(test_dir, t)
     assert fn.name == "20130220_18000.000000.h5"
+
+
+def test_frame_index(tmp_path, helpers, monkeypatch):
+    monkeypatch.setenv("GEMINI_FRAME_INDEX", "1")
+
+    direc = helpers.synthetic_run(tmp_path, Nt=3)
+    t0 = datetime(2013, 2, 20, 5)
+
+    times, files = find.frame_index(direc)
+    assert times == [t0 + timedelta(seconds=60 * i) for i in range(3)]
+    assert [f.name for f in files] == sorted(f.name for f in direc.glob("2013*.h5"))
+    assert (direc / find.FRAME_INDEX_NAME).is_file()
+
+    # real32 file tick tolerance
+    assert find.frame(direc, times[1] + timedelta(milliseconds=300)) == files[1]
+    with pytest.raises(FileNotFoundError):
+        find.frame(direc, times[1] + timedelta(seconds=10))
+
+    # on-disk index is used when the in-memory index is gone
+    find._frame_index.clear()
+    assert find.frame_index(direc) == (times, files)
+
+    # new file invalidates index
+    new = direc / "20130220_18180.000000.h5"
+    new.touch()
+    assert find.frame(direc, t0 + timedelta(seconds=180.2)) == new
+
+
+def test_frame_index_miss(tmp_path, helpers, monkeypatch):
+    monkeypatch.setenv("GEMINI_FRAME_INDEX", "1")
+
+    direc = helpers.synthetic_run(tmp_path, Nt=3)
+    find.frame_index(direc)
+    # last modified well before the lookups
+    ns = direc.stat().st_mtime_ns - 10**10
+    os.utime(direc, ns=(ns, ns))
+    times, files = find.frame_index(direc)
+    index = json.loads((direc / find.FRAME_INDEX_NAME).read_text())
+
+    scans = []
+    scandir = os.scandir
+
+    def counted(path):
+        scans.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counted)
+
+    # misses do not rescan an index listed after the directory was modified
+    for i in range(10):
+        with pytest.raises(FileNotFoundError):
+            find.frame(direc, times[-1] + timedelta(seconds=60 * (i + 1)))
+    assert not scans
+    assert json.loads((direc / find.FRAME_INDEX_NAME).read_text()) == index
+
+    # a file created since is found
+    new = direc / "20130220_18180.000000.h5"
+    new.touch()
+    assert find.frame(direc, times[-1] + timedelta(seconds=60)) == new
@@ -0,0 +1,157 @@
+"""
+legacy raw .dat reader and converter, on small files written like Gemini3D did
+"""
+
+from datetime import datetime, timedelta
+import typing as T
+import os
+
+import numpy as np
+import pytest
+from pytest import approx
+
+from gemini3d import LSP
+import gemini3d.namelist as namelist
+import gemini3d.read as read
+import gemini3d.raw.read as raw_read
+import gemini3d.raw.convert as raw_convert
+from gemini3d.utils import datetime2stem
+
+LX = (5, 4, 3)
+
+
+def write_raw(path, *arrays):
+    with path.open("wb") as f:
+        for a in arrays:
+            np.asarray(a, dtype=np.float64).ravel(order="F").tofile(f)
+
+
+def raw_run(path, Nt: int = 1) -> dict:
+    """write simsize, simgrid and Nt flagoutput=1 frames; returns the arrays written"""
+
+    lx = LX
+    (path / "simsize.dat").write_bytes(np.array(lx, dtype=np.uint32).tobytes())
+
+    rng = np.random.default_rng(0)
+    # file order: x1, x1i, dx1b, dx1h, x2, ...
+    grid = [np.sort(rng.random(n + k)) for n in lx for k in (4, 1, 3, 0)]
+    h = [rng.random([n + 4 for n in lx]) for _ in range(3)]
+    hi = [
+        rng.random([n + (a == i) for a, n in enumerate(lx)])
+        for i in range(3)
+        for _ in range(3)
+    ]
+    rest = [rng.random(lx) for _ in range(7)] + [rng.random(lx[1:]), rng.random(lx)]
+    write_raw(path / "simgrid.dat", *grid, *h, *hi, *rest)
+
+    t0 = datetime(2013, 2, 20, 5, 30)
+    frames = []
+    for it in range(Nt):
+        t = t0 + timedelta(minutes=it)
+        d: dict[str, T.Any] = {
+            "time": t,
+            "ns": rng.random((*lx, LSP)) + 1,
+            "vs1": rng.random((*lx, LSP)),
+            "Ts": rng.random((*lx, LSP)),
+            "J": [rng.random(lx) for _ in range(5)],
+            "Phi": rng.random(lx[1:]),
+        }
+        UThour = t.hour + t.minute / 60
+        write_raw(
+            path / (datetime2stem(t) + ".dat"),
+            [t.year, t.month, t.day, UThour],
+            d["ns"],
+            d["vs1"],
+            d["Ts"],
+            *d["J"],
+            d["Phi"],
+        )
+        frames.append(d)
+
+    namelist.write(
+        path / "config.nml",
+        "base",
+        {
+            "ymd": [t0.year, t0.month, t0.day],
+            "UTsec0": t0.hour * 3600.0 + t0.minute * 60,
+            "tdur": 60.0 * (Nt - 1),
+            "dtout": 60.0,
+            "activ": [108.9, 111.0, 5],
+            "tcfl": 0.9,
+            "Teinf": 1500.0,
+        },
+    )
+    namelist.write(path / "config.nml", "flags", {"flagoutput": 1, "potsolve": 1})
+
+    return {"grid": grid, "h": h, "hi": hi, "rest": rest, "frames": frames}
+
+
+def test_raw_frame(tmp_path):
+    ref = raw_run(tmp_path)
+
+    xg = raw_read.grid(tmp_path)
+    assert xg["x2"] == approx(ref["grid"][4])
+    assert xg["h3"] == approx(ref["h"][2])
+    assert xg["h1x2i"].shape == (5, 5, 3)
+    assert xg["h1x2i"] == approx(ref["hi"][3])
+    assert xg["glat"] == approx(ref["rest"][4])
+    assert xg["Bincl"] == approx(ref["rest"][7])
+    assert isinstance(xg["alt"].base, np.memmap)
+
+    d = ref["frames"][0]
+    ns, Ts = d["ns"], d["Ts"]
+    file = tmp_path / (datetime2stem(d["time"]) + ".dat")
+    dat = raw_read.data(file, {"flagoutput": 1}, xg=xg)
+
+    assert dat.time == np.datetime64(d["time"])
+    assert dat["ne"].values == approx(ns[..., -1])
+    assert dat["Te"].values == approx(Ts[..., -1])
+    assert dat["Ti"].values == approx(
+        (ns[..., :6] * Ts[..., :6]).sum(axis=3) / ns[..., -1]
+    )
+    assert dat["J3"].values == approx(d["J"][2])
+    assert dat["v3"].values == approx(d["J"][4])
+    assert dat["Phitop"].values == approx(d["Phi"])
+
+    # only requested derived variables are computed
+    dat = raw_read.data(file, {"flagoutput": 1}, xg=xg, var={"ne", "Te"})
+    assert "v1" not in dat and "Ti" not in dat
+
+
+def test_convert(tmp_path, monkeypatch):
+    indir = tmp_path / "raw"
+    indir.mkdir()
+    ref = raw_run(indir, Nt=3)
+    outdir = tmp_path / "h5"
+
+    files = raw_convert.data(indir, outdir, workers=2, clvl=1)
+    assert len(files) == 3
+    assert not list(outdir.glob("*.tmp"))
+
+    cfg = read.config(indir)
+    xg = {k: np.array(v) for k, v in raw_read.grid(indir).items()}
+    for file, d in zip(files, ref["frames"]):
+        dat = read.frame(file, cfg=cfg, xg=xg)
+        assert dat["ne"].values == approx(d["ns"][..., -1], rel=1e-6)
+        assert dat["J2"].values == approx(d["J"][1], rel=1e-6)
+        assert dat["Phitop"].values == approx(d["Phi"], rel=1e-6)
+
+    # rerun converts only the raw file that changed
+    mtimes = [f.stat().st_mtime_ns for f in files]
+    os.utime(indir / files[1].with_suffix(".dat").name)
+    raw_convert.data(indir, outdir, workers=1)
+    assert files[0].stat().st_mtime_ns == mtimes[0]
+    assert files[2].stat().st_mtime_ns == mtimes[2]
+    assert raw_convert.converted(indir / files[1].with_suffix(".dat").name, files[1])
+
+    # a failed write leaves no temporary file, and the previous output
+    def fail(fn, *args, **kwargs):
+        fn.write_bytes(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(raw_convert.h5write, "frame", fail)
+    os.utime(indir / files[1].with_suffix(".dat").name, ns=(10**18, 10**18))
+    with pytest.raises(OSError, match="disk full"):
+        raw_convert.data(indir, outdir, workers=1)
+    assert not list(outdir.glob("*.tmp"))
+    assert files[1].is_file()
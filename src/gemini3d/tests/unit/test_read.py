@@ -0,0 +1,535 @@
+"""
+read simulation output from small synthetic runs written by the test helpers
+"""
+
+from datetime import datetime, timedelta
+import os
+import pickle
+
+import numpy as np
+import pytest
+from pytest import approx
+import xarray
+import h5py
+
+from gemini3d import SPECIES, find
+import gemini3d.read as read
+from gemini3d.hdf5 import pool
+from gemini3d.hdf5 import write as h5write
+from gemini3d.hdf5.cube import CUBE_NAME
+from gemini3d.repack import repack
+from gemini3d.utils import to_datetime, set_dtype
+
+
+@pytest.mark.parametrize("flag", [1, 2, 3])
+def test_series(flag, tmp_path, helpers):
+    lx = (8, 6, 4)
+    direc = helpers.synthetic_run(tmp_path, lx=lx, Nt=3, flagoutput=flag)
+
+    ds = read.series(direc)
+
+    assert ds.sizes["time"] == 3
+    assert ds["ne"].shape == (3, *lx)
+
+    for t in ds.time:
+        dat = read.frame(direc, to_datetime(t))
+        for k in ds.data_vars:
+            assert ds[k].sel(time=t).values == approx(dat[k].values, rel=1e-6), k
+
+    ref = read.frame(direc, to_datetime(ds.time[1]), var="ne")
+    sub = ds["ne"].isel(time=1, x1=slice(2, 5), x3=-1)
+    assert sub.values == approx(ref["ne"][2:5, :, -1].values)
+
+    # data is kept in Fortran storage order rather than copied to C order
+    assert ref["ne"].values.flags.f_contiguous
+    assert ds["ne"].isel(time=1).values.flags.f_contiguous
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_series_milestone(packed, tmp_path, helpers):
+    # flagoutput=2 run with full milestone frames at time indices 0 and 2
+    direc = helpers.synthetic_run(tmp_path, Nt=5, flagoutput=2, milestones=(0, 2))
+    frames = [read.frame(direc, t) for t in read.config(direc)["time"]]
+    if packed:
+        repack(direc, delete=True)
+
+    ds = read.series(direc)
+    assert ds.attrs["flagoutput"] == 2
+    assert set(ds.data_vars) == {
+        "ne",
+        "Ti",
+        "Te",
+        "v1",
+        "v2",
+        "v3",
+        "J1",
+        "J2",
+        "J3",
+        "Phitop",
+    }
+
+    for i, dat in enumerate(frames):
+        for k in ds.data_vars:
+            assert ds[k].isel(time=i).values == approx(dat[k].values, rel=1e-6), k
+
+    ne = read.series(direc, var={"ne"})["ne"]
+    assert ne.values == approx(np.stack([f["ne"].values for f in frames]), rel=1e-6)
+    assert ne.isel(time=slice(1, 4), x1=3, x3=-1).values == approx(
+        np.stack([f["ne"].values[3, :, -1] for f in frames[1:4]]), rel=1e-6
+    )
+
+
+def test_series_engine(tmp_path, helpers):
+    direc = helpers.synthetic_run(tmp_path)
+
+    ds = xarray.open_dataset(direc, engine="gemini3d", var={"Te", "ns"})
+
+    assert set(ds.data_vars) == {"Te", "ns"}
+    assert ds["ns"].dims == ("time", "species", "x1", "x2", "x3")
+
+    ref = helpers.synthetic_frame((8, 6, 4), 2)
+    assert ds["ns"].isel(time=2, species=[0, 6]).values == approx(ref["nsall"][[0, 6]])
+    assert ds["Te"].isel(time=2).values == approx(ref["Tsall"][-1])
+
+
+def test_frame_region(tmp_path, helpers):
+    lx = (8, 6, 4)
+    direc = helpers.synthetic_run(tmp_path, lx=lx)
+    t = read.config(direc)["time"][1]
+
+    full = read.frame(direc, t)
+
+    # index slice, index and coordinate interval
+    xg = read.grid(direc)
+    dat = read.frame(direc, t, x1=slice(2, 6), x2=(xg["x2"][3], xg["x2"][5]), x3=-1)
+    assert dat["ne"].shape == (4, 3, 1)
+    assert dat["ne"].values == approx(full["ne"][2:6, 1:4, -1:].values)
+    assert dat["Ti"].values == approx(full["Ti"][2:6, 1:4, -1:].values)
+    assert dat["Phitop"].values == approx(full["Phitop"][1:4, -1:].values)
+    assert dat.x2.values == approx(full.x2[1:4].values)
+
+    # physical units
+    dat = read.frame(direc, t, var="Te", alt=(95e3, 125e3))
+    assert dat.x1.values == approx([100e3, 110e3, 120e3])
+    assert dat["Te"].values == approx(full["Te"][2:5].values)
+
+    with pytest.raises(ValueError):
+        read.frame(direc, t, alt=(1e6, 2e6))
+
+
+def test_handle_pool(tmp_path, helpers):
+    direc = helpers.synthetic_run(tmp_path, Nt=2)
+    t = read.config(direc)["time"]
+
+    pool.configure(maxsize=3)
+    try:
+        ref = read.frame(direc, t[0], var="ne")
+        # frame file, simgrid and simsize stay open for reuse
+        handles = [e[0] for e in pool._pool.values()]
+        assert len(handles) == 3
+        read.frame(direc, t[0], var="ne")
+        assert [e[0] for e in pool._pool.values()] == handles
+        read.frame(direc, t[1], var="ne")
+        assert len(pool._pool) == 3
+        assert not handles[0].id.valid
+        h = handles[1]
+
+        # writers close pooled handles before truncating
+        xg = read.grid(direc)
+        h5write.grid(direc / "inputs/simsize.h5", direc / "inputs/simgrid.h5", xg)
+        assert not h.id.valid
+        assert read.grid(direc)["alt"] == approx(xg["alt"])
+        dat = read.series(direc)["ne"].isel(time=0)
+        assert dat.values == approx(ref["ne"].values)
+    finally:
+        pool.configure(maxsize=0)
+
+    assert not pool._pool
+
+
+def test_frame_species(tmp_path, helpers):
+    lx = (8, 6, 4)
+    direc = helpers.synthetic_run(tmp_path, lx=lx)
+    t = read.config(direc)["time"][1]
+    ref = helpers.synthetic_frame(lx, 1)
+
+    # only the electron slab is read for ne, Te
+    dat = read.frame(direc, t, var={"ne", "Te"})
+    assert dat.species.values.tolist() == ["electrons"]
+    assert dat["ne"].dims == ("x1", "x2", "x3")
+    assert dat["ne"].values == approx(ref["nsall"][-1])
+    assert dat["Te"].values == approx(ref["Tsall"][-1])
+
+    dat = read.frame(direc, t, var={"ns", "Ti"}, species=["N+", 0])
+    assert dat.species.values.tolist() == SPECIES
+    Ti = (ref["nsall"][:6] * ref["Tsall"][:6]).sum(axis=0) / ref["nsall"][-1]
+    assert dat["Ti"].values == approx(Ti, rel=1e-6)
+
+    dat = read.frame(direc, t, var="ns", species=["N+", "O+"])
+    assert dat.species.values.tolist() == ["O+", "N+"]
+    assert dat["ns"].values == approx(ref["nsall"][[0, 4]])
+
+    dat = read.frame(direc, t, var="ns", species=[])
+    assert dat["ns"].shape == (0, *lx)
+
+    with pytest.raises(ValueError):
+        read.frame(direc, t, var="ns", species=["Fe+"])
+
+
+def test_dtype(tmp_path, helpers):
+    direc = helpers.synthetic_run(tmp_path)
+    t = read.config(direc)["time"][1]
+
+    dat = read.frame(direc, t, var={"ne", "Ti"})
+    assert dat["ne"].dtype == dat["Ti"].dtype == "float32"
+
+    dat64 = read.frame(direc, t, var={"ne", "Ti"}, dtype="float64")
+    assert dat64["ne"].dtype == dat64["Ti"].dtype == "float64"
+    assert dat64["Ti"].values == approx(dat["Ti"].values, rel=1e-6)
+    assert read.grid(direc, var="alt", dtype="float64")["alt"].dtype == "float64"
+
+    set_dtype("float64")
+    try:
+        assert read.series(direc, var="Te")["Te"].dtype == "float64"
+        assert read.frame(direc, t, var="J1", dtype="native")["J1"].dtype == "float32"
+    finally:
+        set_dtype("native")
+
+    with pytest.raises(ValueError):
+        read.frame(direc, t, dtype="float16")
+
+
+@pytest.mark.parametrize("processes,prefetch", [(True, 2), (False, 1), (False, 0)])
+def test_iter_frames(processes, prefetch, tmp_path, helpers):
+    direc = helpers.synthetic_run(tmp_path, Nt=4)
+    times = read.config(direc)["time"]
+
+    frames = read.iter_frames(
+        direc, {"ne", "Te"}, prefetch=prefetch, processes=processes, x3=0
+    )
+    for t, dat in zip(times, frames):
+        ref = read.frame(direc, t, {"ne", "Te"}, x3=0)
+        assert to_datetime(dat.time) == t
+        assert dat["Te"].values == approx(ref["Te"].values)
+
+    # stopping early shuts down the background readers
+    for dat in read.iter_frames(direc, "ne", times=times[2:], processes=processes):
+        assert to_datetime(dat.time) == times[2]
+        break
+
+
+def test_probe(tmp_path, helpers):
+    lx = (8, 6, 4)
+    direc = helpers.synthetic_run(tmp_path, lx=lx)
+    xg = read.grid(direc)
+    times = read.config(direc)["time"]
+
+    # cell centers, a point midway between 8 cells, and a point outside the grid
+    alt = [xg["alt"][3, 0, 0], xg["alt"][2, 0, 0], xg["alt"][5, 0, 0], 1e6]
+    glat = [xg["glat"][0, 0, 2], xg["glat"][0, 4, 1], xg["glat"][0, 0, 1], 65.0]
+    glon = [xg["glon"][0, 1, 0], xg["glon"][0, 4, 0], xg["glon"][0, 2, 0], -147.0]
+    glat[2] = (glat[2] + xg["glat"][0, 0, 2]) / 2
+    glon[2] = (glon[2] + xg["glon"][0, 3, 0]) / 2
+    alt[2] = (alt[2] + xg["alt"][6, 0, 0]) / 2
+
+    dat = read.probe(direc, {"ne", "Ti", "Phi"}, alt=alt, glat=glat, glon=glon)
+    assert dat["ne"].dims == ("time", "point")
+    assert dat["ne"].shape == (len(times), 4)
+
+    # float32 grid coordinates put points slightly off the cell centers
+    for i, t in enumerate(times):
+        ref = read.frame(direc, t, {"ne", "Ti", "Phi"})
+        ne = ref["ne"].values
+        assert dat["ne"][i, 0] == approx(ne[3, 1, 2], rel=1e-4)
+        assert dat["ne"][i, 1] == approx(ne[2, 4, 1], rel=1e-4)
+        assert dat["ne"][i, 2] == approx(ne[5:7, 2:4, 1:3].mean(), rel=1e-4)
+        assert dat["Ti"][i, 0] == approx(ref["Ti"].values[3, 1, 2], rel=1e-4)
+        assert dat["Phi"][i, 1] == approx(ref["Phitop"].values[4, 1], rel=1e-4)
+        assert np.isnan(dat["ne"][i, 3])
+
+
+@pytest.mark.parametrize("flag", [1, 2, 3])
+def test_repack(flag, tmp_path, helpers):
+    lx = (8, 6, 4)
+    direc = helpers.synthetic_run(tmp_path, lx=lx, Nt=10, flagoutput=flag)
+    times = read.config(direc)["time"]
+
+    ref = read.series(direc).load()
+    frames = [read.frame(direc, t) for t in times]
+
+    cube = repack(direc, delete=True)
+    assert cube.name == CUBE_NAME
+    assert not list(direc.glob("2013*.h5"))
+
+    for t, f in zip(times, frames):
+        dat = read.frame(direc, t)
+        assert dat.attrs["filename"] == cube
+        for k in f.data_vars:
+            assert dat[k].values == approx(f[k].values), k
+
+    ds = read.series(direc)
+    for k in ref.data_vars:
+        assert ds[k].values == approx(ref[k].values), k
+    sub = ds["ne"].isel(time=slice(1, 9, 2), x1=slice(2, 5), x3=-1)
+    assert sub.values == approx(
+        ref["ne"].isel(time=slice(1, 9, 2), x1=slice(2, 5), x3=-1)
+    )
+
+
+def test_repack_milestone(tmp_path, helpers):
+    # flagoutput=2 run with full milestone frames at time indices 0 and 5
+    direc = helpers.synthetic_run(tmp_path, Nt=8, flagoutput=2, milestones=(0, 5))
+    times = read.config(direc)["time"]
+
+    frames = [read.frame(direc, t) for t in times]
+
+    cube = repack(direc, delete=True)
+
+    for t, f in zip(times, frames):
+        dat = read.frame(direc, t)
+        assert dat.attrs["filename"] == cube
+        assert set(dat.data_vars) == set(f.data_vars)
+        for k in f.data_vars:
+            assert dat[k].values == approx(f[k].values), k
+
+    with h5py.File(cube, "r") as h:
+        assert h["/time/has/nsall"][:].nonzero()[0].tolist() == [0, 5]
+        assert h["/time/has/neall"][:].sum() == 6
+        assert "/time/has/Phiall" not in h
+        assert np.isnan(h["nsall"][1]).all()
+        assert np.isnan(h["neall"][5]).all()
+
+
+def test_repack_stale(tmp_path, helpers):
+    direc = helpers.synthetic_run(tmp_path)
+    t = read.config(direc)["time"][1]
+
+    cube = repack(direc)
+    assert read.frame(direc, t).attrs["filename"] == cube
+
+    # a frame rewritten after repacking is read from its own file
+    file = find.frame(direc, t)
+    ns = os.stat(cube).st_mtime_ns + 10**9
+    os.utime(file, ns=(ns, ns))
+    assert read.frame(direc, t).attrs["filename"] == file
+
+
+def test_repack_append(tmp_path, helpers, monkeypatch):
+    direc = helpers.synthetic_run(tmp_path, Nt=4)
+    times = read.config(direc)["time"]
+    frames = [read.frame(direc, t) for t in times]
+
+    # a running simulation: the last frame is written after a deleting repack
+    last = find.frame(direc, times[-1])
+    saved = last.read_bytes()
+    last.unlink()
+    cube = repack(direc, delete=True)
+    assert not list(direc.glob("2013*.h5"))
+    last.write_bytes(saved)
+    ns = os.stat(cube).st_mtime_ns + 10**9
+    os.utime(last, ns=(ns, ns))
+
+    repack(direc, delete=True)
+    assert not last.is_file()
+    for t, f in zip(times, frames):
+        dat = read.frame(direc, t)
+        assert dat.attrs["filename"] == cube
+        assert dat["ne"].values == approx(f["ne"].values), t
+
+    # an interrupted repack leaves the previous file as it was
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(h5py.Dataset, "__setitem__", fail)
+    with pytest.raises(OSError):
+        repack(direc)
+    monkeypatch.undo()
+
+    assert not cube.with_suffix(".tmp").exists()
+    assert read.frame(direc, times[1])["ne"].values == approx(frames[1]["ne"].values)
+
+
+def test_grid_lazy(tmp_path, helpers):
+    lx = (8, 6, 4)
+    direc = helpers.synthetic_run(tmp_path, lx=lx)
+
+    xg = read.grid(direc)
+    assert xg.loaded == ["filename"]
+    assert "alt" in xg and "nope" not in xg
+    assert {"x1", "x2", "x3", "lx", "filename"} <= xg.keys()
+
+    # read on first access, then kept
+    alt = xg["alt"]
+    assert alt.shape == lx
+    assert xg["alt"] is alt
+    assert xg.loaded == ["filename", "alt"]
+    assert xg.get("nope") is None
+
+    assert list(xg.lx) == list(lx)
+    assert xg.gridtype == "cartesian"
+    assert xg.nullmask.shape == lx and not xg.nullmask.any()
+
+    # same values as reading all variables at once
+    eager = read.grid(direc, var=set(xg.keys()) - {"filename"})
+    assert set(eager.loaded) == set(xg)
+    for k in xg:
+        assert np.array_equal(xg[k], eager[k]), k
+
+    # pickling sends only loaded variables
+    xg = read.grid(direc, var={"x1"})
+    xp = pickle.loads(pickle.dumps(xg))
+    assert xp.loaded == ["filename", "x1"]
+    assert xp["x2"] == approx(eager["x2"])
+
+    # writing a lazy grid reads what it needs
+    h5write.grid(tmp_path / "simsize.h5", tmp_path / "simgrid.h5", read.grid(direc))
+    assert read.grid(tmp_path)["alt"] == approx(eager["alt"])
+
+
+def test_frame_at(tmp_path, helpers, monkeypatch):
+    direc = helpers.synthetic_run(tmp_path, Nt=3)
+    t = read.config(direc)["time"]
+    A = read.frame(direc, t[0])
+    B = read.frame(direc, t[1])
+
+    reads = []
+    frame = read.frame
+
+    def count(direc, time, *args, **kwargs):
+        reads.append(time)
+        return frame(direc, time, *args, **kwargs)
+
+    monkeypatch.setattr(read, "frame", count)
+    read._frame_cache.clear()
+
+    dt = t[1] - t[0]
+    for w in (0.25, 0.5, 0.75):
+        dat = read.frame_at(direc, t[0] + w * dt)
+        assert dat.time == np.datetime64(t[0] + w * dt)
+        for k in ("ne", "Ti", "J2"):
+            ref = A[k].values * (1 - w) + B[k].values * w
+            assert dat[k].values == approx(ref, rel=1e-6), k
+    # both frames read once for all three times
+    assert reads == [t[0], t[1]]
+
+    assert read.frame_at(direc, t[1]) is read.frame_at(direc, t[1])
+    assert read.frame_at(direc, t[0] + 0.4 * dt, method="nearest").time == A.time
+
+    # only the region is read and interpolated
+    sub = read.frame_at(direc, t[1] + 0.5 * dt, "ne", x1=slice(2, 5), x3=-1)
+    C = read.frame(direc, t[2], "ne")
+    ref = 0.5 * (B["ne"].values + C["ne"].values)[2:5, :, -1:]
+    assert sub["ne"].shape == (3, 6, 1)
+    assert sub["ne"].values == approx(ref, rel=1e-6)
+
+    with pytest.raises(ValueError):
+        read.frame_at(direc, t[-1] + dt)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_time_stack(workers, tmp_path, helpers):
+    lx = (8, 6, 4)
+    direc = helpers.synthetic_run(tmp_path, lx=lx)
+    ds = read.series(direc, var={"ne", "Te", "Phitop"})
+
+    # altitude profile and an x1-x2 plane by grid index
+    dat = read.time_stack(direc, {"ne", "Phi"}, x2=2, x3=1, workers=workers)
+    assert dat["ne"].dims == ("time", "x1")
+    assert dat["ne"].values == approx(ds["ne"].isel(x2=2, x3=1).values)
+    assert dat["Phi"].dims == ("time",)
+    assert dat["Phi"].values == approx(ds["Phitop"].isel(x2=2, x3=1).values)
+    assert dat.x2 == ds.x2[2]
+
+    dat = read.time_stack(direc, "Te", x1=slice(2, 6), x3=-1, workers=workers)
+    assert dat["Te"].shape == (3, 4, 6)
+    # in-process reads keep no state of the call
+    assert not read._worker_state
+    assert dat["Te"].values == approx(ds["Te"].isel(x1=slice(2, 6), x3=-1).values)
+
+    # keogram: line of geographic points at one altitude, same as probes there
+    xg = read.grid(direc)
+    alt = xg["alt"][3, 0, 0]
+    glat = np.linspace(xg["glat"][0, 0, 0], xg["glat"][0, 0, -1], 7)
+    glon = xg["glon"][0, 2, 0] + 0.01
+    dat = read.time_stack(
+        direc, {"ne", "Phi"}, alt=alt, glat=glat, glon=glon, workers=workers
+    )
+    ref = read.probe(direc, {"ne", "Phi"}, alt=alt, glat=glat, glon=glon)
+    assert dat["ne"].dims == ("time", "point")
+    for k in ("ne", "Phi"):
+        assert dat[k].values == approx(ref[k].values, rel=1e-6, nan_ok=True)
+
+    # streamed to a file
+    out = read.time_stack(
+        direc,
+        "ne",
+        alt=alt,
+        glat=glat[None, :],
+        glon=[[glon], [glon + 0.02]],
+        out=tmp_path / "keo.h5",
+    )
+    with h5py.File(out, "r") as f:
+        assert f["ne"].shape == (3, 2, 7)
+        assert f["ne"][:, 0, :] == approx(ref["ne"].values, rel=1e-6, nan_ok=True)
+        assert f["/time/UTsec"][1] == approx(5 * 3600 + 60)
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_ion_average(workers, tmp_path, helpers, monkeypatch):
+    direc = helpers.synthetic_run(tmp_path)
+    t = read.config(direc)["time"][1]
+    dat = read.frame(direc, t, var={"ns", "vs1", "Ts"})
+
+    # several slabs
+    monkeypatch.setattr(read, "SLAB_BYTES", dat["ns"][0].nbytes // 3)
+
+    avg = read.ion_average(
+        dat["ns"], {"v1": dat["vs1"], "Ti": dat["Ts"]}, workers=workers
+    )
+    ions = SPECIES[:6]
+    ns = dat["ns"].sel(species=ions)
+    ne = dat["ns"].sel(species="electrons")
+    for k, x in (("v1", "vs1"), ("Ti", "Ts")):
+        ref = (ns * dat[x].sel(species=ions)).sum("species") / ne
+        assert avg[k].dtype == ref.dtype
+        assert avg[k] == approx(ref.values, rel=1e-6), k
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_input_series(workers, tmp_path):
+    t0 = datetime(2013, 2, 20, 5)
+    times = [t0 + timedelta(seconds=30 * i) for i in range(3)]
+    mlon = np.linspace(0, 10, 5)
+    mlat = np.linspace(60, 70, 4)
+
+    rng = np.random.default_rng(0)
+    E = xarray.Dataset(coords={"time": times, "mlon": mlon, "mlat": mlat})
+    E["flagdirich"] = ("time", [0, 1, 1])
+    for k in ("Exit", "Eyit", "Vminx1it", "Vmaxx1it"):
+        E[k] = (("time", "mlon", "mlat"), rng.random((3, mlon.size, mlat.size)))
+    for k in ("Vminx2ist", "Vmaxx2ist"):
+        E[k] = (("time", "mlat"), rng.random((3, mlat.size)))
+    for k in ("Vminx3ist", "Vmaxx3ist"):
+        E[k] = (("time", "mlon"), rng.random((3, mlon.size)))
+
+    P = E[["Exit", "Eyit"]].rename({"Exit": "Q", "Eyit": "E0"})
+
+    (tmp_path / "Efield").mkdir()
+    (tmp_path / "precip").mkdir()
+    h5write.Efield(tmp_path / "Efield", E)
+    h5write.precip(tmp_path / "precip", P)
+
+    dat = read.Efield_series(tmp_path / "Efield", workers=workers)
+    assert list(dat.time.values) == list(np.array(times, dtype="datetime64[ns]"))
+    assert dat["Exit"].dims == ("time", "mlat", "mlon")
+    assert dat["flagdirich"].values.tolist() == [0, 1, 1]
+    for i, t in enumerate(times):
+        ref = read.Efield(find.frame(tmp_path / "Efield", t))
+        for k in ref.data_vars:
+            assert dat[k][i].values == approx(ref[k].values), k
+
+    # only the requested times, and hyperslabs of them
+    dat = read.precip_series(tmp_path / "precip", times[1:], workers=workers)
+    assert dat.time.size == 2
+    sub = dat["Q"].isel(time=1, mlat=slice(1, 3)).values
+    assert sub == approx(P["Q"][2].transpose().values[1:3], rel=1e-6)
@@ -0,0 +1,57 @@
+"""
+grid shared between processes
+"""
+
+import concurrent.futures
+import pickle
+
+import numpy as np
+import pytest
+
+import gemini3d.read as read
+from gemini3d.shared import SharedGrid
+
+
+def _worker(xg) -> tuple:
+    a = xg["alt"]
+    return float(a.sum()), a.flags.owndata, a.flags.writeable, xg["filename"]
+
+
+@pytest.mark.parametrize("backing", ["shm", "file"])
+def test_shared_grid(backing, tmp_path, helpers):
+    direc = helpers.synthetic_run(tmp_path)
+    ref = read.grid(direc)
+
+    file = tmp_path / "grid.bin" if backing == "file" else None
+
+    lazy = read.grid(direc)
+    with SharedGrid(lazy, file=file) as xg:
+        assert xg.keys() == ref.keys()
+        for k, v in ref.items():
+            if isinstance(v, np.ndarray):
+                assert np.array_equal(xg[k], v), k
+                assert xg[k].dtype == v.dtype, k
+        assert xg["h1"].flags.f_contiguous
+        # arrays of a lazy grid are read into the block, not into the grid
+        assert "h1" not in lazy.loaded
+        assert not xg["alt"].flags.writeable
+
+        # pickles as a handle, not the arrays
+        assert len(pickle.dumps(xg)) < ref["h1"].nbytes
+        xp = pickle.loads(pickle.dumps(xg))
+        assert np.shares_memory(xp["alt"], xg["alt"])
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=2) as pool:
+            out = list(pool.map(_worker, [xg] * 3))
+
+        for total, owndata, writeable, filename in out:
+            assert total == pytest.approx(float(ref["alt"].sum()))
+            assert not owndata and not writeable
+            assert filename == ref["filename"]
+
+        dat = read.frame(direc, read.config(direc)["time"][0], var="ne", xg=xg, x1=slice(2, 5))
+        assert dat["ne"].shape[0] == 3
+
+    assert not xg
+    if file:
+        assert not file.exists()
@@ -128,3 +128,21 @@ def test_coord():
     assert [z, x, y] == approx(
         [0, -2076275.16205889, 395967.844181141], abs=1e-6, rel=0.001
     )
+
+
+def test_nml_cache(tmp_path):
+    file = tmp_path / "test.nml"
+    namelist.write(file, "one", {"a": 1.0, "b": ["x", "y"]})
+
+    r = namelist.read_all(file)
+    assert r == {"one": {"a": 1.0, "b": ["x", "y"]}}
+
+    # callers get copies
+    r["one"]["b"].append("z")
+    assert namelist.read(file, "one")["b"] == ["x", "y"]
+
+    # changed file is reread
+    namelist.write(file, "two", {"c": "hello"})
+    assert namelist.read(file, "two") == {"c": "hello"}
+    with pytest.raises(KeyError):
+        namelist.read(file, "three")
@@ -0,0 +1,176 @@
+"""
+HDF5 writers and write profiles
+"""
+
+from datetime import datetime, timedelta
+import concurrent.futures
+import os
+
+import numpy as np
+import pytest
+import h5py
+import xarray
+
+import gemini3d.read as read
+from gemini3d import find
+from gemini3d.hdf5 import write as h5write
+from gemini3d.grid import cartesian, tilted_dipole
+
+
+@pytest.mark.parametrize("profile", ["default", "archive", "fast", "analysis"])
+def test_grid_profile(profile, tmp_path, helpers):
+    direc = helpers.synthetic_run(tmp_path / "sim")
+    xg = read.grid(direc)
+    xg.load()
+
+    h5write.grid(tmp_path / "simsize.h5", tmp_path / "simgrid.h5", xg, profile=profile)
+
+    opts = h5write.WRITE_PROFILES[profile]
+    with h5py.File(tmp_path / "simgrid.h5", "r") as f:
+        d = f["alt"]
+        assert d.compression == opts.get("compression")
+        assert d.fletcher32 == opts.get("fletcher32", False)
+        if profile == "fast":
+            assert d.chunks is None
+        if profile == "analysis":
+            # whole x1 columns
+            assert d.chunks[-1] == d.shape[-1]
+        assert d[()].transpose() == pytest.approx(xg["alt"])
+
+
+def test_profile_select(tmp_path, monkeypatch):
+    monkeypatch.setitem(h5write._write_profile, "profile", "default")
+
+    assert h5write.get_profile() == "default"
+    h5write.set_profile("fast")
+    assert h5write.get_profile() == "fast"
+    assert h5write.get_profile("archive") == "archive"
+    assert h5write.dataset_options((10, 10)) == {}
+
+    with pytest.raises(ValueError):
+        h5write.set_profile("nope")
+
+    opts = h5write.dataset_options((3, 200, 100, 50), 4, "analysis", clvl=4)
+    assert opts["compression_opts"] == 4
+    assert opts["chunks"][-1] == 50
+    assert np.prod(opts["chunks"]) * 4 <= h5write.CHUNK_BYTES
+    assert h5write.dataset_options((), 4, "archive") == {}
+
+    N = {
+        k: np.ones((4, 5), dtype=np.float32)
+        for k in {"dn0all", "dnN2all", "dnO2all", "dvnrhoall", "dvnzall", "dTnall"}
+    }
+    h5write.neutral(tmp_path / "neutral.h5", N)
+    with h5py.File(tmp_path / "neutral.h5", "r") as f:
+        assert f["dn0all"].compression is None
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_input_writers(workers, tmp_path):
+    times = [datetime(2013, 2, 20, 5) + timedelta(seconds=i) for i in range(5)]
+    mlon = np.linspace(0, 10, 5)
+    mlat = np.linspace(60, 70, 4)
+
+    rng = np.random.default_rng(0)
+    E = xarray.Dataset(coords={"time": times, "mlon": mlon, "mlat": mlat})
+    E["flagdirich"] = ("time", [0, 1, 1, 0, 1])
+    for k in ("Exit", "Eyit", "Vminx1it", "Vmaxx1it"):
+        E[k] = (("time", "mlon", "mlat"), rng.random((5, mlon.size, mlat.size)))
+    for k in ("Vminx2ist", "Vmaxx2ist"):
+        E[k] = (("time", "mlat"), rng.random((5, mlat.size)))
+    for k in ("Vminx3ist", "Vmaxx3ist"):
+        E[k] = (("time", "mlon"), rng.random((5, mlon.size)))
+
+    h5write.Efield(tmp_path, E, workers=workers)
+
+    assert not list(tmp_path.glob("*.tmp"))
+    for t in times:
+        dat = read.Efield(find.frame(tmp_path, t))
+        assert read.time(find.frame(tmp_path, t)) == t
+        assert dat["flagdirich"] == E["flagdirich"].loc[t]
+        for k in ("Exit", "Eyit", "Vminx2ist", "Vmaxx3ist"):
+            ref = E[k].loc[{"time": t}].transpose(*dat[k].dims)
+            assert dat[k].values == pytest.approx(ref.values, rel=1e-6), k
+
+    P = E[["Exit"]].rename({"Exit": "Q"})
+    P["E0"] = 2 * P["Q"]
+    (tmp_path / "precip").mkdir()
+    h5write.precip(tmp_path / "precip", P, workers=workers)
+    dat = read.precip_series(tmp_path / "precip")
+    assert dat["E0"].values == pytest.approx(
+        2 * E["Exit"].transpose("time", "mlat", "mlon").values, rel=1e-6
+    )
+
+
+def _write_in_worker(outdir, E) -> list[str]:
+    # a process pool started in this worker would fail
+    os.cpu_count = lambda: 4
+    concurrent.futures.ProcessPoolExecutor = None
+    h5write.Efield(outdir, E)
+    return sorted(p.name for p in outdir.glob("2013*.h5"))
+
+
+def test_input_writers_in_worker(tmp_path):
+    times = [datetime(2013, 2, 20, 5) + timedelta(seconds=i) for i in range(3)]
+    E = xarray.Dataset(coords={"time": times, "mlon": [0.0, 1.0], "mlat": [60.0, 61.0]})
+    E["flagdirich"] = ("time", [0, 1, 1])
+    for k in ("Exit", "Eyit", "Vminx1it", "Vmaxx1it"):
+        E[k] = (("time", "mlon", "mlat"), np.ones((3, 2, 2)))
+    for k in ("Vminx2ist", "Vmaxx2ist", "Vminx3ist", "Vmaxx3ist"):
+        E[k] = (("time", "mlat"), np.ones((3, 2)))
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1) as ex:
+        names = ex.submit(_write_in_worker, tmp_path, E).result()
+
+    assert len(names) == 3
+
+
+@pytest.mark.parametrize("kind", ["cartesian", "dipole"])
+def test_grid_slabs(kind, tmp_path):
+    if kind == "cartesian":
+        p = {
+            "xdist": 200e3,
+            "ydist": 300e3,
+            "lxp": 6,
+            "lyp": 8,
+            "glat": 65.8,
+            "glon": -147.7,
+            "alt_min": 80e3,
+            "alt_max": 900e3,
+            "alt_scale": [10e3, 8e3, 500e3, 150e3],
+            "Bincl": 90,
+        }
+        header, slabs = cartesian.cart3d_slabs(p, 3)
+        xg = cartesian.cart3d(p)
+    else:
+        p = {
+            "lq": 16,
+            "lp": 6,
+            "lphi": 7,
+            "dtheta": 7.5,
+            "dphi": 12.0,
+            "altmin": 80e3,
+            "gridflag": 1,
+            "glon": 143.4,
+            "glat": 42.45,
+        }
+        header, slabs = tilted_dipole.tilted_dipole3d_slabs(p, 3)
+        xg = tilted_dipole.tilted_dipole3d(p)
+
+    h5write.grid(tmp_path / "size.h5", tmp_path / "grid.h5", xg)
+    h5write.grid_slabs(tmp_path / "ssize.h5", tmp_path / "sgrid.h5", header, slabs)
+
+    with h5py.File(tmp_path / "size.h5", "r") as f, h5py.File(tmp_path / "ssize.h5") as g:
+        assert (f["lx"][()] == g["lx"][()]).all()
+
+    with h5py.File(tmp_path / "grid.h5", "r") as f, h5py.File(tmp_path / "sgrid.h5") as g:
+        assert f.keys() == g.keys()
+        for k in f:
+            assert f[k].shape == g[k].shape, k
+            assert f[k].dtype == g[k].dtype, k
+            assert f[k].chunks == g[k].chunks, k
+            assert f[k].compression == g[k].compression, k
+            if k in {"glonctr", "glatctr"}:
+                assert g[k][()] == pytest.approx(f[k][()])
+            else:
+                assert (f[k][()] == g[k][()]).all(), k
@@ -17,7 +17,24 @@ import xarray
 import numpy as np
 
 
-__all__ = ["get_pkg_file", "str2func", "to_datetime", "git_meta", "datetime2stem"]
+__all__ = [
+    "get_pkg_file",
+    "str2func",
+    "to_datetime",
+    "git_meta",
+    "datetime2stem",
+    "set_dtype",
+    "get_dtype",
+]
+
+# dtype of data read and derived: "native" keeps the dtype stored in the file
+DTYPE_POLICIES: dict[str, T.Any] = {
+    "native": None,
+    "float32": np.float32,
+    "float64": np.float64,
+}
+
+_dtype_policy = {"policy": os.environ.get("GEMINI_DTYPE", "native")}
 
 
 def get_pkg_file(package: str, filename: str) -> Path:
@@ -260,3 +277,46 @@ def filename2datetime(path: Path | str) -> datetime:
     name = path.name if isinstance(path, Path) else path
 
     return datetime.strptime(name[:8], "%Y%m%d") + timedelta(seconds=float(name[9:21]))
+
+
+def set_dtype(policy: str) -> None:
+    """
+    set the global dtype policy of reads, derived variables and interpolation
+
+    Parameters
+    ----------
+    policy: str
+        "native" (as stored in file), "float32" or "float64"
+    """
+
+    get_dtype(policy)
+    _dtype_policy["policy"] = policy
+
+
+def get_dtype(policy: str | None = None) -> np.dtype | None:
+    """
+    resolve a dtype policy to a numpy dtype
+
+    Parameters
+    ----------
+    policy: str, optional
+        per-call policy, default is the global policy from set_dtype()
+        or environment variable GEMINI_DTYPE
+
+    Returns
+    -------
+    dtype: numpy.dtype or None
+        None for "native", meaning keep the stored dtype
+    """
+
+    if policy is None:
+        policy = _dtype_policy["policy"]
+
+    try:
+        dtype = DTYPE_POLICIES[policy]
+    except KeyError:
+        raise ValueError(
+            f"dtype policy must be one of {list(DTYPE_POLICIES)}, not {policy}"
+        )
+
+    return None if dtype is None else np.dtype(dtype)
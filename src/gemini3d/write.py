@@ -7,9 +7,10 @@ import json
 
 from .utils import git_meta
 from .hdf5 import write as h5write
+from .grid.slab import Slab
 
 
-def state(out_file: Path, dat, **kwargs) -> None:
+def state(out_file: Path, dat, *, profile: str | None = None, **kwargs) -> None:
     """
     WRITE STATE VARIABLE DATA.
     NOTE: WE don't write ANY OF THE ELECTRODYNAMIC
@@ -24,6 +25,8 @@ def state(out_file: Path, dat, **kwargs) -> None:
 
     dat: xarray.Dataset
         state variables to write
+    profile: str, optional
+        HDF5 write profile, see gemini3d.hdf5.write.get_profile
     """
 
     # %% allow overriding "dat"
@@ -37,7 +40,7 @@ def state(out_file: Path, dat, **kwargs) -> None:
     if "Phitop" in kwargs:
         dat["Phitop"] = (("x2", "x3"), kwargs["Phitop"])
 
-    h5write.state(out_file, dat)
+    h5write.state(out_file, dat, profile=profile)
 
 
 def grid(cfg: dict[str, T.Any], xg: dict[str, T.Any]) -> None:
@@ -47,7 +50,7 @@ def grid(cfg: dict[str, T.Any], xg: dict[str, T.Any]) -> None:
     ----------
 
     cfg: dict
-        simulation parameters
+        simulation parameters, optionally with "write_profile"
     xg: dict
         grid values
     """
@@ -58,12 +61,49 @@ def grid(cfg: dict[str, T.Any], xg: dict[str, T.Any]) -> None:
 
     input_dir.mkdir(parents=True, exist_ok=True)
 
-    h5write.grid(cfg["indat_size"], cfg["indat_grid"], xg)
+    h5write.grid(
+        cfg["indat_size"], cfg["indat_grid"], xg, profile=cfg.get("write_profile")
+    )
 
     meta(input_dir / "setup_grid.json", git_meta(), cfg)
 
 
-def Efield(E, outdir: Path) -> None:
+def grid_slabs(
+    cfg: dict[str, T.Any], header: dict[str, T.Any], slabs: T.Iterable[Slab]
+) -> None:
+    """writes a grid generated in x3 slabs to disk as it is generated
+
+    Parameters
+    ----------
+
+    cfg: dict
+        simulation parameters, optionally with "write_profile"
+    header: dict
+        grid size and 1-D grid values
+    slabs: iterable of dict
+        3-D and 4-D grid values by x3 range, see gemini3d.grid.slab
+    """
+
+    input_dir = cfg["indat_size"].parent
+    if input_dir.is_file():
+        raise OSError(f"{input_dir} is a file instead of directory")
+
+    input_dir.mkdir(parents=True, exist_ok=True)
+
+    h5write.grid_slabs(
+        cfg["indat_size"],
+        cfg["indat_grid"],
+        header,
+        slabs,
+        profile=cfg.get("write_profile"),
+    )
+
+    meta(input_dir / "setup_grid.json", git_meta(), cfg)
+
+
+def Efield(
+    E, outdir: Path, *, profile: str | None = None, workers: int | None = None
+) -> None:
     """writes E-field to disk
 
     Parameters
@@ -73,15 +113,21 @@ def Efield(E, outdir: Path) -> None:
         E-field values
     outdir: pathlib.Path
         directory to write files into
+    profile: str, optional
+        HDF5 write profile, see gemini3d.hdf5.write.get_profile
+    workers: int, optional
+        number of processes writing files, default CPU count
     """
 
     print("write E-field data to", outdir)
     outdir.mkdir(parents=True, exist_ok=True)
 
-    h5write.Efield(outdir, E)
+    h5write.Efield(outdir, E, profile=profile, workers=workers)
 
 
-def precip(precip, outdir: Path) -> None:
+def precip(
+    precip, outdir: Path, *, profile: str | None = None, workers: int | None = None
+) -> None:
     """writes precipitation to disk
 
     Parameters
@@ -90,15 +136,19 @@ def precip(precip, outdir: Path) -> None:
         preicipitation values
     outdir: pathlib.Path
         directory to write files into
+    profile: str, optional
+        HDF5 write profile, see gemini3d.hdf5.write.get_profile
+    workers: int, optional
+        number of processes writing files, default CPU count
     """
 
     print("write precipitation data to", outdir)
     outdir.mkdir(parents=True, exist_ok=True)
 
-    h5write.precip(outdir, precip)
+    h5write.precip(outdir, precip, profile=profile, workers=workers)
 
 
-def neutral2(data: dict[str, T.Any], outfile: Path):
+def neutral2(data: dict[str, T.Any], outfile: Path, *, profile: str | None = None):
     """
     writes 2D neutral data to disk
 
@@ -108,9 +158,11 @@ def neutral2(data: dict[str, T.Any], outfile: Path):
         neutral data
     outdir: pathlib.Path
         directory to write files into
+    profile: str, optional
+        HDF5 write profile, see gemini3d.hdf5.write.get_profile
     """
 
-    h5write.neutral(outfile, data)
+    h5write.neutral(outfile, data, profile=profile)
 
 
 def meta(fn: Path, git_meta: dict[str, str], cfg: dict[str, T.Any]) -> None:
@@ -138,7 +190,9 @@ def meta(fn: Path, git_meta: dict[str, str], cfg: dict[str, T.Any]) -> None:
     fn.write_text(js)
 
 
-def maggrid(filename: Path, xmag: dict[str, T.Any]) -> None:
+def maggrid(
+    filename: Path, xmag: dict[str, T.Any], *, profile: str | None = None
+) -> None:
     filename = Path(filename).expanduser()
 
     # %% default value for gridsize
@@ -152,4 +206,4 @@ def maggrid(filename: Path, xmag: dict[str, T.Any]) -> None:
         gridsize = xmag["gridsize"]
 
     # %% write the file
-    h5write.maggrid(filename, xmag, gridsize)
+    h5write.maggrid(filename, xmag, gridsize, profile=profile)